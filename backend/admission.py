@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Admission Control
+Bounded in-flight limit with priority lanes; full lanes reject at once instead of queueing without limit
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+from stage_metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+class Overloaded(Exception):
+    """Raised when a request is shed; `retry_after` is a whole number of seconds for the Retry-After header"""
+
+    def __init__(self, lane: str, retry_after: int, reason: str):
+        super().__init__(f"{lane} lane {reason}")
+        self.lane = lane
+        self.retry_after = retry_after
+        self.reason = reason
+
+@dataclass
+class Lane:
+    """One priority class: lanes earlier in the controller's list are served first"""
+    name: str
+    max_queue: int
+    max_in_flight: int
+    max_wait_seconds: float
+    in_flight: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    waiters: Deque['asyncio.Future[None]'] = field(default_factory=deque)
+
+class AdmissionController:
+    """Admits at most `max_in_flight` requests at once and queues the rest per lane.
+
+    A freed slot goes to the oldest waiter of the highest-priority lane that is under its
+    own in-flight cap, so capping bulk below `max_in_flight` keeps slots free for
+    interactive requests. A request is rejected with Overloaded when its lane's queue is
+    full or it waited longer than the lane's `max_wait_seconds`. Must be used from one
+    event loop.
+    """
+
+    def __init__(self, lanes: List[Lane], max_in_flight: int, wait_seconds: Optional[Histogram] = None):
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in lanes}
+        self.max_in_flight = max_in_flight
+        self.wait_seconds = wait_seconds
+        self.in_flight = 0
+        # Moving average of how long an admitted request holds its slot, for Retry-After
+        self._service_seconds = 1.0
+
+    @classmethod
+    def from_env(cls, wait_seconds: Optional[Histogram] = None) -> 'AdmissionController':
+        """Limits from ADMISSION_MAX_IN_FLIGHT and ADMISSION_{INTERACTIVE,BULK}_{QUEUE,MAX_IN_FLIGHT,MAX_WAIT_MS}"""
+        max_in_flight = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '8'))
+        lanes = [
+            Lane(INTERACTIVE,
+                 max_queue=int(os.environ.get('ADMISSION_INTERACTIVE_QUEUE', '64')),
+                 max_in_flight=int(os.environ.get('ADMISSION_INTERACTIVE_MAX_IN_FLIGHT', str(max_in_flight))),
+                 max_wait_seconds=float(os.environ.get('ADMISSION_INTERACTIVE_MAX_WAIT_MS', '5000')) / 1000),
+            Lane(BULK,
+                 max_queue=int(os.environ.get('ADMISSION_BULK_QUEUE', '16')),
+                 max_in_flight=int(os.environ.get('ADMISSION_BULK_MAX_IN_FLIGHT', str(max(1, max_in_flight // 2)))),
+                 max_wait_seconds=float(os.environ.get('ADMISSION_BULK_MAX_WAIT_MS', '30000')) / 1000),
+        ]
+        return cls(lanes, max_in_flight, wait_seconds)
+
+    def lane(self, name: Optional[str], default: str) -> str:
+        """A known lane name from a client hint, else `default`"""
+        name = (name or '').strip().lower()
+        return name if name in self.lanes else default
+
+    async def acquire(self, name: str) -> None:
+        """Wait for a slot in lane `name`; raises Overloaded instead of waiting past the lane's limits"""
+        lane = self.lanes[name]
+        if len(lane.waiters) >= lane.max_queue:
+            self._reject(lane, 'queue is full')
+        start = time.perf_counter()
+        future: 'asyncio.Future[None]' = asyncio.get_running_loop().create_future()
+        lane.waiters.append(future)
+        self._dispatch()
+        if not future.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(future), lane.max_wait_seconds)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if future.done():
+                    # Granted in the same instant; hand the slot on
+                    self.release(name)
+                else:
+                    future.cancel()
+                    lane.waiters.remove(future)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self._reject(lane, f'wait exceeded {lane.max_wait_seconds:g}s')
+        if self.wait_seconds is not None:
+            self.wait_seconds.observe(name, time.perf_counter() - start)
+
+    def release(self, name: str) -> None:
+        lane = self.lanes[name]
+        lane.in_flight -= 1
+        self.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, name: str) -> AsyncIterator[None]:
+        """Hold a slot in lane `name` for the body of the block"""
+        await self.acquire(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._service_seconds = 0.9 * self._service_seconds + 0.1 * (time.perf_counter() - start)
+            self.release(name)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, highest-priority lane first"""
+        while self.in_flight < self.max_in_flight:
+            lane = next((lane for lane in self.lanes.values() if lane.waiters and lane.in_flight < lane.max_in_flight), None)
+            if lane is None:
+                return
+            lane.waiters.popleft().set_result(None)
+            lane.in_flight += 1
+            lane.admitted += 1
+            self.in_flight += 1
+
+    def _reject(self, lane: Lane, reason: str) -> None:
+        lane.rejected += 1
+        # Time for the queue ahead to drain through the slots this lane may use
+        drain = (len(lane.waiters) + 1) * self._service_seconds / max(1, min(lane.max_in_flight, self.max_in_flight))
+        raise Overloaded(lane.name, max(1, math.ceil(drain)), reason)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queue depth, in-flight, admitted and rejected counts per lane"""
+        return {
+            lane.name: {'queued': len(lane.waiters), 'in_flight': lane.in_flight,
+                        'admitted': lane.admitted, 'rejected': lane.rejected}
+            for lane in self.lanes.values()
+        }
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+Times each analysis stage on synthetic 1-20 page resumes and gates regressions against a stored baseline
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare baseline.json --threshold 0.25
+    python benchmarks/run_benchmarks.py --input results.json --compare baseline.json
+
+The LLM is always stubbed out. Without a local embedding model, the embedding and
+end-to-end suites are skipped unless --stub-embeddings swaps in a hashing encoder.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import platform
+import tempfile
+import logging
+import statistics
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_job, generate_resume
+
+logger = logging.getLogger(__name__)
+
+SUITES = ('detectors', 'tfidf', 'spacy', 'embeddings', 'e2e')
+DETECTORS = ('scan', 'detect_sections', 'detect_quantifiable_achievements', 'analyze_format_optimization',
+             'detect_action_verbs', 'extract_keywords', 'calculate_standalone_score')
+
+class HashingEncoder:
+    """Stand-in for the sentence model: deterministic vectors at a fraction of the cost"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def encode(self, texts: Sequence[str], **kwargs) -> np.ndarray:
+        seeds = [int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little') for text in texts]
+        return np.stack([np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32) for seed in seeds])
+
+def measure(run: Callable[[Any], Any], repeat: int, setup: Optional[Callable[[], Any]] = None,
+            warmup: int = 1) -> Dict[str, float]:
+    """Median, p95 and min of `repeat` timed calls; setup() output is passed in and not timed"""
+    times = []
+    for iteration in range(warmup + repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        run(argument)
+        elapsed = (time.perf_counter() - start) * 1000
+        if iteration >= warmup:
+            times.append(elapsed)
+    return summarize(times)
+
+def summarize(times_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(times_ms)
+    return {
+        'runs': len(ordered),
+        'median_ms': round(statistics.median(ordered), 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 4),
+        'min_ms': round(ordered[0], 4)
+    }
+
+def bench_detectors(sizes: Sequence[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Each ImprovedATSAnalyzer detector on a fresh context; all but scan and the
+    standalone score start from a memoized scan, so they report only their own cost"""
+    from improved_ats_analysis import AnalysisContext, ImprovedATSAnalyzer
+    analyzer = ImprovedATSAnalyzer()
+    results = {}
+    for pages in sizes:
+        text = generate_resume(pages)
+        for name in DETECTORS:
+            cold = name in ('scan', 'calculate_standalone_score')
+
+            def setup():
+                context = AnalysisContext(text)
+                if not cold:
+                    analyzer.scan(context)
+                return context
+
+            results[f'detector.{name}[pages={pages}]'] = measure(getattr(analyzer, name), repeat, setup)
+    return results
+
+def bench_tfidf(sizes: Sequence[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Pre-fitted TF-IDF similarity (embedding service) and keyword Jaccard (hybrid service)"""
+    from tfidf_model import TfidfModel, clean_text
+    from improved_ats_analysis import AnalysisContext
+    from hybrid_analysis_simple import ImprovedAnalyzer
+    model = TfidfModel.load_or_default()
+    hybrid = ImprovedAnalyzer()
+    job = generate_job()
+    job_row = model.transform([clean_text(job)])
+    results = {}
+    for pages in sizes:
+        resume = generate_resume(pages)
+        results[f'tfidf.similarity[pages={pages}]'] = measure(
+            lambda _: model.similarity(model.transform([clean_text(resume)]), job_row), repeat
+        )
+        results[f'keyword.jaccard[pages={pages}]'] = measure(
+            lambda pair: hybrid.calculate_keyword_similarity(*pair), repeat,
+            setup=lambda: (AnalysisContext(resume), AnalysisContext(job))
+        )
+    return results
+
+def bench_spacy(sizes: Sequence[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    from model_registry import models
+    if models.get_optional('spacy') is None:
+        raise RuntimeError("spaCy model not available")
+    from embedding_service import analyzer
+    return {
+        f'spacy.skills[pages={pages}]': measure(
+            lambda text: analyzer.extract_skills_and_experience_batch([text]), repeat, setup=lambda: resume
+        )
+        for pages, resume in ((pages, generate_resume(pages)) for pages in sizes)
+    }
+
+def bench_embeddings(sizes: Sequence[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Whole-text (truncated) and chunked encodes, straight through the model without the store"""
+    from model_registry import models
+    from document_embedding import chunk_document
+    model = models.get_optional('sentence_transformer')
+    if model is None:
+        raise RuntimeError("Embedding model not available (use --stub-embeddings)")
+    results = {}
+    for pages in sizes:
+        resume = generate_resume(pages)
+        chunks = [chunk.text for chunk in chunk_document(resume)]
+        results[f'embedding.truncate[pages={pages}]'] = measure(lambda _: model.encode([resume], convert_to_numpy=True), repeat)
+        results[f'embedding.chunked[pages={pages}]'] = measure(
+            lambda _: model.encode(chunks, batch_size=32, convert_to_numpy=True), repeat
+        )
+    return results
+
+async def _analyze_concurrently(app: Any, payloads: List[Dict[str, str]], concurrency: int) -> Dict[str, float]:
+    import httpx
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def post(client, payload):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post('/analyze', json=payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(post(client, payload) for payload in payloads))
+        wall = time.perf_counter() - start
+    result = summarize(latencies)
+    result.update({'concurrency': concurrency, 'throughput_rps': round(len(payloads) / wall, 2)})
+    return result
+
+def bench_e2e(pages: int, concurrency_levels: Sequence[int], requests: int) -> Dict[str, Dict[str, float]]:
+    """/analyze throughput with distinct resumes per request, so no result cache is hit"""
+    import hybrid_analysis_simple as service
+    if service.models.get_optional('sentence_transformer') is None:
+        raise RuntimeError("Embedding model not available (use --stub-embeddings)")
+
+    async def no_llm(prompt: str) -> str:
+        return ""
+    service.analyzer.call_ollama_llm_async = no_llm
+    for name in ('hybrid_analysis_simple', 'httpx'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    job = generate_job()
+    results = {}
+    for level, concurrency in enumerate(concurrency_levels):
+        payloads = [{'resume': generate_resume(pages, seed=level * requests + i), 'job': job, 'jobLevel': 'senior'}
+                    for i in range(requests)]
+        asyncio.run(_analyze_concurrently(service.app, payloads[:1], 1))  # Warm-up
+        results[f'e2e.analyze[pages={pages},concurrency={concurrency}]'] = asyncio.run(
+            _analyze_concurrently(service.app, payloads, concurrency)
+        )
+    return results
+
+def use_scratch_stores() -> None:
+    """Keep caches and stores written by the services out of the working tree.
+
+    Only takes effect before the services are first imported; locations already set are kept.
+    """
+    scratch = tempfile.mkdtemp(prefix='resume-benchmarks-')
+    for name, value in (('EMBEDDING_STORE_PATH', os.path.join(scratch, 'embeddings')),
+                        ('JOB_FEATURE_STORE_DIR', scratch),
+                        ('OLLAMA_CACHE_PATH', os.path.join(scratch, 'llm.sqlite3')),
+                        ('PRELOAD_MODELS', '0')):
+        os.environ.setdefault(name, value)
+
+def run(suites: Sequence[str], sizes: Sequence[int], repeat: int, concurrency: Sequence[int], requests: int,
+        e2e_pages: int, stub_embeddings: bool) -> Dict[str, Any]:
+    use_scratch_stores()
+    from model_registry import EMBEDDING_MODEL_ID, models
+    if stub_embeddings:
+        models.set('sentence_transformer', HashingEncoder())
+    report: Dict[str, Any] = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'embeddings': 'stub' if stub_embeddings else EMBEDDING_MODEL_ID,
+            'sizes': list(sizes),
+            'repeat': repeat
+        },
+        'results': {},
+        'skipped': {}
+    }
+    benches = {
+        'detectors': lambda: bench_detectors(sizes, repeat),
+        'tfidf': lambda: bench_tfidf(sizes, repeat),
+        'spacy': lambda: bench_spacy(sizes, repeat),
+        'embeddings': lambda: bench_embeddings(sizes, repeat),
+        'e2e': lambda: bench_e2e(e2e_pages, concurrency, requests)
+    }
+    for suite in suites:
+        logger.info(f"Running {suite}")
+        try:
+            report['results'].update(benches[suite]())
+        except Exception as e:
+            logger.warning(f"Skipped {suite}: {e}")
+            report['skipped'][suite] = str(e)
+    return report
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            min_delta_ms: float) -> List[Dict[str, Any]]:
+    """Benchmarks whose median grew by more than `threshold` (fraction) and `min_delta_ms`"""
+    regressions = []
+    for name, result in sorted(current['results'].items()):
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        before, after = reference['median_ms'], result['median_ms']
+        if after > before * (1 + threshold) and after - before > min_delta_ms:
+            regressions.append({'name': name, 'baseline_ms': before, 'current_ms': after,
+                                'change': round(after / before - 1, 4) if before else None})
+    return regressions
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1, 5, 10, 20], help="Resume lengths in pages")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument('--e2e-pages', type=int, default=2)
+    parser.add_argument('--stub-embeddings', action='store_true', help="Hashing encoder instead of the sentence model")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--input', help="Compare existing results instead of running")
+    parser.add_argument('--compare', help="Baseline results JSON; exit 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed median slowdown, as a fraction")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.input:
+        with open(args.input) as f:
+            report = json.load(f)
+    else:
+        report = run(args.suites, args.sizes, args.repeat, args.concurrency, args.requests, args.e2e_pages,
+                     args.stub_embeddings)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    for name, result in sorted(report['results'].items()):
+        print(f"{name:70s} {result['median_ms']:10.3f} ms  p95 {result['p95_ms']:10.3f} ms")
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    if baseline.get('meta', {}).get('embeddings') != report.get('meta', {}).get('embeddings'):
+        logger.warning("Baseline was recorded with different embeddings; embedding timings are not comparable")
+    regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']}: {regression['baseline_ms']:.3f} -> "
+              f"{regression['current_ms']:.3f} ms ({regression['change']:+.0%})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
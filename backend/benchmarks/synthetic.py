@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Synthetic Documents
+Deterministic resumes from 1 to 20 pages and matching job descriptions for benchmarking
+"""
+
+import random
+from typing import List
+
+# Roughly one printed page of resume text
+PAGE_WORDS = 450
+
+FIRST_NAMES = ['Alex', 'Jordan', 'Sam', 'Priya', 'Chen', 'Maria', 'Tomasz', 'Aisha', 'Kenji', 'Lena']
+LAST_NAMES = ['Rivera', 'Okafor', 'Nguyen', 'Schmidt', 'Patel', 'Kowalski', 'Haddad', 'Tanaka', 'Silva', 'Brown']
+COMPANIES = ['Acme Corp', 'Globex Inc.', 'Initech LLC', 'Umbrella Systems', 'Hooli', 'Stark Industries',
+             'Wayne Enterprises', 'Cyberdyne Corporation', 'Soylent Labs', 'Vandelay Industries']
+TITLES = ['Software Engineer', 'Senior Software Engineer', 'Backend Developer', 'Full Stack Developer',
+          'Data Engineer', 'DevOps Engineer', 'Engineering Manager', 'Machine Learning Engineer']
+TECHNOLOGIES = ['Python', 'JavaScript', 'TypeScript', 'Java', 'Go', 'Rust', 'C++', 'SQL', 'React', 'Angular',
+                'Vue', 'Django', 'Flask', 'FastAPI', 'Spring', 'Node.js', 'PostgreSQL', 'MySQL', 'MongoDB',
+                'Redis', 'Kafka', 'AWS', 'Azure', 'GCP', 'Docker', 'Kubernetes', 'Terraform', 'Jenkins', 'Git',
+                'TensorFlow', 'PyTorch', 'pandas', 'scikit-learn', 'GraphQL', 'REST APIs', 'Linux']
+VERBS = ['Developed', 'Designed', 'Implemented', 'Led', 'Built', 'Optimized', 'Automated', 'Migrated',
+         'Reduced', 'Increased', 'Architected', 'Mentored', 'Launched', 'Streamlined', 'Delivered', 'Managed']
+OBJECTS = ['a payment processing service', 'the customer analytics pipeline', 'an internal deployment platform',
+           'real-time fraud detection', 'the search ranking system', 'a multi-tenant billing API',
+           'the mobile backend', 'data ingestion jobs', 'observability dashboards', 'the recommendation engine']
+OUTCOMES = ['cutting latency by {n}%', 'saving ${n}K per year', 'serving {n}M requests per day',
+            'improving conversion by {n}%', 'reducing incidents by {n}%', 'for a team of {n} engineers',
+            'shrinking build times by {n}%', 'supporting {n}K active users']
+DEGREES = ['Bachelor of Science in Computer Science', 'Master of Science in Software Engineering',
+           'Bachelor of Engineering in Electrical Engineering', 'Master of Science in Data Science']
+SCHOOLS = ['University of Washington', 'Georgia Institute of Technology', 'University of Toronto',
+           'Carnegie Mellon University', 'Technical University of Munich']
+CERTIFICATIONS = ['AWS Certified Solutions Architect', 'Certified Kubernetes Administrator',
+                  'Google Professional Data Engineer', 'Microsoft Azure Developer Associate']
+
+def _bullet(rng: random.Random) -> str:
+    outcome = rng.choice(OUTCOMES).format(n=rng.randint(5, 90))
+    tools = ', '.join(rng.sample(TECHNOLOGIES, 2))
+    return f"• {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {tools}, {outcome}."
+
+def _job_entry(rng: random.Random, end_year: int) -> List[str]:
+    start_year = end_year - rng.randint(1, 4)
+    lines = [f"{rng.choice(TITLES)} - {rng.choice(COMPANIES)}", f"{start_year} - {end_year}"]
+    return lines + [_bullet(rng) for _ in range(rng.randint(4, 7))]
+
+def generate_resume(pages: int, seed: int = 0) -> str:
+    """A plausible resume of about `pages` * PAGE_WORDS words; the same arguments give the same text.
+
+    Experience and project entries grow with the page count, so long resumes stress the
+    same detectors as real ones rather than repeating one paragraph.
+    """
+    rng = random.Random(f'resume-{pages}-{seed}')
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    header = [
+        name,
+        f"{name.split()[0].lower()}.{name.split()[1].lower()}@example.com | (555) 123-{rng.randint(1000, 9999)}",
+        f"linkedin.com/in/{name.replace(' ', '').lower()} | github.com/{name.split()[0].lower()}{seed}",
+        "",
+        "PROFESSIONAL SUMMARY",
+        f"Experienced {rng.choice(TITLES).lower()} with {rng.randint(3, 15)} years of experience building "
+        f"{rng.choice(OBJECTS)} and {rng.choice(OBJECTS)}. Passionate about reliable systems and mentoring.",
+        "",
+        "TECHNICAL SKILLS",
+        ', '.join(rng.sample(TECHNOLOGIES, 12)),
+        "",
+        "EDUCATION",
+        rng.choice(DEGREES),
+        f"{rng.choice(SCHOOLS)}, {rng.randint(2005, 2018)}, GPA {rng.randint(30, 40) / 10}",
+        "",
+        "CERTIFICATIONS",
+        *rng.sample(CERTIFICATIONS, 2),
+        "",
+        "PROFESSIONAL EXPERIENCE",
+    ]
+    experience: List[str] = []
+    projects: List[str] = []
+    year = 2025
+    positions = 0
+    target = pages * PAGE_WORDS
+    while len(' '.join(header + experience + projects).split()) < target:
+        experience += _job_entry(rng, year) + [""]
+        year -= rng.randint(1, 3)
+        positions += 1
+        # One project for every two positions keeps the sections in proportion
+        if positions % 2 == 0:
+            projects += [f"{rng.choice(OBJECTS).capitalize()} ({rng.choice(TECHNOLOGIES)})", _bullet(rng), ""]
+    return '\n'.join(header + experience + ["PROJECTS"] + projects).strip()
+
+def generate_job(seed: int = 0, level: str = 'senior') -> str:
+    """A job description of about a hundred words"""
+    rng = random.Random(f'job-{level}-{seed}')
+    required = rng.sample(TECHNOLOGIES, 6)
+    nice = rng.sample([tech for tech in TECHNOLOGIES if tech not in required], 4)
+    return '\n'.join([
+        f"{level.capitalize()} {rng.choice(TITLES)} at {rng.choice(COMPANIES)}",
+        "",
+        f"We are looking for a {level} engineer to own {rng.choice(OBJECTS)} and {rng.choice(OBJECTS)}.",
+        "You will work with product and data teams to ship features used by millions of people.",
+        "",
+        "Requirements:",
+        f"- {rng.randint(2, 8)}+ years of experience with {', '.join(required[:3])}",
+        f"- Production experience with {', '.join(required[3:])}",
+        "- Strong communication skills and experience mentoring other engineers",
+        "- Bachelor's degree in Computer Science or equivalent experience",
+        "",
+        "Nice to have:",
+        f"- Familiarity with {', '.join(nice)}",
+        "- Experience designing distributed systems and leading technical projects",
+    ])
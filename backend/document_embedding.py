@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Document Embedding
+Section- and sentence-aligned chunking of long documents, with pooled chunk vectors
+"""
+
+import re
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedding_store import embedding_similarity
+
+logger = logging.getLogger(__name__)
+
+# all-MiniLM-L6-v2 reads 256 word pieces; ~150 words stays inside that for typical resume text
+DEFAULT_CHUNK_WORDS = 150
+POOLING_METHODS = ('mean', 'max', 'attention')
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?;])\s+|\n+')
+
+class Chunk(NamedTuple):
+    text: str
+    section: Optional[str]
+    words: int
+
+def chunk_document(text: str, sections: Optional[Sequence[Tuple[str, int, int]]] = None,
+                   max_words: int = DEFAULT_CHUNK_WORDS) -> List[Chunk]:
+    """Chunks of at most `max_words` words that never cross a section boundary.
+
+    `sections` are (name, start_line, end_line) blocks, e.g. from detect_sections; lines
+    outside every block form unlabelled segments. Within a segment, sentences are packed
+    greedily and only a sentence longer than `max_words` is split mid-sentence. A short
+    document comes back as one chunk holding the whole text, so it encodes exactly as before.
+    """
+    if len(text.split()) <= max_words:
+        return [Chunk(text, None, len(text.split()))] if text.strip() else []
+    lines = text.split('\n')
+    labels: List[Optional[str]] = [None] * len(lines)
+    for name, start, end in sections or []:
+        for i in range(max(start, 0), min(end, len(lines) - 1) + 1):
+            labels[i] = name
+
+    chunks = []
+    segment_start = 0
+    for i in range(1, len(lines) + 1):
+        if i == len(lines) or labels[i] != labels[segment_start]:
+            chunks.extend(_pack('\n'.join(lines[segment_start:i]), labels[segment_start], max_words))
+            segment_start = i
+    return chunks
+
+def _pack(text: str, section: Optional[str], max_words: int) -> List[Chunk]:
+    chunks = []
+    current: List[str] = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        words = sentence.split()
+        while len(words) > max_words:  # One very long sentence: hard split
+            if current:
+                chunks.append(Chunk(' '.join(current), section, len(current)))
+                current = []
+            chunks.append(Chunk(' '.join(words[:max_words]), section, max_words))
+            words = words[max_words:]
+        if len(current) + len(words) > max_words:
+            chunks.append(Chunk(' '.join(current), section, len(current)))
+            current = []
+        current.extend(words)
+    if current:
+        chunks.append(Chunk(' '.join(current), section, len(current)))
+    return chunks
+
+def pool_vectors(vectors: np.ndarray, method: str = 'mean', weights: Optional[Sequence[float]] = None,
+                 query: Optional[np.ndarray] = None, temperature: float = 0.1) -> np.ndarray:
+    """One vector for a document from its chunk vectors.
+
+    mean:      word-count weighted average of the unit chunk vectors
+    max:       element-wise maximum
+    attention: softmax over each chunk's cosine with `query` (e.g. the other document), so
+               the chunks most relevant to it dominate; without a query, the mean is used
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    if len(unit) == 1:
+        return unit[0]
+    if method == 'max':
+        return unit.max(axis=0)
+    weights = np.ones(len(unit), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+    mean = (unit * weights[:, None]).sum(axis=0) / weights.sum()
+    if method == 'mean':
+        return mean
+    if method != 'attention':
+        raise ValueError(f"Unsupported pooling {method!r}; expected one of {POOLING_METHODS}")
+    query = mean if query is None else np.asarray(query, dtype=np.float32)
+    query = query / max(np.linalg.norm(query), 1e-12)
+    logits = unit @ query / temperature
+    attention = np.exp(logits - logits.max()) * weights
+    return (unit * (attention / attention.sum())[:, None]).sum(axis=0)
+
+async def chunked_similarity(store, scheduler, resume_chunks: List[Chunk], job_chunks: List[Chunk],
+                             method: str = 'mean') -> Tuple[float, Dict[str, float]]:
+    """Pooled cosine of two chunked documents, plus each resume section's cosine with the job.
+
+    Every chunk of both documents goes through one encode call, so the scheduler sees them
+    as a single batch and the store caches each chunk for the next request.
+    """
+    if not resume_chunks or not job_chunks:
+        return 0.0, {}
+    vectors = await store.encode_async(scheduler, [chunk.text for chunk in resume_chunks + job_chunks])
+    return pooled_similarity(resume_chunks, np.stack(vectors[:len(resume_chunks)]),
+                             job_chunks, np.stack(vectors[len(resume_chunks):]), method)
+
+def pooled_similarity(resume_chunks: List[Chunk], resume_vectors: np.ndarray, job_chunks: List[Chunk],
+                      job_vectors: np.ndarray, method: str = 'mean') -> Tuple[float, Dict[str, float]]:
+    """chunked_similarity for chunk vectors that are already encoded, one row per chunk"""
+    resume_weights = [chunk.words for chunk in resume_chunks]
+    job_weights = [chunk.words for chunk in job_chunks]
+
+    # Attention pooling looks at each document from the other one's mean
+    resume_mean = pool_vectors(resume_vectors, 'mean', resume_weights)
+    job_mean = pool_vectors(job_vectors, 'mean', job_weights)
+    resume_vector = pool_vectors(resume_vectors, method, resume_weights, query=job_mean)
+    job_vector = pool_vectors(job_vectors, method, job_weights, query=resume_mean)
+
+    section_similarity = {}
+    sections = {chunk.section for chunk in resume_chunks if chunk.section}
+    for section in sorted(sections):
+        rows = [i for i, chunk in enumerate(resume_chunks) if chunk.section == section]
+        section_vector = pool_vectors(resume_vectors[rows], 'mean', [resume_weights[i] for i in rows])
+        section_similarity[section] = embedding_similarity(section_vector, job_vector)
+    return embedding_similarity(resume_vector, job_vector), section_similarity
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Embedding Backend
+Interchangeable CPU inference backends for the sentence embedding model, with an fp32 parity check
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# torch: the fp32 SentenceTransformer; torch-int8: the same model with dynamically quantized
+# Linear layers; onnx: an exported model (see `export` below) run by ONNX Runtime, installed
+# with requirements-onnx.txt
+BACKENDS = ('torch', 'torch-int8', 'onnx')
+
+# Written next to an exported model so the ONNX backend pools and truncates like the original
+ONNX_CONFIG = 'embedding_backend.json'
+
+PARITY_TEXTS = [
+    "Senior Python developer with 8 years of experience building Django and FastAPI services on AWS",
+    "Led a team of five engineers and reduced deployment time by 40% with Kubernetes and Terraform",
+    "Frontend engineer: React, TypeScript, GraphQL and accessibility audits",
+    "BSc Computer Science, University of Washington, GPA 3.8",
+    "Data scientist using pandas, scikit-learn and PyTorch for churn prediction models",
+    "We are hiring a mid-level Java engineer to maintain Spring Boot microservices",
+    "Skills: SQL, PostgreSQL, Redis, Docker, CI/CD, Jenkins, Git",
+    "Volunteer tutor teaching programming fundamentals to high school students",
+]
+
+def backend_from_env() -> str:
+    """EMBEDDING_BACKEND, default torch"""
+    backend = os.environ.get('EMBEDDING_BACKEND', 'torch')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported embedding backend {backend!r}; expected one of {BACKENDS}")
+    return backend
+
+def model_id(backend: str, model_path: Optional[str] = None) -> str:
+    """Name that keys stored vectors: vectors from different backends or model files never mix"""
+    name = SENTENCE_MODEL_NAME if backend == 'torch' else f"{SENTENCE_MODEL_NAME}:{backend}"
+    return f"{name}:{model_digest(model_path)}" if model_path else name
+
+def model_digest(path: str) -> str:
+    """Short digest of a local model: its resolved path plus the name, size and modification time
+    of every file in its directory (the directory holding it, for a single .onnx file)"""
+    if not os.path.exists(path):
+        return hashlib.sha256(path.encode('utf-8')).hexdigest()[:12]  # A hub name
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path) if os.path.isfile(path) else path
+    digest = hashlib.sha256(path.encode('utf-8'))
+    for root, _, names in sorted(os.walk(directory)):
+        for name in sorted(names):
+            stat = os.stat(os.path.join(root, name))
+            relative = os.path.relpath(os.path.join(root, name), directory)
+            digest.update(f"\0{relative}\0{stat.st_size}\0{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+def load_backend(backend: str, model_path: Optional[str] = None) -> Any:
+    """An object with SentenceTransformer's encode(texts, batch_size=..., convert_to_numpy=True).
+
+    `model_path` is a local SentenceTransformer directory for the torch backends, or an
+    exported directory (or .onnx file inside one) for onnx; torch falls back to the hub name.
+    """
+    if backend == 'onnx':
+        if not model_path:
+            raise ValueError("The onnx embedding backend needs EMBEDDING_MODEL_PATH")
+        return OnnxEmbeddingModel(model_path)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported embedding backend {backend!r}; expected one of {BACKENDS}")
+    from sentence_transformers import SentenceTransformer
+    if backend == 'torch-int8':
+        # Quantized kernels are CPU-only
+        return quantize_dynamic(SentenceTransformer(model_path or SENTENCE_MODEL_NAME, device='cpu'))
+    return SentenceTransformer(model_path or SENTENCE_MODEL_NAME)
+
+def quantize_dynamic(model: Any) -> Any:
+    """int8 weights for every Linear layer; activations are quantized on the fly per batch"""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class OnnxEmbeddingModel:
+    """Exported transformer run by ONNX Runtime, with the original's mean pooling and normalization"""
+
+    def __init__(self, path: str, intra_op_threads: int = 0):
+        import onnxruntime
+        from transformers import AutoTokenizer
+        directory = os.path.dirname(path) if path.endswith('.onnx') else path
+        with open(os.path.join(directory, ONNX_CONFIG)) as f:
+            self.config = json.load(f)
+        model_file = path if path.endswith('.onnx') else os.path.join(directory, self.config['model_file'])
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=['CPUExecutionProvider'])
+        self.input_names = {entry.name for entry in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.max_seq_length = self.config['max_seq_length']
+        self.normalize = self.config['normalize']
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config['dimension']
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        output = np.zeros((len(texts), self.config['dimension']), dtype=np.float32)
+        # Length-sorted batches keep padding short, as SentenceTransformer does
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            output[rows] = self._encode_batch([texts[row] for row in rows])
+        return output
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors='np')
+        feed = {name: tokens[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(None, feed)[0]
+        mask = tokens['attention_mask'][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+def _HiddenStates(auto_model: Any, input_names: List[str]) -> Any:
+    """Positional-input wrapper returning last_hidden_state, whatever the model's forward signature"""
+    import torch
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    return HiddenStates()
+
+def export_onnx(model: Any, output_dir: str, quantize: bool = False, opset: int = 17) -> str:
+    """Write model.onnx (and model.int8.onnx with `quantize`), the tokenizer and the pooling config.
+
+    Only the transformer is exported; pooling and normalization are read from the
+    SentenceTransformer's modules and redone in numpy, which keeps the graph small.
+    """
+    import torch
+    transformer = model[0]
+    pooling = [module for module in model if type(module).__name__ == 'Pooling']
+    if pooling and not getattr(pooling[0], 'pooling_mode_mean_tokens', True):
+        raise ValueError("Only mean-pooled models can be exported")
+    os.makedirs(output_dir, exist_ok=True)
+    transformer.tokenizer.save_pretrained(output_dir)
+
+    sample = transformer.tokenizer(["an example sentence"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+    model_file = os.path.join(output_dir, 'model.onnx')
+    with torch.no_grad():
+        torch.onnx.export(
+            _HiddenStates(transformer.auto_model.eval(), input_names), tuple(sample[name] for name in input_names),
+            model_file, input_names=input_names, output_names=['last_hidden_state'], dynamic_axes=dynamic_axes,
+            opset_version=opset, dynamo=False
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic as quantize_onnx
+        quantize_onnx(model_file, os.path.join(output_dir, 'model.int8.onnx'), weight_type=QuantType.QInt8)
+
+    config = {
+        'model_file': 'model.int8.onnx' if quantize else 'model.onnx',
+        'dimension': model.get_sentence_embedding_dimension(),
+        'max_seq_length': model.max_seq_length,
+        'normalize': any(type(module).__name__ == 'Normalize' for module in model)
+    }
+    with open(os.path.join(output_dir, ONNX_CONFIG), 'w') as f:
+        json.dump(config, f, indent=2)
+    return os.path.join(output_dir, config['model_file'])
+
+def _throughput(model: Any, texts: Sequence[str], batch_size: int) -> Dict[str, Any]:
+    model.encode(texts[:batch_size], batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)  # Warm-up
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return {'vectors': vectors, 'texts_per_second': len(texts) / max(time.perf_counter() - start, 1e-9)}
+
+def parity_report(reference: Any, candidate: Any, texts: Sequence[str], batch_size: int = 32) -> Dict[str, float]:
+    """Cosine drift (1 - cosine) of the candidate's vectors against the fp32 reference, plus throughput"""
+    expected = _throughput(reference, texts, batch_size)
+    actual = _throughput(candidate, texts, batch_size)
+    a = expected['vectors'] / np.maximum(np.linalg.norm(expected['vectors'], axis=1, keepdims=True), 1e-12)
+    b = actual['vectors'] / np.maximum(np.linalg.norm(actual['vectors'], axis=1, keepdims=True), 1e-12)
+    drift = np.clip(1.0 - (a * b).sum(axis=1), 0.0, None)
+    return {
+        'texts': len(texts),
+        'mean_drift': float(drift.mean()),
+        'p99_drift': float(np.percentile(drift, 99)),
+        'max_drift': float(drift.max()),
+        'reference_texts_per_second': round(expected['texts_per_second'], 1),
+        'candidate_texts_per_second': round(actual['texts_per_second'], 1),
+        'speedup': round(actual['texts_per_second'] / expected['texts_per_second'], 2)
+    }
+
+def read_texts(paths: Iterable[str]) -> List[str]:
+    """Texts from .jsonl/.ndjson records (resume, job, description or text fields) or one per line of a text file"""
+    fields = ('resume', 'job', 'description', 'text')
+    texts = []
+    for path in paths:
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if path.endswith(('.jsonl', '.ndjson')):
+                    record = json.loads(line)
+                    texts.extend(record[field] for field in fields if isinstance(record.get(field), str))
+                else:
+                    texts.append(line.strip())
+    return texts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model or check a backend against fp32")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="Export the model to ONNX for EMBEDDING_BACKEND=onnx")
+    export.add_argument('--output', required=True)
+    export.add_argument('--model', default=SENTENCE_MODEL_NAME, help="Hub name or local SentenceTransformer directory")
+    export.add_argument('--quantize', action='store_true', help="Also write a dynamically quantized int8 model")
+    parity = commands.add_parser('parity', help="Report cosine drift against the fp32 torch model")
+    parity.add_argument('--backend', choices=BACKENDS[1:], required=True)
+    parity.add_argument('--model-path', help="Local model for the candidate backend")
+    parity.add_argument('--reference', default=SENTENCE_MODEL_NAME, help="Hub name or local directory of the fp32 model")
+    parity.add_argument('--texts', nargs='*', default=[], help="Text or .jsonl files; built-in samples if omitted")
+    parity.add_argument('--batch-size', type=int, default=32)
+    parity.add_argument('--max-drift', type=float, default=0.01, help="Fail when the mean drift exceeds this")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'export':
+        reference_model = load_backend('torch', args.model)
+        logger.info(f"Exported {args.model} -> {export_onnx(reference_model, args.output, quantize=args.quantize)}")
+    else:
+        report = parity_report(load_backend('torch', args.reference),
+                               load_backend(args.backend, args.model_path or args.reference),
+                               read_texts(args.texts) or PARITY_TEXTS, batch_size=args.batch_size)
+        print(json.dumps(report, indent=2))
+        if report['mean_drift'] > args.max_drift:
+            sys.exit(f"Mean cosine drift {report['mean_drift']:.5f} exceeds {args.max_drift}")
@@ -1,35 +1,42 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer, util
 import numpy as np
 import re
 import json
-import requests
-from typing import List, Dict, Any, Optional
-import spacy
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+import os
+import sys
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+from pattern_engine import KeywordMatcher
+from result_cache import ResultCache, content_hash
+from tfidf_model import clean_text, pair_similarity
+from embedding_store import embedding_similarity, store_from_env
+from encode_scheduler import EncodeScheduler
+from stage_pool import StagePool
+from llm_client import OllamaClient
+from model_registry import EMBEDDING_MODEL_ID, models, preload_enabled
+from job_feature_store import JobFeatures, JobFeatureStore
+from document_embedding import DEFAULT_CHUNK_WORDS, chunk_document, chunked_similarity
 
 app = FastAPI(title="Resume Analysis Hybrid Service")
 
-# Initialize models
-model = SentenceTransformer('all-MiniLM-L6-v2')
-nlp = spacy.load("en_core_web_sm")  # You'll need to install this: python -m spacy download en_core_web_sm
+# Models this service needs; loaded on first use or preloaded in parallel at startup, never at import
+REQUIRED_MODELS = ['sentence_transformer', 'spacy', 'stopwords', 'tfidf']
+
+# Bump whenever job-side feature extraction changes so stored job features are recomputed
+JOB_FEATURES_VERSION = f"1:{EMBEDDING_MODEL_ID}"
+
+# spaCy batching: texts per nlp.pipe batch, and worker processes for bulk job feature refreshes
+SPACY_BATCH_SIZE = int(os.environ.get('SPACY_BATCH_SIZE', '32'))
+SPACY_N_PROCESS = int(os.environ.get('SPACY_N_PROCESS', '1'))
+
+# 'chunked' embeds long documents in sentence-aligned chunks and pools the chunk vectors
+# (mean, max or attention); 'truncate' encodes each text whole, cut off by the model at 256 tokens
+EMBEDDING_MODE = os.environ.get('EMBEDDING_MODE', 'truncate')
+EMBEDDING_POOLING = os.environ.get('EMBEDDING_POOLING', 'mean')
+EMBEDDING_CHUNK_WORDS = int(os.environ.get('EMBEDDING_CHUNK_WORDS', str(DEFAULT_CHUNK_WORDS)))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -49,9 +56,17 @@ class AnalysisResponse(BaseModel):
     improvement_suggestions: List[str]
     overall_score: float
 
+class JobPosting(BaseModel):
+    id: str
+    description: str
+
+class JobFeaturesRequest(BaseModel):
+    """Postings to precompute features for; unchanged postings are skipped"""
+    jobs: List[JobPosting]
+
 class HybridAnalyzer:
     def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
+        self.llm_client = OllamaClient.from_env(timeout=30)
         self.technical_keywords = {
             'programming': ['python', 'javascript', 'java', 'c++', 'c#', 'go', 'rust', 'php', 'ruby', 'swift', 'kotlin'],
             'frameworks': ['react', 'angular', 'vue', 'django', 'flask', 'express', 'spring', 'laravel', 'rails'],
@@ -60,60 +75,88 @@ class HybridAnalyzer:
             'ml_ai': ['tensorflow', 'pytorch', 'scikit-learn', 'pandas', 'numpy', 'matplotlib', 'opencv'],
             'tools': ['git', 'jira', 'confluence', 'slack', 'figma', 'postman', 'swagger']
         }
+        
+        # Whole-word dictionary matcher over the taxonomy, built once
+        self.keyword_matcher = KeywordMatcher()
+        for category, keywords in self.technical_keywords.items():
+            self.keyword_matcher.add_terms(category, keywords)
+        self.keyword_matcher.compile()
+        
+        # Job TF-IDF rows, keyed by the cleaned job text
+        self.job_tfidf_cache = ResultCache('job_tfidf', max_bytes=16 * 1024 * 1024, ttl_seconds=None)
+    
+    @property
+    def stop_words(self) -> set:
+        """NLTK English stopwords, loaded on first use"""
+        return models.get('stopwords')
     
     def extract_keywords(self, text: str) -> Dict[str, List[str]]:
         """Extract technical keywords from text"""
-        text_lower = text.lower()
+        found_ids = {(hit.category, hit.pattern_id) for hit in self.keyword_matcher.find(text)}
         extracted_keywords = {}
         
         for category, keywords in self.technical_keywords.items():
-            found_keywords = [kw for kw in keywords if kw in text_lower]
+            found_keywords = [kw for i, kw in enumerate(keywords) if (category, i) in found_ids]
             if found_keywords:
                 extracted_keywords[category] = found_keywords
         
         return extracted_keywords
     
-    def calculate_keyword_similarity(self, resume_text: str, job_text: str) -> float:
+    @staticmethod
+    def clean_text(text: str) -> str:
+        """Lowercased text without punctuation, as fed to TF-IDF"""
+        return clean_text(text)
+    
+    def calculate_keyword_similarity(self, resume_text: str, job_text: str, job_clean: Optional[str] = None) -> float:
         """Calculate keyword-based similarity using TF-IDF"""
         try:
-            # Clean and prepare texts
-            resume_clean = re.sub(r'[^\w\s]', '', resume_text.lower())
-            job_clean = re.sub(r'[^\w\s]', '', job_text.lower())
+            # Clean and prepare texts (the job may come pre-cleaned from the feature store)
+            resume_clean = self.clean_text(resume_text)
+            if job_clean is None:
+                job_clean = self.clean_text(job_text)
             
-            # Create TF-IDF vectors
-            vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
-            tfidf_matrix = vectorizer.fit_transform([resume_clean, job_clean])
+            tfidf = models.get('tfidf')
+            if not tfidf.fitted:
+                # No corpus IDF yet: weigh terms by the two documents alone, as before the model existed
+                return pair_similarity(resume_clean, job_clean)
             
-            # Calculate cosine similarity
-            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-            return float(similarity)
+            # Transform with the corpus-fitted IDF; job rows are reused across requests
+            resume_vector = tfidf.transform([resume_clean])
+            job_vector = self.job_tfidf_cache.get_or_compute(content_hash(job_clean), lambda: tfidf.transform([job_clean]))
+            
+            # Cosine of normalized rows is their sparse dot product
+            return tfidf.similarity(resume_vector, job_vector)
         except Exception as e:
             logger.error(f"Error in keyword similarity: {e}")
             return 0.0
     
     def extract_skills_and_experience(self, text: str) -> Dict[str, Any]:
         """Extract skills and experience using NLP"""
-        doc = nlp(text)
-        
-        # Extract skills (noun phrases that might be skills)
-        skills = []
-        for chunk in doc.noun_chunks:
-            if len(chunk.text.split()) <= 3:  # Skills are usually 1-3 words
-                skills.append(chunk.text.lower())
-        
-        # Extract experience indicators
-        experience_indicators = ['years', 'experience', 'worked', 'developed', 'implemented', 'managed']
-        experience_score = sum(1 for word in text.lower().split() if word in experience_indicators)
-        
-        return {
-            'skills': list(set(skills)),
-            'experience_score': experience_score
-        }
+        return self.extract_skills_and_experience_batch([text])[0]
+    
+    def extract_skills_and_experience_batch(self, texts: List[str], n_process: int = 1) -> List[Dict[str, Any]]:
+        """Skills and experience for several texts, parsed together through nlp.pipe"""
+        docs = models.get('spacy').pipe(texts, batch_size=SPACY_BATCH_SIZE, n_process=n_process)
+        results = []
+        for text, doc in zip(texts, docs):
+            # Extract skills (noun phrases that might be skills)
+            skills = []
+            for chunk in doc.noun_chunks:
+                if len(chunk.text.split()) <= 3:  # Skills are usually 1-3 words
+                    skills.append(chunk.text.lower())
+            
+            # Extract experience indicators
+            experience_indicators = ['years', 'experience', 'worked', 'developed', 'implemented', 'managed']
+            experience_score = sum(1 for word in text.lower().split() if word in experience_indicators)
+            
+            results.append({
+                'skills': list(set(skills)),
+                'experience_score': experience_score
+            })
+        return results
     
     def analyze_job_level_fit(self, resume_text: str, job_level: str) -> Dict[str, Any]:
         """Analyze how well the resume fits the job level"""
-        doc = nlp(resume_text.lower())
-        
         # Keywords for different levels
         level_keywords = {
             'entry': ['entry', 'junior', 'graduate', 'intern', '0-1', '1 year'],
@@ -138,31 +181,26 @@ class HybridAnalyzer:
         }
     
     def call_ollama_llm(self, prompt: str) -> str:
-        """Call Ollama LLM for advanced analysis"""
-        try:
-            # Using Ollama with a free model (you need to have Ollama running locally)
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": "llama2",  # or "mistral" or "codellama"
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json().get('response', '')
-            else:
-                logger.warning(f"Ollama request failed: {response.status_code}")
-                return ""
-        except Exception as e:
-            logger.error(f"Error calling Ollama: {e}")
-            return ""
+        """Call Ollama from synchronous code through the same pooled client; not for use on an event loop"""
+        return asyncio.run(self.llm_client.generate(prompt))
     
+    async def call_ollama_llm_async(self, prompt: str) -> str:
+        """Call Ollama through the pooled async client (cached, deduplicated, circuit-broken)"""
+        return await self.llm_client.generate(prompt)
+
     def generate_llm_insights(self, resume_text: str, job_text: str, job_level: str) -> Dict[str, Any]:
         """Generate insights using LLM"""
-        prompt = f"""
+        prompt = self._llm_prompt(resume_text, job_text, job_level)
+        return self._parse_llm_insights(self.call_ollama_llm(prompt))
+    
+    async def generate_llm_insights_async(self, resume_text: str, job_text: str, job_level: str) -> Dict[str, Any]:
+        """Generate insights using LLM without blocking the event loop"""
+        prompt = self._llm_prompt(resume_text, job_text, job_level)
+        return self._parse_llm_insights(await self.call_ollama_llm_async(prompt))
+    
+    def _llm_prompt(self, resume_text: str, job_text: str, job_level: str) -> str:
+        """Build the insights prompt"""
+        return f"""
         Analyze this resume against the job description and provide insights:
         
         Resume: {resume_text[:1000]}
@@ -178,9 +216,9 @@ class HybridAnalyzer:
         
         Format as JSON only.
         """
-        
-        llm_response = self.call_ollama_llm(prompt)
-        
+    
+    def _parse_llm_insights(self, llm_response: str) -> Dict[str, Any]:
+        """Extract the JSON insights from an LLM response"""
         try:
             # Try to extract JSON from response
             json_match = re.search(r'\{.*\}', llm_response, re.DOTALL)
@@ -203,34 +241,100 @@ class HybridAnalyzer:
                 'overall_assessment': 'LLM analysis not available'
             }
 
+
 analyzer = HybridAnalyzer()
 
+# Per-text embeddings shared with other workers through a memory-mapped file
+embedding_store = store_from_env(EMBEDDING_MODEL_ID)
+
+# Encodes from concurrent requests are batched on a worker thread, off the event loop
+encode_scheduler = EncodeScheduler.from_env(loader=lambda: models.get('sentence_transformer'))
+
+# CPU-bound stages run here so the event loop keeps serving other requests
+stage_pool = StagePool.from_env()
+
+# Job-side features precomputed through /jobs, so scoring a known posting only does resume-side work
+job_features = JobFeatureStore.from_env('job_features.sqlite3', version=JOB_FEATURES_VERSION)
+
+def compute_job_features(jobs: List[Tuple[str, str]]) -> List[JobFeatures]:
+    """Embedding, keywords, spaCy skills and cleaned text for (job id, text) pairs"""
+    texts = [text for _, text in jobs]
+    embeddings = embedding_store.encode(encode_scheduler, texts)
+    if EMBEDDING_MODE == 'chunked':
+        # Chunked scoring reads the job's chunk vectors from the store
+        embedding_store.encode(encode_scheduler, [chunk.text for text in texts for chunk in chunk_document(text, None, EMBEDDING_CHUNK_WORDS)])
+    skills = analyzer.extract_skills_and_experience_batch(texts, n_process=SPACY_N_PROCESS if len(texts) > 1 else 1)
+    return [
+        JobFeatures(
+            job_id=job_id,
+            content_hash=job_features.hash_for(text),
+            normalized_text=analyzer.clean_text(text),
+            embedding=embedding,
+            keywords=analyzer.extract_keywords(text),
+            skills=job_skills
+        )
+        for (job_id, text), embedding, job_skills in zip(jobs, embeddings, skills)
+    ]
+
+def keyword_stage(resume_text: str, job_text: str,
+                  features: Optional[JobFeatures] = None) -> Tuple[float, Dict[str, List[str]], Dict[str, List[str]]]:
+    """TF-IDF similarity and keyword extraction for both texts"""
+    if features is not None:
+        keyword_similarity = analyzer.calculate_keyword_similarity(resume_text, job_text, job_clean=features.normalized_text)
+        return keyword_similarity, analyzer.extract_keywords(resume_text), features.keywords
+    keyword_similarity = analyzer.calculate_keyword_similarity(resume_text, job_text)
+    return keyword_similarity, analyzer.extract_keywords(resume_text), analyzer.extract_keywords(job_text)
+
+def spacy_stage(resume_text: str, job_text: str, job_level: str,
+                features: Optional[JobFeatures] = None) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """spaCy skills for both texts (one nlp.pipe call) and job level fit, kept on one thread per request"""
+    if features is not None:
+        resume_skills, = analyzer.extract_skills_and_experience_batch([resume_text])
+        job_skills = features.skills
+    else:
+        resume_skills, job_skills = analyzer.extract_skills_and_experience_batch([resume_text, job_text])
+    return resume_skills, job_skills, analyzer.analyze_job_level_fit(resume_text, job_level)
+
+async def semantic_similarity_stage(resume_text: str, job_text: str, features: Optional[JobFeatures] = None) -> float:
+    if EMBEDDING_MODE == 'chunked':
+        similarity, _ = await chunked_similarity(
+            embedding_store, encode_scheduler, chunk_document(resume_text, None, EMBEDDING_CHUNK_WORDS),
+            chunk_document(job_text, None, EMBEDDING_CHUNK_WORDS), EMBEDDING_POOLING
+        )
+        return similarity
+    if features is not None and features.embedding is not None:
+        resume_emb, = await embedding_store.encode_async(encode_scheduler, [resume_text])
+        return embedding_similarity(resume_emb, features.embedding)
+    resume_emb, job_emb = await embedding_store.encode_async(encode_scheduler, [resume_text, job_text])
+    return embedding_similarity(resume_emb, job_emb)
+
 @app.post('/analyze', response_model=AnalysisResponse)
 async def analyze(request: AnalysisRequest):
     try:
         logger.info(f"Starting analysis for job level: {request.jobLevel}")
         
-        # 1. Semantic similarity using embeddings
-        resume_emb = model.encode(request.resume, convert_to_tensor=True)
-        job_emb = model.encode(request.job, convert_to_tensor=True)
-        semantic_similarity = util.pytorch_cos_sim(resume_emb, job_emb).item()
+        # Postings registered through /jobs skip all job-side work
+        features = await stage_pool.run(job_features.get_by_text, request.job)
         
-        # 2. Keyword-based similarity
-        keyword_similarity = analyzer.calculate_keyword_similarity(request.resume, request.job)
+        # Independent stages run concurrently: keyword and spaCy work on the stage pool,
+        # embeddings on the encode scheduler and the LLM call over async HTTP
+        keyword_results, spacy_results, semantic_similarity, llm_insights = await asyncio.gather(
+            stage_pool.run(keyword_stage, request.resume, request.job, features),
+            stage_pool.run(spacy_stage, request.resume, request.job, request.jobLevel, features),
+            semantic_similarity_stage(request.resume, request.job, features),
+            analyzer.generate_llm_insights_async(request.resume, request.job, request.jobLevel)
+        )
         
+        # 1. Semantic similarity using embeddings
+        # 2. Keyword-based similarity
         # 3. Extract keywords and skills
-        resume_keywords = analyzer.extract_keywords(request.resume)
-        job_keywords = analyzer.extract_keywords(request.job)
+        keyword_similarity, resume_keywords, job_keywords = keyword_results
         
         # 4. Skills and experience analysis
-        resume_skills = analyzer.extract_skills_and_experience(request.resume)
-        job_skills = analyzer.extract_skills_and_experience(request.job)
-        
         # 5. Job level analysis
-        level_analysis = analyzer.analyze_job_level_fit(request.resume, request.jobLevel)
+        resume_skills, job_skills, level_analysis = spacy_results
         
-        # 6. LLM insights (if available)
-        llm_insights = analyzer.generate_llm_insights(request.resume, request.job, request.jobLevel)
+        # 6. LLM insights (if available) were gathered above
         
         # 7. Calculate skill gap
         resume_skill_set = set(resume_skills['skills'])
@@ -291,10 +395,56 @@ async def analyze(request: AnalysisRequest):
         logger.error(f"Analysis error: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.post('/jobs')
+async def refresh_job_features(request: JobFeaturesRequest):
+    """Precompute and persist features for new or edited postings"""
+    try:
+        counts = await stage_pool.run(
+            job_features.refresh, [(job.id, job.description) for job in request.jobs], compute_job_features
+        )
+    except Exception as e:
+        logger.error(f"Job feature refresh failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Job feature refresh failed: {str(e)}")
+    return {**counts, "stored_jobs": len(job_features)}
+
+@app.delete('/jobs/{job_id}')
+async def remove_job_features(job_id: str):
+    if not job_features.remove(job_id):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} has no stored features")
+    return {"removed": job_id, "stored_jobs": len(job_features)}
+
+def before_fork() -> None:
+    """Load models once in a pre-fork parent (see prefork_server.py)"""
+    for name in REQUIRED_MODELS:
+        models.get_optional(name)
+    analyzer.extract_keywords("Python developer with Docker and AWS experience")
+
+def after_fork() -> None:
+    """Give a forked worker its own threads and connections; models stay shared"""
+    encode_scheduler.after_fork()
+    stage_pool.after_fork()
+    job_features.after_fork()
+    analyzer.llm_client.after_fork()
+
+@app.on_event('startup')
+async def preload_models():
+    if preload_enabled():
+        models.preload(REQUIRED_MODELS)
+
 @app.get('/health')
 async def health_check():
-    return {"status": "healthy", "service": "hybrid-resume-analyzer"}
+    return {
+        "status": "healthy",
+        "service": "hybrid-resume-analyzer",
+        "ready": models.is_ready(REQUIRED_MODELS),
+        "models": models.status(REQUIRED_MODELS)
+    }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001) 
\ No newline at end of file
+    workers = int(os.environ.get('WEB_WORKERS', '1'))
+    if workers > 1:
+        from prefork_server import PreforkServer
+        PreforkServer(sys.modules[__name__], host="0.0.0.0", port=8001, workers=workers).run()
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Embedding Store
+Memory-mapped per-text embedding vectors keyed by normalized-text hash, with an in-process LRU front
+"""
+
+import os
+import json
+import hashlib
+import threading
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from result_cache import ResultCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single writer only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+KEY_BYTES = 16
+ROW_BYTES = 8
+INDEX_RECORD = KEY_BYTES + ROW_BYTES
+SUPPORTED_DTYPES = ('float32', 'float16')
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace; the tokenizer ignores it, so vectors are unchanged"""
+    return ' '.join(text.split())
+
+def text_key(text: str) -> bytes:
+    """Hash of the normalized text used as the store key"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).digest()[:KEY_BYTES]
+
+def embedding_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Cosine of two vectors, computed in float32 like sentence_transformers.util.cos_sim"""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    a = a / max(np.linalg.norm(a), 1e-12)
+    b = b / max(np.linalg.norm(b), 1e-12)
+    return float(np.dot(a, b))
+
+def store_from_env(model_name: str) -> 'EmbeddingStore':
+    """Store configured by EMBEDDING_STORE_PATH, EMBEDDING_STORE_DTYPE and EMBEDDING_STORE_READONLY"""
+    default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'embedding_store')
+    return EmbeddingStore(
+        os.environ.get('EMBEDDING_STORE_PATH', default_path),
+        model_name,
+        dtype=os.environ.get('EMBEDDING_STORE_DTYPE', 'float32'),
+        readonly=os.environ.get('EMBEDDING_STORE_READONLY', '0') == '1',
+        memory_cache_mb=int(os.environ.get('EMBEDDING_CACHE_MAX_MB', '32'))
+    )
+
+class EmbeddingStore:
+    """Append-only vector file shared across processes, read through np.memmap.
+
+    Layout of the store directory:
+      meta.json    model name, dimension and dtype; a mismatch refuses to open
+      vectors.bin  one row of `dim` values per text
+      index.bin    (16-byte text key, 8-byte row) records, appended after the row is written
+
+    Writers append under an exclusive flock, so any record a reader sees points at a
+    complete row. Read-only stores (e.g. every uvicorn worker but one) never write and
+    pick up rows appended by others on their next miss.
+    """
+
+    def __init__(self, path: str, model_name: str, dim: Optional[int] = None, dtype: str = 'float32',
+                 readonly: bool = False, memory_cache_mb: int = 32):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype {dtype!r}; expected one of {SUPPORTED_DTYPES}")
+        self.path = path
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.readonly = readonly
+        self.memory = ResultCache('embeddings', max_bytes=memory_cache_mb * 1024 * 1024, ttl_seconds=None)
+        self._index: Dict[bytes, int] = {}
+        self._index_offset = 0
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self.store_hits = 0
+        self.encoded = 0
+
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        self._load_meta()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, 'vectors.bin')
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, 'index.bin')
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, 'meta.json')
+
+    def _load_meta(self) -> None:
+        """Check an existing store matches this model, or record the configuration"""
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta['model'] != self.model_name or meta['dtype'] != self.dtype.name or \
+                    (self.dim is not None and meta['dim'] != self.dim):
+                raise ValueError(f"Embedding store at {self.path} holds {meta}, not {self.model_name}/{self.dtype.name}")
+            self.dim = meta['dim']
+        elif self.dim is not None and not self.readonly:
+            self._write_meta()
+
+    def _write_meta(self) -> None:
+        tmp_path = self._meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'model': self.model_name, 'dim': self.dim, 'dtype': self.dtype.name}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _refresh_index(self) -> None:
+        """Read index records appended since the last refresh"""
+        try:
+            with open(self._index_path, 'rb') as f:
+                f.seek(self._index_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        usable = len(data) - len(data) % INDEX_RECORD  # Ignore a record still being written
+        for offset in range(0, usable, INDEX_RECORD):
+            record = data[offset:offset + INDEX_RECORD]
+            self._index[record[:KEY_BYTES]] = int.from_bytes(record[KEY_BYTES:], 'little')
+        self._index_offset += usable
+
+    def _row(self, row: int) -> np.ndarray:
+        """Row as an owned float32 vector, remapping when the file has grown"""
+        if self._vectors is None or row >= self._vectors.shape[0]:
+            rows = os.path.getsize(self._vectors_path) // (self.dim * self.dtype.itemsize)
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode='r', shape=(rows, self.dim))
+        return np.array(self._vectors[row], dtype=np.float32)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Stored vector for the text, or None"""
+        key = text_key(text)
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+        with self._lock:
+            row = self._index.get(key)
+            if row is None:
+                self._refresh_index()
+                row = self._index.get(key)
+            if row is None:
+                return None
+            if self.dim is None:
+                self._load_meta()
+            vector = self._row(row)
+            self.store_hits += 1
+        self.memory.put(key, vector)
+        return vector
+
+    def put(self, text: str, vector: np.ndarray) -> None:
+        """Persist a vector (read-only stores keep it in memory only)"""
+        key = text_key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        self.memory.put(key, vector)
+        if self.readonly:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = vector.shape[-1]
+                self._write_meta()
+            elif vector.shape[-1] != self.dim:
+                raise ValueError(f"Expected a {self.dim}-dimensional vector, got {vector.shape[-1]}")
+            with open(os.path.join(self.path, '.lock'), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._refresh_index()
+                if key in self._index:
+                    return
+                row_size = self.dim * self.dtype.itemsize
+                with open(self._vectors_path, 'ab') as f:
+                    row, partial = divmod(f.tell(), row_size)
+                    if partial:  # Drop a row left half-written by a crashed writer
+                        f.truncate(row * row_size)
+                    f.write(vector.astype(self.dtype).tobytes())
+                with open(self._index_path, 'ab') as f:
+                    records = f.tell() // INDEX_RECORD
+                    f.truncate(records * INDEX_RECORD)
+                    f.write(key + row.to_bytes(ROW_BYTES, 'little'))
+                self._index[key] = row
+                self._index_offset = (records + 1) * INDEX_RECORD
+
+    def encode(self, model, texts: Sequence[str]) -> List[np.ndarray]:
+        """Vectors for the texts, running one model.encode over the distinct misses"""
+        vectors, missing = self._lookup(texts)
+        if missing:
+            encoded = model.encode([texts[indexes[0]] for indexes in missing], convert_to_numpy=True)
+            self._fill(texts, vectors, missing, encoded)
+        return vectors
+
+    async def encode_async(self, scheduler, texts: Sequence[str]) -> List[np.ndarray]:
+        """Like encode, but misses go through an EncodeScheduler without blocking the event loop"""
+        vectors, missing = self._lookup(texts)
+        if missing:
+            encoded = await scheduler.encode_async([texts[indexes[0]] for indexes in missing])
+            self._fill(texts, vectors, missing, encoded)
+        return vectors
+
+    def _lookup(self, texts: Sequence[str]) -> Tuple[List[Optional[np.ndarray]], List[List[int]]]:
+        """Stored vectors, plus the positions of each distinct missing text"""
+        vectors = [self.get(text) for text in texts]
+        missing: Dict[str, List[int]] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(normalize_text(texts[i]), []).append(i)
+        return vectors, list(missing.values())
+
+    def _fill(self, texts: Sequence[str], vectors: List[Optional[np.ndarray]], missing: List[List[int]],
+              encoded: Sequence[np.ndarray]) -> None:
+        self.encoded += len(missing)
+        for indexes, vector in zip(missing, encoded):
+            vector = np.asarray(vector, dtype=np.float32)
+            self.put(texts[indexes[0]], vector)
+            for i in indexes:
+                vectors[i] = vector
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh_index()
+            return len(self._index)
+
+    def stats(self) -> Dict[str, int]:
+        """Memory front, store and model encode counters"""
+        memory_stats = self.memory.stats()
+        return {
+            'memory_hits': memory_stats['hits'],
+            'store_hits': self.store_hits,
+            'encoded': self.encoded,
+            'stored_vectors': len(self),
+            'memory_bytes': memory_stats['bytes']
+        }
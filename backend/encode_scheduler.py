@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Encode Scheduler
+Micro-batches SentenceTransformer encodes from concurrent requests on a dedicated worker thread
+"""
+
+import os
+import time
+import queue
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class EncodeScheduler:
+    """Collects texts for up to `window_ms` or `max_batch_size` texts, then runs one model.encode.
+
+    Every caller gets a future resolved with its own vector; identical texts queued in the
+    same window are encoded once. The worker thread starts on first use; with a `loader`
+    instead of a model, the model is resolved by the worker when the first batch runs.
+    """
+
+    def __init__(self, model=None, max_batch_size: int = 32, window_ms: float = 5.0,
+                 loader: Optional[Callable[[], Any]] = None):
+        self.model = model
+        self.loader = loader
+        self.max_batch_size = max_batch_size
+        self.window_seconds = window_ms / 1000
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+
+    @classmethod
+    def from_env(cls, model=None, loader: Optional[Callable[[], Any]] = None) -> 'EncodeScheduler':
+        """Scheduler configured by ENCODE_MAX_BATCH_SIZE and ENCODE_BATCH_WINDOW_MS"""
+        return cls(
+            model,
+            max_batch_size=int(os.environ.get('ENCODE_MAX_BATCH_SIZE', '32')),
+            window_ms=float(os.environ.get('ENCODE_BATCH_WINDOW_MS', '5')),
+            loader=loader
+        )
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the future resolves to its float32 vector"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, texts: Sequence[str], **kwargs) -> np.ndarray:
+        """Blocking encode through the batcher, shaped like model.encode(..., convert_to_numpy=True)"""
+        futures = [self.submit(text) for text in texts]
+        return np.stack([future.result() for future in futures])
+
+    async def encode_async(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """Encode without blocking the event loop"""
+        futures = [asyncio.wrap_future(self.submit(text)) for text in texts]
+        return list(await asyncio.gather(*futures))
+
+    def close(self) -> None:
+        """Finish queued work and stop the worker thread"""
+        if self._thread is not None:
+            self._queue.put((None, _STOP))
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='encode-scheduler', daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            text, future = self._queue.get()
+            if future is _STOP:
+                return
+            batch: Dict[str, List[Future]] = {text: [future]}
+            deadline = time.monotonic() + self.window_seconds
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    text, future = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if future is _STOP:
+                    stop = True
+                    break
+                batch.setdefault(text, []).append(future)
+            self._encode_batch(batch)
+            if stop:
+                return
+
+    def _encode_batch(self, batch: Dict[str, List[Future]]) -> None:
+        # Skip texts whose callers have all gone away (e.g. a cancelled request)
+        live = {
+            text: [future for future in futures if future.set_running_or_notify_cancel()]
+            for text, futures in batch.items()
+        }
+        live = {text: futures for text, futures in live.items() if futures}
+        if not live:
+            return
+        texts = list(live)
+        try:
+            model = self.model if self.model is not None else self.loader()
+            vectors = model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+        except Exception as e:
+            logger.error(f"Batched encode of {len(texts)} texts failed: {e}")
+            for futures in live.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.texts += len(texts)
+        self.largest_batch = max(self.largest_batch, len(texts))
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            for future in live[text]:
+                future.set_result(vector)
+
+    def after_fork(self) -> None:
+        """Forget the parent's queue and worker thread; the child starts its own on first use"""
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch counters since start"""
+        return {
+            'batches': self.batches,
+            'texts': self.texts,
+            'mean_batch_size': self.texts / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'queued': self._queue.qsize()
+        }
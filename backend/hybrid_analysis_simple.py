@@ -4,18 +4,36 @@ Improved Hybrid Resume Analysis Service
 Enhanced field detection and standalone scoring with improved ATS analysis
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer, util
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
 import numpy as np
 import re
 import json
-import requests
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+import os
+import sys
+import dataclasses
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Literal, Optional, Tuple, Union
 import logging
 
 # Import improved ATS analyzer
-from improved_ats_analysis import ImprovedATSAnalyzer
+from improved_ats_analysis import AnalysisContext, ImprovedATSAnalyzer, TextInput
+from result_cache import ResultCache, content_hash
+from embedding_store import embedding_similarity, normalize_text, store_from_env
+from encode_scheduler import EncodeScheduler
+from stage_pool import StagePool
+from llm_client import OllamaClient
+from model_registry import EMBEDDING_MODEL_ID, models, preload_enabled
+from ndjson_stream import DuplexStreamingResponse, chunked, iter_ndjson
+from vector_index import VectorIndex
+from job_feature_store import JobFeatures, JobFeatureStore
+from document_embedding import DEFAULT_CHUNK_WORDS, Chunk, chunk_document, chunked_similarity, pooled_similarity
+from stage_metrics import StageMetrics
+from admission import BULK, INTERACTIVE, AdmissionController, Overloaded
+from live_session import LiveResume, ResumeSegment
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,18 +41,48 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Improved Hybrid Resume Analysis Service")
 
-# Initialize the embedding model
-try:
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    logger.info("Sentence transformer model loaded successfully")
-except Exception as e:
-    logger.error(f"Failed to load sentence transformer: {e}")
-    model = None
+# Bump whenever scoring changes so cached results from older logic are never served
+ANALYZER_VERSION = "2.1"
+
+# Result cache configuration
+CACHE_MAX_MB = int(os.environ.get('ANALYSIS_CACHE_MAX_MB', '64'))
+CACHE_TTL_SECONDS = float(os.environ.get('ANALYSIS_CACHE_TTL_SECONDS', '3600'))
+
+# Largest number of resumes (or jobs) accepted by one /analyze/batch call
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '500'))
+
+# /analyze/stream scores this many records at a time, with at most one chunk computed ahead of the client
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', '32'))
+STREAM_MAX_LINE_BYTES = int(os.environ.get('STREAM_MAX_LINE_BYTES', str(1024 * 1024)))
+
+# 'chunked' embeds long documents in section-aligned chunks and pools the chunk vectors
+# (mean, max or attention); 'truncate' encodes each text whole, cut off by the model at 256 tokens
+EMBEDDING_MODE = os.environ.get('EMBEDDING_MODE', 'truncate')
+EMBEDDING_POOLING = os.environ.get('EMBEDDING_POOLING', 'mean')
+EMBEDDING_CHUNK_WORDS = int(os.environ.get('EMBEDDING_CHUNK_WORDS', str(DEFAULT_CHUNK_WORDS)))
+
+# Models this service needs; loaded on first use or preloaded at startup, never at import
+REQUIRED_MODELS = ['sentence_transformer']
+
+# Optional stages per analysis mode: fast is the ATS detectors alone, standard adds
+# embeddings and keyword similarity, deep adds LLM insights
+MODE_STAGES = {
+    'fast': (),
+    'standard': ('keyword_similarity', 'embeddings'),
+    'deep': ('keyword_similarity', 'embeddings', 'llm')
+}
+AnalysisMode = Literal['fast', 'standard', 'deep']
+
+# /analyze/live scores on every edit, so it never runs the LLM
+LiveMode = Literal['fast', 'standard']
 
 class AnalysisRequest(BaseModel):
     resume: str
     job: str
     jobLevel: str
+    mode: AnalysisMode = 'deep'
+    # Budget for the optional stages, from the start of the request; the ATS detectors always run
+    deadline_ms: Optional[float] = Field(None, gt=0)
 
 class AnalysisResponse(BaseModel):
     similarity: float
@@ -49,12 +97,89 @@ class AnalysisResponse(BaseModel):
     format_score: Optional[float] = None
     section_completeness: Optional[float] = None
     standalone_score: Optional[float] = None
+    # Per-stage milliseconds, only with /analyze?timings=true
+    timings: Optional[Dict[str, float]] = None
+    mode: AnalysisMode = 'deep'
+    # Stages left out, with why: 'mode', 'budget' (not started) or 'deadline' (cut off)
+    skipped_stages: Dict[str, str] = Field(default_factory=dict)
+
+class BatchAnalysisRequest(BaseModel):
+    """One job with many resumes, or many jobs with one resume"""
+    jobLevel: str
+    mode: AnalysisMode = 'deep'
+    job: Optional[str] = None
+    resumes: Optional[List[str]] = None
+    resume: Optional[str] = None
+    jobs: Optional[List[str]] = None
+
+class BatchItemResult(BaseModel):
+    index: int
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+
+class BatchAnalysisResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+class StreamAnalysisItem(BaseModel):
+    """One NDJSON record of /analyze/stream; `id` is echoed back"""
+    resume: str
+    job: str = ""
+    jobLevel: str
+    mode: AnalysisMode = 'deep'
+    id: Optional[Union[str, int]] = None
+
+class StreamItemResult(BatchItemResult):
+    id: Optional[Union[str, int]] = None
+
+class LiveEdit(BaseModel):
+    """One /analyze/live message: the whole current resume; job and jobLevel carry over from earlier messages"""
+    resume: str
+    job: Optional[str] = None
+    jobLevel: Optional[str] = None
+    mode: LiveMode = 'standard'
+    # Echoed back so the client can drop replies to edits it has already replaced
+    revision: Optional[int] = None
+
+class LiveResult(BaseModel):
+    revision: Optional[int] = None
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+    # Sections analyzed for this edit ('preamble' is the text above the first header); the rest were reused
+    analyzed_sections: List[str] = Field(default_factory=list)
+    reused_sections: int = 0
+
+class JobPosting(BaseModel):
+    id: str
+    description: str
+    title: Optional[str] = None
+
+class JobIndexRequest(BaseModel):
+    """Jobs to add to the recommendation index; known ids are updated"""
+    jobs: List[JobPosting]
+
+class RecommendRequest(BaseModel):
+    resume: str
+    k: int = 10
+
+class JobRecommendation(BaseModel):
+    id: str
+    title: Optional[str] = None
+    score: float
+
+class RecommendResponse(BaseModel):
+    jobs: List[JobRecommendation]
+    indexed_jobs: int
 
 class ImprovedAnalyzer:
     def __init__(self):
         # Initialize improved ATS analyzer
         self.ats_analyzer = ImprovedATSAnalyzer()
         
+        # Pooled async LLM client shared by all requests
+        self.llm_client = OllamaClient.from_env(timeout=10)
+        
         # Enhanced technical keywords by category
         self.technical_keywords = {
             'programming': ['python', 'javascript', 'java', 'c++', 'c#', 'go', 'rust', 'php', 'ruby', 'swift', 'kotlin', 'typescript', 'scala', 'r', 'matlab'],
@@ -64,6 +189,7 @@ class ImprovedAnalyzer:
             'ml_ai': ['tensorflow', 'pytorch', 'scikit-learn', 'pandas', 'numpy', 'matplotlib', 'opencv', 'keras', 'xgboost', 'spark', 'hadoop'],
             'tools': ['git', 'jira', 'confluence', 'slack', 'figma', 'postman', 'swagger', 'maven', 'gradle', 'npm', 'yarn']
         }
+        self.all_technical_keywords = {keyword for keywords in self.technical_keywords.values() for keyword in keywords}
         
         # Enhanced ATS keywords
         self.ats_keywords = {
@@ -102,65 +228,76 @@ class ImprovedAnalyzer:
             'updated', 'upgraded', 'utilized', 'validated', 'verified', 'visualized', 'wrote'
         ]
     
-    def enhanced_section_detection(self, text: str) -> Dict[str, Any]:
+    def enhanced_section_detection(self, text: TextInput) -> Dict[str, Any]:
         """Use improved ATS analyzer for section detection"""
         return self.ats_analyzer.detect_sections(text)
     
-    def calculate_standalone_score(self, resume_text: str) -> Dict[str, Any]:
+    def calculate_standalone_score(self, resume_text: TextInput) -> Dict[str, Any]:
         """Use improved ATS analyzer for standalone scoring"""
         return self.ats_analyzer.calculate_standalone_score(resume_text)
     
-    def detect_quantifiable_achievements(self, text: str) -> Dict[str, Any]:
+    def detect_quantifiable_achievements(self, text: TextInput) -> Dict[str, Any]:
         """Use improved ATS analyzer for achievements detection"""
         return self.ats_analyzer.detect_quantifiable_achievements(text)
     
-    def analyze_format_optimization(self, text: str) -> Dict[str, Any]:
+    def analyze_format_optimization(self, text: TextInput) -> Dict[str, Any]:
         """Use improved ATS analyzer for format optimization"""
         return self.ats_analyzer.analyze_format_optimization(text)
     
-    def extract_keywords(self, text: str) -> Dict[str, List[str]]:
+    def extract_keywords(self, text: TextInput) -> Dict[str, List[str]]:
         """Use improved ATS analyzer for keyword extraction"""
         return self.ats_analyzer.extract_keywords(text)
     
-    def detect_action_verbs(self, text: str) -> Dict[str, List[str]]:
+    def detect_action_verbs(self, text: TextInput) -> Dict[str, List[str]]:
         """Use improved ATS analyzer for action verb detection"""
         return self.ats_analyzer.detect_action_verbs(text)
     
-    def calculate_keyword_similarity(self, resume_text: str, job_text: str) -> float:
+    def calculate_keyword_similarity(self, resume_text: TextInput, job_text: TextInput) -> float:
         """Calculate keyword-based similarity using simple word matching"""
         try:
-            # Clean and prepare texts
-            resume_clean = re.sub(r'[^\w\s]', '', resume_text.lower())
-            job_clean = re.sub(r'[^\w\s]', '', job_text.lower())
-            
-            # Get all technical keywords
-            all_keywords = []
-            for keywords in self.technical_keywords.values():
-                all_keywords.extend(keywords)
-            
-            # Count keyword matches
-            resume_words = set(resume_clean.split())
-            job_words = set(job_clean.split())
-            
-            resume_keywords = resume_words.intersection(set(all_keywords))
-            job_keywords = job_words.intersection(set(all_keywords))
-            
-            if not job_keywords:
-                return 0.0
-            
-            # Calculate Jaccard similarity
-            intersection = resume_keywords.intersection(job_keywords)
-            union = resume_keywords.union(job_keywords)
-            
-            return len(intersection) / len(union) if union else 0.0
+            # Keyword sets are memoized on each text's context
+            resume_keywords = self._technical_words(AnalysisContext.of(resume_text))
+            job_keywords = self._technical_words(AnalysisContext.of(job_text))
+            return self.keyword_set_similarity(resume_keywords, job_keywords)
             
         except Exception as e:
             logger.error(f"Error in keyword similarity: {e}")
             return 0.0
     
-    def generate_llm_insights(self, resume_text: str, job_text: str, job_level: str) -> Dict[str, Any]:
+    def keyword_set_similarity(self, resume_keywords: set, job_keywords: set) -> float:
+        """Jaccard similarity of two texts' technical words"""
+        if not job_keywords:
+            return 0.0
+        
+        # Calculate Jaccard similarity
+        intersection = resume_keywords.intersection(job_keywords)
+        union = resume_keywords.union(job_keywords)
+        
+        return len(intersection) / len(union) if union else 0.0
+    
+    def _technical_words(self, context: AnalysisContext) -> set:
+        """Punctuation-stripped words of the text that are technical keywords"""
+        def compute():
+            # Clean and prepare text
+            clean = re.sub(r'[^\w\s]', '', context.text_lower)
+            return set(clean.split()).intersection(self.all_technical_keywords)
+        return context.memoize('technical_words', compute)
+    
+    def generate_llm_insights(self, resume_text: TextInput, job_text: TextInput, job_level: str) -> Dict[str, Any]:
         """Generate insights using LLM (if available)"""
-        prompt = f"""
+        prompt = self._llm_prompt(resume_text, job_text, job_level)
+        return self._parse_llm_insights(self.call_ollama_llm(prompt))
+    
+    async def generate_llm_insights_async(self, resume_text: TextInput, job_text: TextInput, job_level: str) -> Dict[str, Any]:
+        """Generate insights using LLM (if available) without blocking the event loop"""
+        prompt = self._llm_prompt(resume_text, job_text, job_level)
+        return self._parse_llm_insights(await self.call_ollama_llm_async(prompt))
+    
+    def _llm_prompt(self, resume_text: TextInput, job_text: TextInput, job_level: str) -> str:
+        """Build the insights prompt"""
+        resume_text = AnalysisContext.of(resume_text).text
+        job_text = AnalysisContext.of(job_text).text
+        return f"""
         Analyze this resume and provide insights:
         
         Resume: {resume_text[:500]}
@@ -175,9 +312,9 @@ class ImprovedAnalyzer:
         
         Format as JSON only.
         """
-        
-        llm_response = self.call_ollama_llm(prompt)
-        
+    
+    def _parse_llm_insights(self, llm_response: str) -> Dict[str, Any]:
+        """Extract the JSON insights from an LLM response, with fallback insights"""
         if llm_response:
             try:
                 # Try to extract JSON from response
@@ -196,209 +333,866 @@ class ImprovedAnalyzer:
         }
 
     def call_ollama_llm(self, prompt: str) -> str:
-        """Call Ollama LLM for advanced analysis (optional)"""
-        try:
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": "llama2",
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                return response.json().get('response', '')
-            else:
-                return ""
-        except Exception as e:
-            logger.debug(f"Ollama not available: {e}")
-            return ""
+        """Call Ollama from synchronous code through the same pooled client; not for use on an event loop"""
+        return asyncio.run(self.llm_client.generate(prompt))
+    
+    async def call_ollama_llm_async(self, prompt: str) -> str:
+        """Call Ollama through the pooled async client (cached, deduplicated, circuit-broken)"""
+        return await self.llm_client.generate(prompt)
 
 analyzer = ImprovedAnalyzer()
 
-@app.post('/analyze', response_model=AnalysisResponse)
-async def analyze(request: AnalysisRequest):
-    try:
-        logger.info(f"Starting improved analysis for job level: {request.jobLevel}")
-        
-        if not model:
-            raise HTTPException(status_code=500, detail="Embedding model not available")
-        
-        # 1. Enhanced section detection using improved ATS analyzer
-        section_analysis = analyzer.enhanced_section_detection(request.resume)
-        
-        # Convert section analysis to frontend-compatible format
-        section_analysis_frontend = {
-            'section_scores': section_analysis['section_scores'],
-            'completeness_score': section_analysis['completeness_score'],
-            'missing_sections': section_analysis['missing_sections'],
-            'detected_sections': list(section_analysis['detected_sections'].keys()),
-            'detailed_section_analysis': section_analysis['section_scores']
-        }
-        
-        # 2. Standalone scoring using improved ATS analyzer
-        standalone_analysis = analyzer.calculate_standalone_score(request.resume)
-        
-        # 3. Semantic similarity using embeddings (if job description provided)
-        semantic_similarity = 0.0
-        if request.job.strip():
-            resume_emb = model.encode(request.resume, convert_to_tensor=True)
-            job_emb = model.encode(request.job, convert_to_tensor=True)
-            semantic_similarity = util.pytorch_cos_sim(resume_emb, job_emb).item()
-        
-        # 4. Keyword-based similarity (if job description provided)
-        keyword_similarity = 0.0
-        if request.job.strip():
-            keyword_similarity = analyzer.calculate_keyword_similarity(request.resume, request.job)
-        
-        # 5. Extract keywords and skills using improved ATS analyzer
-        resume_keywords = analyzer.extract_keywords(request.resume)
-        job_keywords = analyzer.extract_keywords(request.job) if request.job.strip() else {}
-        
-        # 6. Enhanced achievements detection using improved ATS analyzer
-        achievements_analysis = analyzer.detect_quantifiable_achievements(request.resume)
-        
-        # 7. Format optimization analysis using improved ATS analyzer
-        format_analysis = analyzer.analyze_format_optimization(request.resume)
+# Full responses keyed by (resume, job, jobLevel), plus the per-text halves so new pairings reuse work
+response_cache = ResultCache('response', max_bytes=CACHE_MAX_MB * 1024 * 1024 // 2, ttl_seconds=CACHE_TTL_SECONDS)
+resume_cache = ResultCache('resume_analysis', max_bytes=CACHE_MAX_MB * 1024 * 1024 // 4, ttl_seconds=CACHE_TTL_SECONDS)
+job_keyword_cache = ResultCache('job_keywords', max_bytes=CACHE_MAX_MB * 1024 * 1024 // 4, ttl_seconds=CACHE_TTL_SECONDS)
+
+# Per-text embeddings shared with other workers through a memory-mapped file
+embedding_store = store_from_env(EMBEDDING_MODEL_ID)
+
+# Encodes from concurrent requests are batched on a worker thread, off the event loop
+encode_scheduler = EncodeScheduler.from_env(loader=lambda: models.get('sentence_transformer'))
+
+# CPU-bound stages run here so the event loop keeps serving other requests
+stage_pool = StagePool.from_env()
+
+# Stage and request latency histograms, served at /metrics
+metrics = StageMetrics()
+metrics.gauge('analysis_cache_hit_rate', "Result cache hit rate",
+              lambda: {cache.name: cache.stats()['hit_rate'] for cache in (response_cache, resume_cache, job_keyword_cache)},
+              label='cache')
+metrics.gauge('analysis_cache_entries', "Result cache entries",
+              lambda: {cache.name: cache.stats()['entries'] for cache in (response_cache, resume_cache, job_keyword_cache)},
+              label='cache')
+metrics.gauge('encode_queue_depth', "Texts waiting for the embedding model",
+              lambda: {'encode': encode_scheduler.stats()['queued']}, label='queue')
+
+# Bounded in-flight requests: interactive callers are served first and full lanes get 429 with Retry-After.
+# Clients pick a lane with the X-Priority header; batch endpoints default to bulk
+admission = AdmissionController.from_env(
+    wait_seconds=metrics.histogram('analysis_admission_wait_seconds', "Time requests waited for admission", 'lane')
+)
+metrics.gauge('admission_queue_depth', "Requests waiting for admission",
+              lambda: {lane: stats['queued'] for lane, stats in admission.stats().items()}, label='lane')
+metrics.gauge('admission_in_flight', "Admitted requests being processed",
+              lambda: {lane: stats['in_flight'] for lane, stats in admission.stats().items()}, label='lane')
+metrics.gauge('admission_rejected_total', "Requests shed with 429",
+              lambda: {lane: stats['rejected'] for lane, stats in admission.stats().items()}, label='lane', kind='counter')
+
+# Job-side features precomputed and persisted through /jobs; scoring a known posting skips job-side work
+job_features = JobFeatureStore.from_env('job_features_hybrid.sqlite3', version=f"{ANALYZER_VERSION}:{EMBEDDING_MODEL_ID}")
+
+# Job embeddings for /recommend, rebuilt from the feature store at startup and kept up to date through /jobs.
+# With several workers, each one syncs its copy from the shared store before using it
+job_index = VectorIndex.from_env()
+
+def restore_job_index() -> None:
+    stored = [features for features in job_features.all() if features.embedding is not None]
+    job_index.add_many([features.job_id for features in stored], [features.embedding for features in stored])
+    if stored:
+        logger.info(f"Restored {len(stored)} jobs into the recommendation index")
+
+restore_job_index()
+
+def sync_job_index() -> None:
+    """Apply jobs that other workers added, edited or removed through the shared feature store"""
+    changed, removed = job_features.sync()
+    for job_id in removed + [features.job_id for features in changed if features.embedding is None]:
+        job_index.remove(job_id)
+    embedded = [features for features in changed if features.embedding is not None]
+    if embedded:
+        job_index.add_many([features.job_id for features in embedded], [features.embedding for features in embedded])
+
+def compute_resume_side(resume: AnalysisContext) -> Dict[str, Any]:
+    # Detectors are memoized on the context, so timing each one first leaves
+    # the standalone score only its own arithmetic
+    with metrics.stage('pattern_scan'):
+        analyzer.ats_analyzer.scan(resume)
+    with metrics.stage('sections'):
+        analyzer.enhanced_section_detection(resume)
+    with metrics.stage('achievements'):
+        analyzer.detect_quantifiable_achievements(resume)
+    with metrics.stage('format'):
+        analyzer.analyze_format_optimization(resume)
+    with metrics.stage('action_verbs'):
+        analyzer.detect_action_verbs(resume)
+    with metrics.stage('standalone_score'):
+        standalone_analysis = analyzer.calculate_standalone_score(resume)
+    with metrics.stage('resume_keywords'):
+        resume_keywords = analyzer.extract_keywords(resume)
+    return {'standalone_analysis': standalone_analysis, 'resume_keywords': resume_keywords}
+
+def analyze_resume_side(resume: AnalysisContext) -> Dict[str, Any]:
+    """Everything /analyze needs from the resume alone (cached by resume hash)"""
+    return resume_cache.get_or_compute(content_hash(resume.text, ANALYZER_VERSION), lambda: compute_resume_side(resume))
+
+def compute_job_features(jobs: List[Tuple[str, str]]) -> List[JobFeatures]:
+    """Embedding, keywords and normalized text for (job id, text) pairs"""
+    embeddings = embedding_store.encode(encode_scheduler, [text for _, text in jobs])
+    if EMBEDDING_MODE == 'chunked':
+        # Chunked scoring reads the job's chunk vectors from the store
+        embedding_store.encode(encode_scheduler, [chunk.text for _, text in jobs for chunk in chunk_document(text, None, EMBEDDING_CHUNK_WORDS)])
+    return [
+        JobFeatures(
+            job_id=job_id,
+            content_hash=job_features.hash_for(text),
+            normalized_text=normalize_text(text),
+            embedding=embedding,
+            keywords=analyzer.extract_keywords(AnalysisContext(text))
+        )
+        for (job_id, text), embedding in zip(jobs, embeddings)
+    ]
+
+def analyze_job_side(resume: AnalysisContext, job: AnalysisContext,
+                     features: Optional[JobFeatures] = None) -> Tuple[float, Dict[str, List[str]]]:
+    """Keyword similarity and job keywords (stored for known postings, else cached by job hash)"""
+    with metrics.stage('keyword_similarity'):
+        keyword_similarity = analyzer.calculate_keyword_similarity(resume, job)
+    if features is not None:
+        return keyword_similarity, features.keywords
+    with metrics.stage('job_keywords'):
+        job_keywords = job_keyword_cache.get_or_compute(
+            content_hash(job.text, ANALYZER_VERSION), lambda: analyzer.extract_keywords(job)
+        )
+    return keyword_similarity, job_keywords
+
+async def job_side_stage(resume: AnalysisContext, job: AnalysisContext,
+                         features: Optional[JobFeatures] = None) -> Tuple[float, Dict[str, List[str]]]:
+    if not job.text.strip():
+        return 0.0, {}
+    return await stage_pool.run(analyze_job_side, resume, job, features)
+
+def document_chunks(context: AnalysisContext, with_sections: bool = False) -> List[Chunk]:
+    """Embedding chunks of a text; resumes split along their detected sections"""
+    spans = analyzer.ats_analyzer.section_spans(context) if with_sections else None
+    return chunk_document(context.text, spans, EMBEDDING_CHUNK_WORDS)
+
+async def semantic_similarity_stage(resume: AnalysisContext, job: AnalysisContext,
+                                    features: Optional[JobFeatures] = None) -> Tuple[float, Dict[str, float]]:
+    """Embedding similarity, plus per-section similarity of the resume in chunked mode"""
+    if not job.text.strip():
+        return 0.0, {}
+    if EMBEDDING_MODE == 'chunked':
+        # Job chunk vectors come from the embedding store once the posting has been seen
+        return await chunked_similarity(embedding_store, encode_scheduler, document_chunks(resume, with_sections=True),
+                                        document_chunks(job), EMBEDDING_POOLING)
+    if features is not None:
+        resume_emb, = await embedding_store.encode_async(encode_scheduler, [resume.text])
+        return embedding_similarity(resume_emb, features.embedding), {}
+    resume_emb, job_emb = await embedding_store.encode_async(encode_scheduler, [resume.text, job.text])
+    return embedding_similarity(resume_emb, job_emb), {}
+
+def calculate_skill_gap(resume_keywords: Dict[str, List[str]], job_keywords: Dict[str, List[str]],
+                        has_job: bool) -> Dict[str, Any]:
+    """Job keywords missing from the resume; without a job only the resume's skill count"""
+    skill_gap_analysis = {
+        'missing_skills': [],
+        'skill_gap_score': 1.0,
+        'resume_skills_count': len(resume_keywords.get('programming', []) + resume_keywords.get('frameworks', [])),
+        'job_skills_count': 0
+    }
+    
+    if has_job:
+        resume_skill_set = set()
+        for skills in resume_keywords.values():
+            resume_skill_set.update(skills)
         
-        # 8. Action verbs detection using improved ATS analyzer
-        action_verbs_analysis = analyzer.detect_action_verbs(request.resume)
+        job_skill_set = set()
+        for skills in job_keywords.values():
+            job_skill_set.update(skills)
         
-        # 9. LLM insights (if available)
-        llm_insights = analyzer.generate_llm_insights(request.resume, request.job, request.jobLevel)
+        missing_skills = job_skill_set - resume_skill_set
+        skill_gap_score = 1 - (len(missing_skills) / max(1, len(job_skill_set)))
         
-        # 10. Calculate skill gap (if job description provided)
         skill_gap_analysis = {
-            'missing_skills': [],
-            'skill_gap_score': 1.0,
-            'resume_skills_count': len(resume_keywords.get('programming', []) + resume_keywords.get('frameworks', [])),
-            'job_skills_count': 0
+            'missing_skills': list(missing_skills),
+            'skill_gap_score': skill_gap_score,
+            'resume_skills_count': len(resume_skill_set),
+            'job_skills_count': len(job_skill_set)
         }
-        
-        if request.job.strip():
-            resume_skill_set = set()
-            for skills in resume_keywords.values():
-                resume_skill_set.update(skills)
-            
-            job_skill_set = set()
-            for skills in job_keywords.values():
-                job_skill_set.update(skills)
+    
+    return skill_gap_analysis
+
+async def require_sentence_model() -> None:
+    # Loads on first use (off the event loop) if startup preloading has not finished
+    if await stage_pool.run(models.get_optional, 'sentence_transformer') is None:
+        raise HTTPException(status_code=500, detail="Embedding model not available")
+
+class StagePlan:
+    """The optional stages one request runs, and those it skipped with the reason.
+
+    With a deadline, a stage whose mean latency so far exceeds the time left is not
+    started, and one still running at the deadline is cut off; either way the stage's
+    fallback value is used.
+    """
+
+    def __init__(self, mode: str = 'deep', deadline_ms: Optional[float] = None):
+        self.mode = mode
+        self.stages = MODE_STAGES[mode]
+        self.expires = time.monotonic() + deadline_ms / 1000 if deadline_ms is not None else None
+        self.skipped: Dict[str, str] = {}
+
+    def remaining(self) -> Optional[float]:
+        return None if self.expires is None else self.expires - time.monotonic()
+
+    def ran(self, name: str) -> bool:
+        return name not in self.skipped
+
+    async def run(self, name: str, stage: Callable[[], Awaitable[Any]], fallback: Any) -> Any:
+        if name not in self.stages:
+            self.skipped[name] = 'mode'
+            return fallback
+        remaining = self.remaining()
+        if remaining is not None:
+            expected = metrics.stage_seconds.snapshot().get(name, {}).get('mean', 0.0)
+            if remaining <= 0 or expected > remaining:
+                self.skipped[name] = 'budget'
+                return fallback
+        try:
+            return await asyncio.wait_for(stage(), remaining)
+        except asyncio.TimeoutError:
+            self.skipped[name] = 'deadline'
+            return fallback
+
+# Receives (event name, JSON-able payload) as each stage of one analysis finishes
+StageListener = Callable[[str, Dict[str, Any]], None]
+
+def frontend_sections(section_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Section analysis in the shape the frontend reads"""
+    return {
+        'section_scores': section_analysis['section_scores'],
+        'completeness_score': section_analysis['completeness_score'],
+        'missing_sections': section_analysis['missing_sections'],
+        'detected_sections': list(section_analysis['detected_sections'].keys()),
+        'detailed_section_analysis': section_analysis['section_scores']
+    }
+
+def standalone_event(standalone_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'standalone_score': standalone_analysis['standalone_score'],
+        'ats_score': standalone_analysis['action_verb_score'],
+        'achievement_score': standalone_analysis['achievements_analysis']['achievement_score'],
+        'format_score': standalone_analysis['format_analysis']['format_score'],
+        'section_completeness': standalone_analysis['section_analysis']['completeness_score']
+    }
+
+def replay_events(response: AnalysisResponse, listener: StageListener) -> None:
+    """Stage events of an already computed (cached) response"""
+    detailed = response.detailed_analysis
+    listener('sections', detailed['section_analysis'])
+    listener('standalone_score', standalone_event(detailed['standalone_analysis']))
+    if 'keyword_similarity' not in response.skipped_stages:
+        listener('skill_gap', {'keyword_match_score': response.keyword_match_score,
+                               'skill_gap_analysis': response.skill_gap_analysis})
+    if 'embeddings' not in response.skipped_stages:
+        listener('similarity', {'similarity': response.similarity,
+                                'section_similarity': detailed.get('section_similarity', {})})
+    if 'llm' not in response.skipped_stages:
+        listener('llm_insights', detailed['llm_insights'])
+
+async def resume_side_stage(resume: AnalysisContext, listener: Optional[StageListener] = None) -> Dict[str, Any]:
+    if listener is not None:
+        # Sections first: the quickest result a listener can show
+        sections = await stage_pool.run(analyzer.enhanced_section_detection, resume)
+        listener('sections', frontend_sections(sections))
+    resume_side = await stage_pool.run(analyze_resume_side, resume)
+    if listener is not None:
+        listener('standalone_score', standalone_event(resume_side['standalone_analysis']))
+    return resume_side
+
+def weighted_score(components: Dict[str, Tuple[float, float]]) -> float:
+    """Weighted mean of (score, weight) pairs, renormalized over the components present"""
+    return sum(score * weight for score, weight in components.values()) / sum(weight for _, weight in components.values())
+
+async def run_analysis(resume: AnalysisContext, job: AnalysisContext, job_level: str,
+                       plan: Optional[StagePlan] = None, listener: Optional[StageListener] = None) -> AnalysisResponse:
+    """Analysis of one resume/job pair; contexts may be shared across pairs of a batch.
+
+    A listener is told about each stage result as soon as it is ready; skipped stages send nothing.
+    """
+    plan = plan if plan is not None else StagePlan()
+    response_key = content_hash(resume.text, job.text, job_level, plan.mode, ANALYZER_VERSION)
+    cached_response = response_cache.get(response_key)
+    if cached_response is not None:
+        if listener is not None:
+            replay_events(cached_response, listener)
+        return cached_response
+    
+    if 'embeddings' in plan.stages:
+        await require_sentence_model()
+    features = await stage_pool.run(job_features.get_by_text, job.text) if job.text.strip() else None
+    
+    has_job = bool(job.text.strip())
+    
+    async def reported(event: str, stage: str, awaitable: Awaitable[Any], payload: Callable[[Any], Dict[str, Any]]) -> Any:
+        result = await awaitable
+        if listener is not None and plan.ran(stage):
+            listener(event, payload(result))
+        return result
+    
+    # Independent stages run concurrently: ATS detectors and job keywords on the stage pool,
+    # embeddings on the encode scheduler and the LLM call over async HTTP
+    resume_task = asyncio.ensure_future(resume_side_stage(resume, listener))
+    job_task = asyncio.ensure_future(
+        plan.run('keyword_similarity', lambda: job_side_stage(resume, job, features), (0.0, {}))
+    )
+    
+    async def skill_gap_stage() -> Dict[str, Any]:
+        # Needs only the keyword stages, so it is ready before the embeddings and the LLM
+        resume_side, (_, job_keywords) = await asyncio.gather(resume_task, job_task)
+        with metrics.stage('skill_gap'):
+            return calculate_skill_gap(resume_side['resume_keywords'], job_keywords, has_job and plan.ran('keyword_similarity'))
+    
+    resume_side, (keyword_similarity, job_keywords), (semantic_similarity, section_similarity), llm_insights, skill_gap_analysis = await asyncio.gather(
+        resume_task,
+        job_task,
+        reported('similarity', 'embeddings',
+                 plan.run('embeddings', lambda: metrics.timed('embeddings', semantic_similarity_stage(resume, job, features)), (0.0, {})),
+                 lambda result: {'similarity': result[0], 'section_similarity': result[1]}),
+        reported('llm_insights', 'llm',
+                 plan.run('llm', lambda: metrics.timed('llm', analyzer.generate_llm_insights_async(resume, job, job_level)),
+                          analyzer._parse_llm_insights("")),
+                 lambda insights: insights),
+        reported('skill_gap', 'keyword_similarity', skill_gap_stage(),
+                 lambda gap: {'keyword_match_score': job_task.result()[0], 'skill_gap_analysis': gap})
+    )
+    
+    analysis_response = assemble_response(resume_side, job_level, plan, has_job, keyword_similarity, job_keywords,
+                                          semantic_similarity, section_similarity, llm_insights, skill_gap_analysis)
+    # Results cut short by a deadline are not what the next caller with more time should get
+    if all(reason == 'mode' for reason in plan.skipped.values()):
+        response_cache.put(response_key, analysis_response)
+    return analysis_response
+
+def assemble_response(resume_side: Dict[str, Any], job_level: str, plan: StagePlan, has_job: bool,
+                      keyword_similarity: float, job_keywords: Dict[str, List[str]],
+                      semantic_similarity: float, section_similarity: Dict[str, float],
+                      llm_insights: Dict[str, Any], skill_gap_analysis: Dict[str, Any]) -> AnalysisResponse:
+    """Overall score, suggestions and the response body from the stage results of one pair"""
+    # 1. Standalone scoring using improved ATS analyzer;
+    # it carries the section, achievement, format and action verb analyses
+    standalone_analysis = resume_side['standalone_analysis']
+    
+    # 2. Enhanced section detection using improved ATS analyzer
+    section_analysis = standalone_analysis['section_analysis']
+    
+    # Convert section analysis to frontend-compatible format
+    section_analysis_frontend = frontend_sections(section_analysis)
+    
+    # 3-5. Semantic similarity, keyword similarity and job keywords were gathered above
+    # (zero and empty without a job description)
+    resume_keywords = resume_side['resume_keywords']
+    
+    # 6. Enhanced achievements detection using improved ATS analyzer
+    achievements_analysis = standalone_analysis['achievements_analysis']
+    
+    # 7. Format optimization analysis using improved ATS analyzer
+    format_analysis = standalone_analysis['format_analysis']
+    
+    # 8. Action verbs detection using improved ATS analyzer
+    action_verbs_analysis = standalone_analysis['detected_verbs']
+    
+    # 9-10. LLM insights (if available) and the skill gap (if job description provided) were gathered above
+    
+    # 11. Calculate enhanced overall score
+    if has_job and (plan.ran('embeddings') or plan.ran('keyword_similarity')):
+        # With job description; skipped job stages drop out and the other weights are scaled up
+        components = {
+            'semantic': (semantic_similarity, 0.25),
+            'keyword': (keyword_similarity, 0.20),
+            'standalone': (standalone_analysis['standalone_score'], 0.30),
+            'completeness': (section_analysis_frontend['completeness_score'], 0.15),
+            'format': (format_analysis['format_score'], 0.10)
+        }
+        if not plan.ran('embeddings'):
+            del components['semantic']
+        if not plan.ran('keyword_similarity'):
+            del components['keyword']
+        overall_score = weighted_score(components)
+    else:
+        # Without job description - use standalone score
+        overall_score = standalone_analysis['standalone_score']
+    
+    # 12. Generate enhanced improvement suggestions
+    suggestions = []
+    
+    # Standalone suggestions based on improved ATS analysis
+    if standalone_analysis['content_score'] < 0.4:
+        suggestions.append("Add more detailed descriptions to your resume")
+    
+    if standalone_analysis['skills_diversity'] < 0.4:
+        suggestions.append("Include more technical skills and technologies")
+    
+    if standalone_analysis['action_verb_score'] < 0.3:
+        suggestions.append("Use more strong action verbs to make your achievements stand out")
+    
+    if achievements_analysis['achievement_score'] < 0.4:
+        suggestions.append("Add quantifiable achievements with specific numbers and percentages")
+    
+    if section_analysis_frontend['completeness_score'] < 0.6:
+        missing_sections = section_analysis_frontend['missing_sections']
+        suggestions.append(f"Add missing sections: {', '.join(missing_sections[:3])}")
+    
+    if not format_analysis['ats_friendly']:
+        suggestions.append("Optimize formatting for ATS compatibility - use simple fonts and avoid tables/graphics")
+    
+    # Action verb suggestions
+    if action_verbs_analysis:
+        total_verbs = sum(len(verbs) for verbs in action_verbs_analysis.values())
+        if total_verbs < 8:
+            suggestions.append("Include more action verbs to demonstrate your impact and achievements")
+    
+    # Job-specific suggestions (if job description provided)
+    if has_job:
+        if plan.ran('embeddings') and semantic_similarity < 0.4:
+            suggestions.append("Consider adding more relevant keywords from the job description")
+        if plan.ran('keyword_similarity') and keyword_similarity < 0.2:
+            suggestions.append("Include more technical skills mentioned in the job posting")
+        if skill_gap_analysis['skill_gap_score'] < 0.6:
+            suggestions.append(f"Consider learning: {', '.join(skill_gap_analysis['missing_skills'][:5])}")
+    
+    # Add LLM suggestions if available
+    if llm_insights.get('suggestions'):
+        suggestions.extend(llm_insights['suggestions'][:2])
+    
+    detailed_analysis = {
+        'semantic_similarity': semantic_similarity,
+        'keyword_similarity': keyword_similarity,
+        'resume_keywords': resume_keywords,
+        'job_keywords': job_keywords,
+        'section_analysis': section_analysis_frontend,
+        'standalone_analysis': standalone_analysis,
+        'achievements_analysis': achievements_analysis,
+        'format_analysis': format_analysis,
+        'action_verbs_analysis': action_verbs_analysis,
+        'llm_insights': llm_insights,
+        # Add ATS analysis for frontend compatibility
+        'ats_analysis': {
+            'found_action_verbs': action_verbs_analysis.get('technical', []) + 
+                                action_verbs_analysis.get('achievement', []) + 
+                                action_verbs_analysis.get('leadership', []),
+            'action_verb_score': standalone_analysis['action_verb_score'],
+            'achievement_score': achievements_analysis['achievement_score'],
+            'format_score': format_analysis['format_score'],
+            'section_completeness': section_analysis_frontend['completeness_score']
+        }
+    }
+    if section_similarity:
+        detailed_analysis['section_similarity'] = section_similarity
+    
+    return AnalysisResponse(
+        similarity=semantic_similarity,
+        jobLevel=job_level,
+        overall_score=overall_score,
+        keyword_match_score=keyword_similarity,
+        skill_gap_analysis=skill_gap_analysis,
+        improvement_suggestions=suggestions[:8],  # Increased to accommodate more suggestions
+        detailed_analysis=detailed_analysis,
+        ats_score=standalone_analysis['action_verb_score'],
+        achievement_score=achievements_analysis['achievement_score'],
+        format_score=format_analysis['format_score'],
+        section_completeness=section_analysis_frontend['completeness_score'],
+        standalone_score=standalone_analysis['standalone_score'],
+        mode=plan.mode,
+        skipped_stages=plan.skipped
+    )
+
+@app.exception_handler(Overloaded)
+async def shed_request(request: Request, exc: Overloaded):
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(status_code=429, content={"detail": f"Service overloaded: {exc}", "lane": exc.lane},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.post('/analyze', response_model=AnalysisResponse)
+async def analyze(request: AnalysisRequest, timings: bool = False, priority: Optional[str] = Header(None, alias='X-Priority')):
+    # The deadline runs from arrival, so time queued for admission counts against it
+    plan = StagePlan(request.mode, request.deadline_ms)
+    async with admission.admit(admission.lane(priority, INTERACTIVE)):
+        try:
+            logger.info(f"Starting improved analysis for job level: {request.jobLevel}")
             
-            missing_skills = job_skill_set - resume_skill_set
-            skill_gap_score = 1 - (len(missing_skills) / max(1, len(job_skill_set)))
+            # One context per text: every detector runs at most once per request
+            with metrics.request('/analyze') as stage_timings:
+                response = await run_analysis(AnalysisContext(request.resume), AnalysisContext(request.job), request.jobLevel, plan)
+            # Copied, so a cached response never carries another request's timings
+            return response.model_copy(update={'timings': stage_timings}) if timings else response
             
-            skill_gap_analysis = {
-                'missing_skills': list(missing_skills),
-                'skill_gap_score': skill_gap_score,
-                'resume_skills_count': len(resume_skill_set),
-                'job_skills_count': len(job_skill_set)
-            }
-        
-        # 11. Calculate enhanced overall score
-        if request.job.strip():
-            # With job description
-            overall_score = (
-                semantic_similarity * 0.25 +
-                keyword_similarity * 0.20 +
-                standalone_analysis['standalone_score'] * 0.30 +
-                section_analysis_frontend['completeness_score'] * 0.15 +
-                format_analysis['format_score'] * 0.10
-            )
-        else:
-            # Without job description - use standalone score
-            overall_score = standalone_analysis['standalone_score']
-        
-        # 12. Generate enhanced improvement suggestions
-        suggestions = []
-        
-        # Standalone suggestions based on improved ATS analysis
-        if standalone_analysis['content_score'] < 0.4:
-            suggestions.append("Add more detailed descriptions to your resume")
-        
-        if standalone_analysis['skills_diversity'] < 0.4:
-            suggestions.append("Include more technical skills and technologies")
-        
-        if standalone_analysis['action_verb_score'] < 0.3:
-            suggestions.append("Use more strong action verbs to make your achievements stand out")
-        
-        if achievements_analysis['achievement_score'] < 0.4:
-            suggestions.append("Add quantifiable achievements with specific numbers and percentages")
-        
-        if section_analysis_frontend['completeness_score'] < 0.6:
-            missing_sections = section_analysis_frontend['missing_sections']
-            suggestions.append(f"Add missing sections: {', '.join(missing_sections[:3])}")
-        
-        if not format_analysis['ats_friendly']:
-            suggestions.append("Optimize formatting for ATS compatibility - use simple fonts and avoid tables/graphics")
-        
-        # Action verb suggestions
-        if action_verbs_analysis:
-            total_verbs = sum(len(verbs) for verbs in action_verbs_analysis.values())
-            if total_verbs < 8:
-                suggestions.append("Include more action verbs to demonstrate your impact and achievements")
-        
-        # Job-specific suggestions (if job description provided)
-        if request.job.strip():
-            if semantic_similarity < 0.4:
-                suggestions.append("Consider adding more relevant keywords from the job description")
-            if keyword_similarity < 0.2:
-                suggestions.append("Include more technical skills mentioned in the job posting")
-            if skill_gap_analysis['skill_gap_score'] < 0.6:
-                suggestions.append(f"Consider learning: {', '.join(skill_gap_analysis['missing_skills'][:5])}")
-        
-        # Add LLM suggestions if available
-        if llm_insights.get('suggestions'):
-            suggestions.extend(llm_insights['suggestions'][:2])
-        
-        detailed_analysis = {
-            'semantic_similarity': semantic_similarity,
-            'keyword_similarity': keyword_similarity,
-            'resume_keywords': resume_keywords,
-            'job_keywords': job_keywords,
-            'section_analysis': section_analysis_frontend,
-            'standalone_analysis': standalone_analysis,
-            'achievements_analysis': achievements_analysis,
-            'format_analysis': format_analysis,
-            'action_verbs_analysis': action_verbs_analysis,
-            'llm_insights': llm_insights,
-            # Add ATS analysis for frontend compatibility
-            'ats_analysis': {
-                'found_action_verbs': action_verbs_analysis.get('technical', []) + 
-                                    action_verbs_analysis.get('achievement', []) + 
-                                    action_verbs_analysis.get('leadership', []),
-                'action_verb_score': standalone_analysis['action_verb_score'],
-                'achievement_score': achievements_analysis['achievement_score'],
-                'format_score': format_analysis['format_score'],
-                'section_completeness': section_analysis_frontend['completeness_score']
-            }
-        }
-        
-        return AnalysisResponse(
-            similarity=semantic_similarity,
-            jobLevel=request.jobLevel,
-            overall_score=overall_score,
-            keyword_match_score=keyword_similarity,
-            skill_gap_analysis=skill_gap_analysis,
-            improvement_suggestions=suggestions[:8],  # Increased to accommodate more suggestions
-            detailed_analysis=detailed_analysis,
-            ats_score=standalone_analysis['action_verb_score'],
-            achievement_score=achievements_analysis['achievement_score'],
-            format_score=format_analysis['format_score'],
-            section_completeness=section_analysis_frontend['completeness_score'],
-            standalone_score=standalone_analysis['standalone_score']
-        )
-        
+        except Exception as e:
+            logger.error(f"Analysis error: {e}")
+            raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+def sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+async def analysis_events(request: AnalysisRequest, plan: StagePlan) -> AsyncIterator[bytes]:
+    """SSE messages for one analysis: a message per stage as it finishes, then `summary`
+    with the full response (or `error`). Stopping the iteration cancels the analysis."""
+    events: 'asyncio.Queue[Optional[bytes]]' = asyncio.Queue()
+    
+    async def analyze() -> None:
+        try:
+            with metrics.request('/analyze/events'):
+                response = await run_analysis(AnalysisContext(request.resume), AnalysisContext(request.job), request.jobLevel,
+                                              plan,
+                                              lambda event, data: events.put_nowait(sse_event(event, data)))
+            events.put_nowait(sse_event('summary', response.model_dump(mode='json')))
+        except Exception as e:
+            logger.error(f"Analysis error: {e}")
+            events.put_nowait(sse_event('error', {'detail': f"Analysis failed: {str(e)}"}))
+        finally:
+            events.put_nowait(None)
+    
+    task = asyncio.ensure_future(analyze())
+    try:
+        while (message := await events.get()) is not None:
+            yield message
+    finally:
+        task.cancel()
+
+@app.post('/analyze/events')
+async def analyze_events(request: AnalysisRequest, priority: Optional[str] = Header(None, alias='X-Priority')):
+    """/analyze as a text/event-stream of sections, standalone_score, skill_gap, similarity,
+    llm_insights and summary events, each sent as soon as it is ready"""
+    plan = StagePlan(request.mode, request.deadline_ms)
+    lane = admission.lane(priority, INTERACTIVE)
+    await admission.acquire(lane)
+    logger.info(f"Starting progressive analysis for job level: {request.jobLevel}")
+    # The background task releases the admission slot even if the client goes away mid-stream
+    return DuplexStreamingResponse(analysis_events(request, plan), media_type='text/event-stream',
+                                   headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+                                   background=BackgroundTask(admission.release, lane))
+
+# Sections of /analyze/live edits that were analyzed again or reused from the session
+live_sections = {'analyzed': 0, 'reused': 0}
+metrics.gauge('live_sections_total', "Resume sections of live edits, by whether they were analyzed or reused",
+              lambda: dict(live_sections), label='result', kind='counter')
+
+def live_resume_side(resume: LiveResume, text: str) -> Tuple[List[ResumeSegment], Dict[str, Any]]:
+    """Move the session to the new text and recombine its resume-side results"""
+    with metrics.stage('live_sections'):
+        analyzed = resume.update(text)
+    with metrics.stage('live_recombine'):
+        return analyzed, resume.resume_side()
+
+def live_job_side(resume: LiveResume, job: AnalysisContext) -> Tuple[float, Dict[str, List[str]]]:
+    """Keyword similarity from each section's technical words, and the job keywords"""
+    if not job.text.strip():
+        return 0.0, {}
+    resume_words = set().union(*(analyzer._technical_words(segment.context) for segment in resume.segments))
+    return analyzer.keyword_set_similarity(resume_words, analyzer._technical_words(job)), analyzer.extract_keywords(job)
+
+async def live_similarity(resume: LiveResume, job: AnalysisContext) -> Tuple[float, Dict[str, float]]:
+    """Section-chunked similarity whatever EMBEDDING_MODE says, so an edit encodes only the
+    sections it changed; job chunk vectors come from the embedding store after the first edit"""
+    job_chunks = job.memoize('live_chunks', lambda: document_chunks(job))
+    if not job_chunks:
+        return 0.0, {}
+    resume_chunks, resume_vectors = await resume.embed(embedding_store, encode_scheduler)
+    if not resume_chunks:
+        return 0.0, {}
+    job_vectors = await embedding_store.encode_async(encode_scheduler, [chunk.text for chunk in job_chunks])
+    return pooled_similarity(resume_chunks, resume_vectors, job_chunks, np.stack(job_vectors), EMBEDDING_POOLING)
+
+async def live_analysis(resume: LiveResume, text: str, job: AnalysisContext, job_level: str, mode: str) -> LiveResult:
+    """Analysis of the session's resume after an edit"""
+    plan = StagePlan(mode)
+    if 'embeddings' in plan.stages:
+        await require_sentence_model()
+    has_job = bool(job.text.strip())
+    
+    analyzed, resume_side = await stage_pool.run(live_resume_side, resume, text)
+    keyword_similarity, job_keywords = await plan.run(
+        'keyword_similarity', lambda: stage_pool.run(live_job_side, resume, job), (0.0, {})
+    )
+    semantic_similarity, section_similarity = await plan.run(
+        'embeddings', lambda: metrics.timed('embeddings', live_similarity(resume, job)), (0.0, {})
+    )
+    llm_insights = await plan.run(
+        'llm', lambda: analyzer.generate_llm_insights_async(resume.text, job, job_level), analyzer._parse_llm_insights("")
+    )
+    skill_gap_analysis = calculate_skill_gap(resume_side['resume_keywords'], job_keywords,
+                                             has_job and plan.ran('keyword_similarity'))
+    
+    live_sections['analyzed'] += len(analyzed)
+    live_sections['reused'] += len(resume.segments) - len(analyzed)
+    return LiveResult(
+        result=assemble_response(resume_side, job_level, plan, has_job, keyword_similarity, job_keywords,
+                                 semantic_similarity, section_similarity, llm_insights, skill_gap_analysis),
+        analyzed_sections=[segment.section.value if segment.section else 'preamble' for segment in analyzed],
+        reused_sections=len(resume.segments) - len(analyzed)
+    )
+
+@app.websocket('/analyze/live')
+async def analyze_live(websocket: WebSocket):
+    """Scores a resume while it is being edited: each message is a LiveEdit, each reply a LiveResult.
+
+    The connection keeps the resume's sections with their detector results and vectors,
+    so an edit costs the sections it touched rather than the whole resume. Each edit is
+    admitted on the interactive lane; a shed edit gets an error reply and the session stays open.
+    """
+    await websocket.accept()
+    resume = LiveResume(analyzer.ats_analyzer, EMBEDDING_CHUNK_WORDS)
+    job = AnalysisContext('')
+    job_level = None
+    try:
+        while True:
+            message = await websocket.receive_text()
+            edit = None
+            try:
+                edit = LiveEdit.model_validate_json(message)
+                if edit.job is not None and edit.job != job.text:
+                    job = AnalysisContext(edit.job)
+                job_level = edit.jobLevel or job_level
+                if job_level is None:
+                    raise ValueError("jobLevel is required in the first message")
+                async with admission.admit(INTERACTIVE):
+                    with metrics.request('/analyze/live'):
+                        reply = await live_analysis(resume, edit.resume, job, job_level, edit.mode)
+            except (ValueError, Overloaded) as e:
+                # Bad messages and shed edits are reported without closing the session
+                reply = LiveResult(error=str(e))
+            except Exception as e:
+                logger.error(f"Live analysis error: {e}")
+                reply = LiveResult(error=f"Analysis failed: {str(e)}")
+            reply.revision = edit.revision if edit is not None else None
+            await websocket.send_json(reply.model_dump(mode='json'))
+    except WebSocketDisconnect:
+        logger.debug("Live analysis session closed")
+
+def batch_pairs(request: BatchAnalysisRequest) -> List[Tuple[AnalysisContext, AnalysisContext]]:
+    """(resume, job) contexts in input order; the side with a single text shares one context"""
+    if request.job is not None and request.resumes is not None and request.resume is None and request.jobs is None:
+        job = AnalysisContext(request.job)
+        pairs = [(AnalysisContext(resume), job) for resume in request.resumes]
+    elif request.resume is not None and request.jobs is not None and request.job is None and request.resumes is None:
+        resume = AnalysisContext(request.resume)
+        pairs = [(resume, AnalysisContext(job)) for job in request.jobs]
+    else:
+        raise HTTPException(status_code=422, detail="Provide either 'job' with 'resumes' or 'resume' with 'jobs'")
+    if len(pairs) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    return pairs
+
+async def pre_encode(pairs: List[Tuple[AnalysisContext, AnalysisContext]]) -> None:
+    """Encode every distinct text up front: the scheduler turns them into a few large
+    model.encode batches and later per-item lookups hit the embedding store"""
+    try:
+        if await stage_pool.run(models.get_optional, 'sentence_transformer') is not None:
+            if EMBEDDING_MODE == 'chunked':
+                chunks = [chunk for resume, job in pairs if job.text.strip()
+                          for chunk in document_chunks(resume, with_sections=True) + document_chunks(job)]
+                texts = list({chunk.text: None for chunk in chunks})
+            else:
+                texts = list({context.text: None for pair in pairs for context in pair if pair[1].text.strip()})
+            await embedding_store.encode_async(encode_scheduler, texts)
+    except Exception as e:
+        logger.error(f"Batch pre-encode failed: {e}")
+
+async def run_batch_item(index: int, resume: AnalysisContext, job: AnalysisContext, job_level: str,
+                         mode: str = 'deep') -> BatchItemResult:
+    try:
+        return BatchItemResult(index=index, result=await run_analysis(resume, job, job_level, StagePlan(mode)))
     except Exception as e:
-        logger.error(f"Analysis error: {e}")
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        logger.error(f"Batch item {index} failed: {e}")
+        return BatchItemResult(index=index, error=str(e))
+
+@app.post('/analyze/batch', response_model=BatchAnalysisResponse)
+async def analyze_batch(request: BatchAnalysisRequest, priority: Optional[str] = Header(None, alias='X-Priority')):
+    pairs = batch_pairs(request)
+    logger.info(f"Starting batch analysis of {len(pairs)} items for job level: {request.jobLevel}")
+    
+    async with admission.admit(admission.lane(priority, BULK)):
+        with metrics.request('/analyze/batch'):
+            if 'embeddings' in MODE_STAGES[request.mode]:
+                await pre_encode(pairs)
+            
+            # Items run concurrently; the shared side's keywords and contexts are computed once,
+            # and CPU work is bounded by the stage pool
+            results = await asyncio.gather(*(
+                run_batch_item(index, resume, job, request.jobLevel, request.mode) for index, (resume, job) in enumerate(pairs)
+            ))
+    failed = sum(1 for item in results if item.error is not None)
+    return BatchAnalysisResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+async def score_stream_chunk(records: List[Tuple[int, Any]]) -> List[StreamItemResult]:
+    """Score one chunk of parsed NDJSON records; bad records become error results"""
+    results: List[Optional[StreamItemResult]] = [None] * len(records)
+    items = []
+    for position, (index, record) in enumerate(records):
+        if isinstance(record, Exception):
+            results[position] = StreamItemResult(index=index, error=f"Invalid record: {record}")
+            continue
+        try:
+            item = StreamAnalysisItem.model_validate(record)
+        except ValidationError as e:
+            record_id = record.get('id') if isinstance(record, dict) else None
+            record_id = record_id if isinstance(record_id, (str, int)) else None
+            results[position] = StreamItemResult(index=index, id=record_id, error=f"Invalid record: {e}")
+            continue
+        items.append((position, index, item))
+    
+    # Repeated texts (typically the job) share one context within the chunk
+    contexts: Dict[str, AnalysisContext] = {}
+    pairs = [(contexts.setdefault(item.resume, AnalysisContext(item.resume)),
+              contexts.setdefault(item.job, AnalysisContext(item.job))) for _, _, item in items]
+    await pre_encode([pair for (_, _, item), pair in zip(items, pairs) if 'embeddings' in MODE_STAGES[item.mode]])
+    scored = await asyncio.gather(*(
+        run_batch_item(index, resume, job, item.jobLevel, item.mode) for (_, index, item), (resume, job) in zip(items, pairs)
+    ))
+    for (position, index, item), result in zip(items, scored):
+        results[position] = StreamItemResult(index=index, id=item.id, result=result.result, error=result.error)
+    return results
+
+async def stream_results(records: AsyncIterator[Tuple[int, Any]]) -> AsyncIterator[bytes]:
+    """NDJSON result lines, chunk by chunk, in input order.
+    
+    The next chunk is read and scored while the current one is sent; nothing further is
+    read until the client has taken it, so a slow consumer throttles the whole pipeline
+    and at most two chunks are held in memory.
+    """
+    pending: Optional[asyncio.Future] = None
+    try:
+        async for chunk in chunked(records, STREAM_CHUNK_SIZE):
+            previous, pending = pending, asyncio.ensure_future(score_stream_chunk(chunk))
+            if previous is not None:
+                for result in await previous:
+                    yield (result.model_dump_json() + '\n').encode('utf-8')
+        if pending is not None:
+            for result in await pending:
+                yield (result.model_dump_json() + '\n').encode('utf-8')
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+@app.post('/analyze/stream')
+async def analyze_stream(request: Request, priority: Optional[str] = Header(None, alias='X-Priority')):
+    """Score NDJSON records ({"resume", "job", "jobLevel", "id"?} per line) as an NDJSON stream"""
+    # The slot is held until the stream ends or the client goes away
+    lane = admission.lane(priority, BULK)
+    await admission.acquire(lane)
+    logger.info("Starting streaming analysis")
+    records = iter_ndjson(request.stream(), max_line_bytes=STREAM_MAX_LINE_BYTES)
+    return DuplexStreamingResponse(stream_results(records), media_type='application/x-ndjson',
+                                   background=BackgroundTask(admission.release, lane))
+
+def store_jobs(jobs: List[JobPosting]) -> Dict[str, int]:
+    """Refresh stored features for new or edited postings, then the index entries of those jobs"""
+    sync_job_index()
+    counts = job_features.refresh([(job.id, job.description) for job in jobs], compute_job_features)
+    stored = []
+    for job in jobs:
+        features = job_features.get(job.id)
+        if features.title != job.title:
+            features = dataclasses.replace(features, title=job.title)
+            job_features.put(features)
+        stored.append(features)
+    job_index.add_many([features.job_id for features in stored], [features.embedding for features in stored])
+    return counts
+
+@app.post('/jobs')
+async def index_jobs(request: JobIndexRequest, priority: Optional[str] = Header(None, alias='X-Priority')):
+    await require_sentence_model()
+    async with admission.admit(admission.lane(priority, BULK)):
+        counts = await stage_pool.run(store_jobs, request.jobs)
+    return {**counts, "indexed": len(request.jobs), "indexed_jobs": len(job_index)}
+
+def remove_stored_job(job_id: str) -> bool:
+    """Drop a job's stored features and its index entry; returns whether either existed"""
+    sync_job_index()
+    stored = job_features.remove(job_id)
+    indexed = job_index.remove(job_id)
+    return stored or indexed
+
+@app.delete('/jobs/{job_id}')
+async def remove_job(job_id: str):
+    if not await stage_pool.run(remove_stored_job, job_id):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} is not indexed")
+    return {"removed": job_id, "indexed_jobs": len(job_index)}
+
+def search_jobs(vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
+    """Top-k job ids and scores from an index first brought up to date with the other workers"""
+    sync_job_index()
+    return job_index.search(vector, k)
+
+@app.post('/recommend', response_model=RecommendResponse)
+async def recommend(request: RecommendRequest, priority: Optional[str] = Header(None, alias='X-Priority')):
+    """Top-k indexed jobs by embedding cosine with the resume"""
+    await require_sentence_model()
+    async with admission.admit(admission.lane(priority, INTERACTIVE)):
+        resume_vector, = await embedding_store.encode_async(encode_scheduler, [request.resume])
+        matches = await stage_pool.run(search_jobs, resume_vector, request.k)
+    return RecommendResponse(
+        jobs=[JobRecommendation(id=job_id, title=getattr(job_features.get(job_id), 'title', None), score=score)
+              for job_id, score in matches],
+        indexed_jobs=len(job_index)
+    )
+
+# Short resume run through the detectors before forking, so workers inherit built pattern engines
+WARM_UP_RESUME = """Jordan Rivera
+jordan.rivera@example.com | (555) 123-4567
+
+EXPERIENCE
+Senior Software Engineer - Acme Corp
+• Developed a payment service using Python and PostgreSQL, cutting latency by 40%.
+
+EDUCATION
+Bachelor of Science in Computer Science
+
+SKILLS
+Python, Docker, Kubernetes, AWS"""
+
+def before_fork() -> None:
+    """Load models and build compiled analyzers once in a pre-fork parent (see prefork_server.py)"""
+    for name in REQUIRED_MODELS:
+        models.get_optional(name)
+    sample = AnalysisContext(WARM_UP_RESUME)
+    analyzer.calculate_standalone_score(sample)
+    analyzer.extract_keywords(sample)
+
+def after_fork() -> None:
+    """Give a forked worker its own threads and connections; models and analyzers stay shared"""
+    encode_scheduler.after_fork()
+    stage_pool.after_fork()
+    job_features.after_fork()
+    analyzer.llm_client.after_fork()
+
+@app.on_event('startup')
+async def preload_models():
+    if preload_enabled():
+        models.preload(REQUIRED_MODELS)
 
 @app.get('/health')
 async def health_check():
-    return {"status": "healthy", "service": "improved-hybrid-analyzer"}
+    return {
+        "status": "healthy",
+        "service": "improved-hybrid-analyzer",
+        "ready": models.is_ready(REQUIRED_MODELS),
+        "models": models.status(REQUIRED_MODELS),
+        "admission": admission.stats()
+    }
+
+@app.get('/metrics')
+async def prometheus_metrics():
+    """Stage and request latency histograms plus cache and queue gauges, in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.get('/cache/stats')
+async def cache_stats():
+    stats = {cache.name: cache.stats() for cache in (response_cache, resume_cache, job_keyword_cache)}
+    stats['embeddings'] = embedding_store.stats()
+    stats['encode_batches'] = encode_scheduler.stats()
+    stats['llm'] = analyzer.llm_client.stats()
+    stats['job_index'] = job_index.stats()
+    stats['job_features'] = job_features.stats()
+    return stats
 
 if __name__ == "__main__":
     import uvicorn
     print("Starting Improved Hybrid Resume Analysis Service...")
-    uvicorn.run(app, host="0.0.0.0", port=8001) 
\ No newline at end of file
+    workers = int(os.environ.get('WEB_WORKERS', '1'))
+    if workers > 1:
+        from prefork_server import PreforkServer
+        PreforkServer(sys.modules[__name__], host="0.0.0.0", port=8001, workers=workers).run()
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8001)
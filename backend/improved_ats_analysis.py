@@ -7,14 +7,31 @@ Enhanced section detection, keyword matching, and scoring algorithms
 import re
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from bisect import bisect_right
+from functools import cached_property, wraps
+from typing import Dict, List, Any, Callable, Optional, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
 
+from pattern_engine import PatternEngine, ScanResult
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Characters dropped when normalizing a candidate header line ("• SKILLS:" -> "skills")
+HEADER_DECORATION = re.compile(r'[^a-z0-9+#&/\- ]+')
+
+# Words that, next to a number, make a sentence an achievement sentence
+ACHIEVEMENT_INDICATORS = [
+    'achieved', 'accomplished', 'delivered', 'completed', 'launched', 'implemented',
+    'increased', 'decreased', 'improved', 'reduced', 'grew', 'expanded', 'optimized',
+    'engineered', 'architected', 'developed', 'built', 'created', 'designed'
+]
+
+# Words counted towards the experience score
+EXPERIENCE_INDICATORS = ['years', 'experience', 'worked', 'developed', 'implemented', 'managed', 'led']
+
 class SectionType(Enum):
     CONTACT = "contact"
     SUMMARY = "summary"
@@ -35,6 +52,54 @@ class SectionInfo:
     start_line: int
     end_line: int
 
+class AnalysisContext:
+    """One text under analysis: normalized views are built once and detector results memoized"""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self._results: Dict[Any, Any] = {}
+    
+    @classmethod
+    def of(cls, text: Union[str, 'AnalysisContext']) -> 'AnalysisContext':
+        """Wrap raw text, or pass an existing context through unchanged"""
+        return text if isinstance(text, cls) else cls(text)
+    
+    @cached_property
+    def text_lower(self) -> str:
+        return self.text.lower()
+    
+    @cached_property
+    def lines(self) -> List[str]:
+        return self.text.split('\n')
+    
+    @cached_property
+    def tokens(self) -> List[str]:
+        return self.text.split()
+    
+    @cached_property
+    def lower_tokens(self) -> List[str]:
+        return self.text_lower.split()
+    
+    @cached_property
+    def sentences(self) -> List[str]:
+        return self.text.split('.')
+    
+    def memoize(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """Return the cached result for key, computing it on first use"""
+        if key not in self._results:
+            self._results[key] = compute()
+        return self._results[key]
+
+TextInput = Union[str, AnalysisContext]
+
+def memoized(method: Callable) -> Callable:
+    """Let a detector take text or an AnalysisContext and run once per context"""
+    @wraps(method)
+    def wrapper(self, text: TextInput, *args):
+        context = AnalysisContext.of(text)
+        return context.memoize((method.__name__,) + args, lambda: method(self, context, *args))
+    return wrapper
+
 class ImprovedATSAnalyzer:
     def __init__(self):
         # Enhanced section patterns with multiple detection strategies
@@ -240,10 +305,111 @@ class ImprovedATSAnalyzer:
             r'\d+\s+hours?\s+saved',  # Time savings
             r'\d+\s+cost\s+reduction',  # Cost savings
         ]
+        
+        # Contact information patterns
+        self.contact_patterns = [
+            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email
+            r'\(\d{3}\)\s*\d{3}-\d{4}',  # Phone (US format)
+            r'\d{3}-\d{3}-\d{4}',  # Phone (dashed format)
+            r'\d{10}',  # Phone (10 digits)
+            r'linkedin\.com',  # LinkedIn
+            r'github\.com',  # GitHub
+            r'@[a-zA-Z0-9_]+',  # Social media handles
+            r'\b\d{1,3}\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd)\b',  # Address
+        ]
+        
+        # Skill-like phrasing patterns
+        self.skill_patterns = [
+            r'\b(?:proficient|experienced|skilled|expert|advanced|intermediate|beginner)\s+(?:in|with)\b',
+            r'\b(?:programming|coding|development|design|analysis|management)\s+(?:skills|experience)\b',
+            r'\b(?:tools|technologies|frameworks|languages|platforms)\b'
+        ]
+        
+        # Compile every pattern once; detectors read tagged hits from a single scan
+        self.header_regexes = {
+            section_type: [re.compile(header, re.IGNORECASE) for header in patterns['headers']]
+            for section_type, patterns in self.section_patterns.items()
+        }
+        self.header_lookup = self._build_header_lookup()
+        self.header_engine = self._build_header_engine()
+        self.pattern_engine = self._build_pattern_engine()
     
-    def detect_sections(self, text: str) -> Dict[str, Any]:
+    def _build_header_lookup(self) -> Dict[str, SectionType]:
+        """Map every normalized header phrase to its section (first section wins)"""
+        lookup = {}
+        for section_type, patterns in self.section_patterns.items():
+            for header in patterns['headers']:
+                for phrase in self._expand_header_pattern(header):
+                    lookup.setdefault(phrase, section_type)
+        return lookup
+    
+    @staticmethod
+    def _expand_header_pattern(pattern: str) -> List[str]:
+        """Expand a literal header regex into the phrases it matches"""
+        phrases = ['']
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith(r'\s', i):
+                quantifier = pattern[i + 2:i + 3]
+                spaced = [phrase + ' ' for phrase in phrases]
+                phrases = spaced + phrases if quantifier == '*' else spaced
+                i += 3 if quantifier in ('+', '*') else 2
+                continue
+            if pattern[i] == '\\':
+                char = pattern[i + 1]
+                if char.isalnum():
+                    return []
+                i += 2
+            elif pattern[i] in '[](){}|.*+^$':
+                return []  # Not a plain phrase; left to the regex fallback
+            else:
+                char = pattern[i]
+                i += 1
+            if pattern[i:i + 1] == '?':
+                phrases = [phrase + char for phrase in phrases] + phrases
+                i += 1
+            else:
+                phrases = [phrase + char for phrase in phrases]
+        return [' '.join(phrase.split()) for phrase in phrases]
+    
+    def _build_header_engine(self) -> PatternEngine:
+        """Header patterns restricted to a single line so hits map onto lines"""
+        engine = PatternEngine()
+        for section_type, patterns in self.section_patterns.items():
+            engine.add_patterns(section_type.value, [header.replace(r'\s', r'[^\S\n]') for header in patterns['headers']])
+        return engine.compile()
+    
+    def _build_pattern_engine(self) -> PatternEngine:
+        """Register all content, contact, achievement, keyword and verb patterns"""
+        engine = PatternEngine()
+        for section_type, patterns in self.section_patterns.items():
+            engine.add_patterns(f'content:{section_type.value}', patterns['content_indicators'])
+        engine.add_patterns('contact', self.contact_patterns)
+        engine.add_patterns('skill_hint', self.skill_patterns)
+        engine.add_patterns('achievement', self.achievement_patterns)
+        for category, keywords in self.technical_keywords.items():
+            engine.add_terms(f'keyword:{category}', keywords)
+        for category, verbs in self.ats_action_verbs.items():
+            engine.add_terms(f'verb:{category}', verbs)
+        return engine.compile()
+    
+    @memoized
+    def scan(self, context: AnalysisContext) -> ScanResult:
+        """Run every compiled pattern over the text in one pass"""
+        return self.pattern_engine.scan(context.text)
+    
+    @memoized
+    def detect_sections(self, context: AnalysisContext) -> Dict[str, Any]:
         """Enhanced section detection with multiple strategies"""
-        lines = text.split('\n')
+        lines = context.lines
+        section_blocks = self._section_blocks(lines)
+        contents = {section_type: self._section_content(lines, blocks) for section_type, blocks in section_blocks.items()}
+        return self.section_summary(self.scan(context), self.header_hits(context), section_blocks, contents)
+    
+    def section_summary(self, scan: ScanResult, header_hits: Dict[str, List[bool]],
+                        section_blocks: Dict[SectionType, List[Tuple[int, int]]],
+                        contents: Dict[SectionType, str]) -> Dict[str, Any]:
+        """Section detection from a text's pattern scan, header lines and section blocks"""
         detected_sections = {}
         section_scores = {}
         
@@ -251,62 +417,40 @@ class ImprovedATSAnalyzer:
         for section_type, patterns in self.section_patterns.items():
             section_name = section_type.value
             confidence = 0.0
-            section_content = ""
-            start_line = -1
-            end_line = -1
             
-            # Check for section headers
-            for i, line in enumerate(lines):
-                line_stripped = line.strip()
-                if len(line_stripped) > 2 and len(line_stripped) < 100:
-                    line_lower = line_stripped.lower()
-                    
-                    # Check if line matches any header pattern
-                    for header_pattern in patterns['headers']:
-                        if re.search(header_pattern, line_lower, re.IGNORECASE):
-                            confidence += 0.6
-                            start_line = i
-                            break
-                    
-                    # Check for all-caps headers (common in resumes)
-                    if line_stripped.isupper() and len(line_stripped) > 3:
-                        for header_pattern in patterns['headers']:
-                            if re.search(header_pattern, line_lower, re.IGNORECASE):
-                                confidence += 0.4
-                                if start_line == -1:
-                                    start_line = i
-                                break
+            # Lines mentioning a header phrase, plus a bonus for all-caps headers
+            for in_caps in header_hits.get(section_name, []):
+                confidence += 0.6
+                if in_caps:
+                    confidence += 0.4
             
             # Strategy 2: Content-based detection
-            text_lower = text.lower()
-            content_matches = 0
-            for indicator in patterns['content_indicators']:
-                if re.search(indicator, text_lower, re.IGNORECASE):
-                    content_matches += 1
+            content_matches = len(scan.matched_ids(f'content:{section_name}'))
             
             if content_matches > 0:
                 confidence += min(content_matches * 0.2, 0.4)
             
             # Strategy 3: Special detection for contact info
             if section_type == SectionType.CONTACT:
-                contact_found = self._detect_contact_info(text)
+                contact_found = self._contact_found(scan)
                 if contact_found:
                     confidence = max(confidence, 0.8)
             
             # Strategy 4: Special detection for skills
             if section_type == SectionType.SKILLS:
-                skills_found = self._detect_skills_content(text)
+                skills_found = self._skills_found(scan)
                 if skills_found:
                     confidence += 0.3
             
             # Store section information
             if confidence > 0.3:
+                blocks = section_blocks.get(section_type, [])
                 detected_sections[section_name] = SectionInfo(
                     name=section_name,
                     confidence=confidence,
-                    content=section_content,
-                    start_line=start_line,
-                    end_line=end_line
+                    content=contents.get(section_type, ''),
+                    start_line=blocks[0][0] if blocks else -1,
+                    end_line=blocks[-1][1] if blocks else -1
                 )
                 section_scores[section_name] = confidence
         
@@ -329,104 +473,199 @@ class ImprovedATSAnalyzer:
             'detected_count': detected_count
         }
     
-    def _detect_contact_info(self, text: str) -> bool:
-        """Enhanced contact information detection"""
-        contact_patterns = [
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email
-            r'\(\d{3}\)\s*\d{3}-\d{4}',  # Phone (US format)
-            r'\d{3}-\d{3}-\d{4}',  # Phone (dashed format)
-            r'\d{10}',  # Phone (10 digits)
-            r'linkedin\.com',  # LinkedIn
-            r'github\.com',  # GitHub
-            r'@[a-zA-Z0-9_]+',  # Social media handles
-            r'\b\d{1,3}\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd)\b',  # Address
-        ]
+    @memoized
+    def header_hits(self, context: AnalysisContext) -> Dict[str, List[bool]]:
+        """Per section, one entry per line mentioning a header phrase: whether that line is in capitals"""
+        lines = context.lines
+        return {
+            section_name: [lines[i].strip().isupper() and len(lines[i].strip()) > 3 for i in indexes]
+            for section_name, indexes in self._header_hit_lines(context.text, lines).items()
+        }
+    
+    def _header_hit_lines(self, text: str, lines: List[str]) -> Dict[str, List[int]]:
+        """Line indexes (3-99 chars stripped) containing a header phrase, per section"""
+        line_starts = []
+        offset = 0
+        for line in lines:
+            line_starts.append(offset)
+            offset += len(line) + 1
+        
+        hit_lines = {}
+        for hit in self.header_engine.scan(text).hits:
+            line_index = bisect_right(line_starts, hit.span[0]) - 1
+            hit_lines.setdefault(hit.category, set()).add(line_index)
         
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in contact_patterns)
+        return {
+            section_name: [i for i in sorted(indexes) if 2 < len(lines[i].strip()) < 100]
+            for section_name, indexes in hit_lines.items()
+        }
+    
+    def classify_header_line(self, line: str) -> Optional[SectionType]:
+        """Return the section a line introduces, if it reads as a section header"""
+        stripped = line.strip()
+        if not 2 < len(stripped) < 100:
+            return None
+        
+        phrase = ' '.join(HEADER_DECORATION.sub(' ', stripped.lower()).split())
+        section_type = self.header_lookup.get(phrase)
+        if section_type:
+            return section_type
+        
+        # Regex fallback for short decorated headers, e.g. "TECHNICAL SKILLS & TOOLS"
+        if (stripped.isupper() or stripped.endswith(':')) and len(phrase.split()) <= 4:
+            for candidate, header_regexes in self.header_regexes.items():
+                if any(header_regex.search(phrase) for header_regex in header_regexes):
+                    return candidate
+        return None
+    
+    def section_segments(self, lines: List[str]) -> List[Tuple[int, int, Optional[SectionType]]]:
+        """(start_line, end_line, section) pieces of a text split before every header line;
+        lines above the first header form an unlabelled piece"""
+        headers = [(i, self.classify_header_line(line)) for i, line in enumerate(lines)]
+        headers = [(i, section_type) for i, section_type in headers if section_type]
+        
+        segments = []
+        first_header = headers[0][0] if headers else len(lines)
+        if first_header > 0:
+            segments.append((0, first_header - 1, None))
+        for position, (start, section_type) in enumerate(headers):
+            end = headers[position + 1][0] - 1 if position + 1 < len(headers) else len(lines) - 1
+            segments.append((start, end, section_type))
+        return segments
+    
+    def segment_block(self, segment_lines: List[str], section_type: Optional[SectionType]) -> Optional[Tuple[int, int]]:
+        """Block a segment contributes, relative to its first line: from the header to the last
+        non-blank line, or the non-blank lines of the unlabelled preamble"""
+        filled = [i for i, line in enumerate(segment_lines) if line.strip()]
+        if section_type is None:
+            return (filled[0], filled[-1]) if filled else None
+        return 0, filled[-1]
+    
+    def group_blocks(self, blocks: List[Tuple[Optional[SectionType], int, int]]) -> Dict[SectionType, List[Tuple[int, int]]]:
+        """(section, start_line, end_line) blocks in document order, grouped by section"""
+        grouped = {}
+        for section_type, start, end in blocks:
+            if section_type:
+                # A repeated header (e.g. a second EXPERIENCE block) adds to the same section
+                grouped.setdefault(section_type, []).append((start, end))
+        
+        # Contact details usually sit above the first header without a heading of their own
+        if SectionType.CONTACT not in grouped:
+            preamble = [(start, end) for section_type, start, end in blocks if section_type is None]
+            if preamble:
+                grouped[SectionType.CONTACT] = preamble
+        
+        return grouped
     
-    def _detect_skills_content(self, text: str) -> bool:
+    def _section_blocks(self, lines: List[str]) -> Dict[SectionType, List[Tuple[int, int]]]:
+        """(start_line, end_line) blocks of each section, from a header to the next header"""
+        blocks = []
+        for start, end, section_type in self.section_segments(lines):
+            block = self.segment_block(lines[start:end + 1], section_type)
+            if block:
+                blocks.append((section_type, start + block[0], start + block[1]))
+        return self.group_blocks(blocks)
+    
+    def _section_content(self, lines: List[str], blocks: List[Tuple[int, int]]) -> str:
+        """Text of a section's blocks without their header lines"""
+        return '\n'.join(filter(None, (self.block_content(lines[start:end + 1]) for start, end in blocks)))
+    
+    def block_content(self, block_lines: List[str]) -> str:
+        """Stripped non-blank lines of one block, without its header line"""
+        first = 1 if block_lines and self.classify_header_line(block_lines[0]) else 0
+        return '\n'.join(line.strip() for line in block_lines[first:] if line.strip())
+    
+    @memoized
+    def section_spans(self, context: AnalysisContext) -> List[Tuple[str, int, int]]:
+        """(section name, start_line, end_line) of every section block, in document order"""
+        blocks = self._section_blocks(context.lines)
+        spans = [(section_type.value, start, end) for section_type, spans in blocks.items() for start, end in spans]
+        return sorted(spans, key=lambda span: span[1])
+    
+    @memoized
+    def _detect_contact_info(self, context: AnalysisContext) -> bool:
+        """Enhanced contact information detection"""
+        return self._contact_found(self.scan(context))
+    
+    def _contact_found(self, scan: ScanResult) -> bool:
+        return bool(scan.matched_ids('contact'))
+    
+    @memoized
+    def _detect_skills_content(self, context: AnalysisContext) -> bool:
         """Detect if resume contains skills content"""
+        return self._skills_found(self.scan(context))
+    
+    def _skills_found(self, scan: ScanResult) -> bool:
         # Check for technical skills
-        all_skills = []
-        for category, skills in self.technical_keywords.items():
-            all_skills.extend(skills)
-        
-        text_lower = text.lower()
-        found_skills = [skill for skill in all_skills if skill in text_lower]
+        found_skills = self._found_skills(scan)
         
         # Also check for skill-like patterns
-        skill_patterns = [
-            r'\b(?:proficient|experienced|skilled|expert|advanced|intermediate|beginner)\s+(?:in|with)\b',
-            r'\b(?:programming|coding|development|design|analysis|management)\s+(?:skills|experience)\b',
-            r'\b(?:tools|technologies|frameworks|languages|platforms)\b'
-        ]
-        
-        pattern_matches = any(re.search(pattern, text_lower) for pattern in skill_patterns)
+        pattern_matches = bool(scan.matched_ids('skill_hint'))
         
         return len(found_skills) > 2 or pattern_matches
     
-    def extract_keywords(self, text: str) -> Dict[str, List[str]]:
+    def _found_skills(self, scan: ScanResult) -> List[str]:
+        """Technical keywords present as whole words, in taxonomy order"""
+        return [
+            skill
+            for category, skills in self.technical_keywords.items()
+            for i, skill in enumerate(skills)
+            if scan.has(f'keyword:{category}', i)
+        ]
+    
+    @memoized
+    def extract_keywords(self, context: AnalysisContext) -> Dict[str, List[str]]:
         """Extract technical keywords from text with enhanced matching"""
-        text_lower = text.lower()
+        return self.found_keywords(self.scan(context))
+    
+    def found_keywords(self, scan: ScanResult) -> Dict[str, List[str]]:
+        """Technical keywords of a scan by category"""
         extracted_keywords = {}
         
         for category, keywords in self.technical_keywords.items():
-            found_keywords = []
-            for keyword in keywords:
-                # Use word boundary matching for more accurate detection
-                pattern = r'\b' + re.escape(keyword) + r'\b'
-                if re.search(pattern, text_lower):
-                    found_keywords.append(keyword)
+            # Word boundary matching is built into the engine's keyword matcher
+            found_keywords = [keywords[i] for i in scan.matched_ids(f'keyword:{category}')]
             
             if found_keywords:
                 extracted_keywords[category] = found_keywords
         
         return extracted_keywords
     
-    def detect_action_verbs(self, text: str) -> Dict[str, List[str]]:
+    @memoized
+    def detect_action_verbs(self, context: AnalysisContext) -> Dict[str, List[str]]:
         """Detect ATS action verbs by category"""
-        text_lower = text.lower()
+        return self.found_verbs(self.scan(context))
+    
+    def found_verbs(self, scan: ScanResult) -> Dict[str, List[str]]:
+        """ATS action verbs of a scan by category"""
         detected_verbs = {}
         
         for category, verbs in self.ats_action_verbs.items():
-            found_verbs = []
-            for verb in verbs:
-                # Use word boundary matching for more accurate detection
-                pattern = r'\b' + re.escape(verb) + r'\b'
-                if re.search(pattern, text_lower):
-                    found_verbs.append(verb)
+            found_verbs = [verbs[i] for i in scan.matched_ids(f'verb:{category}')]
             
             if found_verbs:
                 detected_verbs[category] = found_verbs
         
         return detected_verbs
     
-    def detect_quantifiable_achievements(self, text: str) -> Dict[str, Any]:
+    @memoized
+    def detect_quantifiable_achievements(self, context: AnalysisContext) -> Dict[str, Any]:
         """Enhanced quantifiable achievements detection"""
-        achievements = []
-        achievement_sentences = []
-        
-        # Find all quantifiable achievements
-        for pattern in self.achievement_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            achievements.extend(matches)
-        
         # Look for achievement sentences with context
-        achievement_indicators = [
-            'achieved', 'accomplished', 'delivered', 'completed', 'launched', 'implemented',
-            'increased', 'decreased', 'improved', 'reduced', 'grew', 'expanded', 'optimized',
-            'engineered', 'architected', 'developed', 'built', 'created', 'designed'
-        ]
-        
-        sentences = text.split('.')
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
-            # Check if sentence contains both achievement indicators and numbers
-            has_indicator = any(indicator in sentence_lower for indicator in achievement_indicators)
-            has_number = bool(re.search(r'\d+', sentence))
-            
-            if has_indicator and has_number:
-                achievement_sentences.append(sentence.strip())
+        achievement_sentences = [sentence.strip() for sentence in context.sentences if self.is_achievement_sentence(sentence)]
+        return self.achievement_summary(self.scan(context), achievement_sentences)
+    
+    def is_achievement_sentence(self, sentence: str) -> bool:
+        """Whether a sentence contains both achievement indicators and numbers"""
+        sentence_lower = sentence.lower()
+        has_indicator = any(indicator in sentence_lower for indicator in ACHIEVEMENT_INDICATORS)
+        has_number = bool(re.search(r'\d+', sentence))
+        return has_indicator and has_number
+    
+    def achievement_summary(self, scan: ScanResult, achievement_sentences: List[str]) -> Dict[str, Any]:
+        """Achievement score from a scan's achievement hits and the text's achievement sentences"""
+        # Find all quantifiable achievements
+        achievements = [hit.value for hit in scan.category_hits('achievement')]
         
         # Calculate achievement score
         total_achievements = len(achievements) + len(achievement_sentences)
@@ -439,40 +678,55 @@ class ImprovedATSAnalyzer:
             'total_achievements': total_achievements
         }
     
-    def analyze_format_optimization(self, text: str) -> Dict[str, Any]:
+    @memoized
+    def analyze_format_optimization(self, context: AnalysisContext) -> Dict[str, Any]:
         """Enhanced ATS-friendly formatting analysis"""
+        return self.format_summary(self.format_counts(context))
+    
+    @memoized
+    def format_counts(self, context: AnalysisContext) -> Dict[str, int]:
+        """Character and line counts the format analysis scores; they add up across pieces of a text"""
+        text = context.text
+        lines = context.lines
+        return {
+            'pipes': text.count('|'),
+            'tabs': text.count('\t'),
+            'images': int(any(indicator in context.text_lower for indicator in ['[image]', '[graphic]', '[chart]', '[logo]'])),
+            'bullets': text.count('•') + text.count('-') + text.count('*'),
+            'empty_lines': sum(1 for line in lines if line.strip() == ''),
+            'lines': len(lines),
+            # Section headers (good for ATS)
+            'section_headers': sum(
+                1 for line in lines
+                if line.strip().isupper() and len(line.strip()) > 3 and
+                any(word in line.strip().lower() for word in ['experience', 'education', 'skills', 'contact', 'summary'])
+            )
+        }
+    
+    def format_summary(self, counts: Dict[str, int]) -> Dict[str, Any]:
+        """Format score from the counts of format_counts"""
         problematic_elements = []
         
         # Check for tables (basic detection)
-        if '|' in text and text.count('|') > 10:
+        if counts['pipes'] > 10:
             problematic_elements.append('tables')
         
         # Check for excessive formatting
-        if text.count('\t') > 20:
+        if counts['tabs'] > 20:
             problematic_elements.append('excessive_tabs')
         
         # Check for images/graphics indicators
-        if any(indicator in text.lower() for indicator in ['[image]', '[graphic]', '[chart]', '[logo]']):
+        if counts['images']:
             problematic_elements.append('images')
         
         # Check for bullet points (good for ATS)
-        bullet_points = text.count('•') + text.count('-') + text.count('*')
-        bullet_score = min(bullet_points / 8, 1.0)  # Adjusted threshold
+        bullet_score = min(counts['bullets'] / 8, 1.0)  # Adjusted threshold
         
         # Check for proper spacing and structure
-        lines = text.split('\n')
-        empty_lines = sum(1 for line in lines if line.strip() == '')
-        spacing_score = min(empty_lines / max(len(lines), 1), 1.0)
+        spacing_score = min(counts['empty_lines'] / max(counts['lines'], 1), 1.0)
         
         # Check for section headers (good for ATS)
-        section_headers = 0
-        for line in lines:
-            line_stripped = line.strip()
-            if (line_stripped.isupper() and len(line_stripped) > 3 and 
-                any(word in line_stripped.lower() for word in ['experience', 'education', 'skills', 'contact', 'summary'])):
-                section_headers += 1
-        
-        header_score = min(section_headers / 4, 1.0)  # Adjusted threshold
+        header_score = min(counts['section_headers'] / 4, 1.0)  # Adjusted threshold
         
         # Check for consistent formatting
         has_consistent_formatting = (
@@ -496,42 +750,49 @@ class ImprovedATSAnalyzer:
             'ats_friendly': has_consistent_formatting
         }
     
-    def calculate_standalone_score(self, resume_text: str) -> Dict[str, Any]:
+    @memoized
+    def experience_count(self, context: AnalysisContext) -> int:
+        """Words of the text that indicate experience"""
+        return sum(1 for word in context.lower_tokens if word in EXPERIENCE_INDICATORS)
+    
+    @memoized
+    def calculate_standalone_score(self, context: AnalysisContext) -> Dict[str, Any]:
         """Calculate comprehensive standalone score without job description"""
-        text_lower = resume_text.lower()
-        
+        return self.standalone_summary(
+            self.scan(context),
+            word_count=len(context.tokens),
+            experience_count=self.experience_count(context),
+            detected_verbs=self.detect_action_verbs(context),
+            achievements=self.detect_quantifiable_achievements(context),
+            section_analysis=self.detect_sections(context),
+            format_analysis=self.analyze_format_optimization(context)
+        )
+    
+    def standalone_summary(self, scan: ScanResult, word_count: int, experience_count: int,
+                           detected_verbs: Dict[str, List[str]], achievements: Dict[str, Any],
+                           section_analysis: Dict[str, Any], format_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Standalone score from a text's scan, word counts and detector results"""
         # 1. Content richness score
-        word_count = len(resume_text.split())
         content_score = min(word_count / 400, 1.0)  # Adjusted threshold
         
         # 2. Skills diversity score
-        all_skills = []
-        for category, skills in self.technical_keywords.items():
-            all_skills.extend(skills)
-        
-        found_skills = [skill for skill in all_skills if skill in text_lower]
+        found_skills = self._found_skills(scan)
         skills_diversity = min(len(found_skills) / 20, 1.0)  # Adjusted threshold
         
         # 3. Action verbs score
-        detected_verbs = self.detect_action_verbs(resume_text)
         total_verbs = sum(len(verbs) for verbs in detected_verbs.values())
         action_verb_score = min(total_verbs / 15, 1.0)  # Adjusted threshold
         
         # 4. Achievement score
-        achievements = self.detect_quantifiable_achievements(resume_text)
         achievement_score = achievements['achievement_score']
         
         # 5. Section completeness
-        section_analysis = self.detect_sections(resume_text)
         section_score = section_analysis['completeness_score']
         
         # 6. Format quality score
-        format_analysis = self.analyze_format_optimization(resume_text)
         format_score = format_analysis['format_score']
         
         # 7. Experience indicators
-        experience_indicators = ['years', 'experience', 'worked', 'developed', 'implemented', 'managed', 'led']
-        experience_count = sum(1 for word in text_lower.split() if word in experience_indicators)
         experience_score = min(experience_count / 12, 1.0)  # Adjusted threshold
         
         # Calculate overall standalone score with improved weights
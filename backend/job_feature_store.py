@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Job Feature Store
+Precomputed job-side features persisted in SQLite, keyed by job id and content hash
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from result_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Rows read per query when syncing jobs written by other workers
+SYNC_BATCH = 500
+
+@dataclass
+class JobFeatures:
+    """Everything scoring needs from one job posting"""
+    job_id: str
+    content_hash: str
+    normalized_text: str
+    embedding: Optional[np.ndarray] = None
+    keywords: Optional[Dict[str, List[str]]] = None
+    skills: Optional[Dict[str, Any]] = None
+    title: Optional[str] = None
+
+class JobFeatureStore:
+    """Job features written once per posting version and read from memory while scoring.
+
+    The content hash covers the posting text and `version`, so edited postings and
+    changes to the feature logic are both picked up by `refresh`. Every row is loaded
+    into memory at open; lookups by text fall back to the indexed SQLite column, so rows
+    written by another worker are found too, and `sync` applies every job other workers
+    added, edited or removed since the last call.
+    """
+
+    def __init__(self, path: str = ':memory:', version: str = ''):
+        self.path = path
+        self.version = version
+        self._lock = threading.Lock()
+        self._inherited: List[sqlite3.Connection] = []
+        self._connection = self._connect()
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS job_features (job_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, '
+            'normalized_text TEXT NOT NULL, embedding BLOB, keywords TEXT, skills TEXT, title TEXT, updated REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS job_features_hash ON job_features (content_hash)')
+        self._connection.commit()
+        self._by_id: Dict[str, JobFeatures] = {}
+        self._by_hash: Dict[str, JobFeatures] = {}
+        # When each job's row was written, to tell which rows another worker has replaced
+        self._updated: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self._data_version = self._read_data_version()
+        for row in self._connection.execute('SELECT * FROM job_features'):
+            self._remember(self._from_row(row), row[-1])
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        connection.execute('PRAGMA journal_mode=WAL' if self.path != ':memory:' else 'PRAGMA journal_mode=MEMORY')
+        return connection
+
+    def after_fork(self) -> None:
+        """Open a fresh connection in a forked worker; the in-memory rows stay shared copy-on-write.
+
+        The inherited connection is kept but never used or closed: closing it could
+        checkpoint and remove the WAL that the parent still has open.
+        """
+        self._lock = threading.Lock()
+        if self.path != ':memory:':
+            self._inherited.append(self._connection)
+            self._connection = self._connect()
+            # Data versions are per connection: the next sync compares every row
+            self._data_version = None
+
+    @classmethod
+    def from_env(cls, name: str, version: str = '') -> 'JobFeatureStore':
+        """Store file `name` in JOB_FEATURE_STORE_DIR (default: next to this module)"""
+        directory = os.environ.get('JOB_FEATURE_STORE_DIR', os.path.dirname(os.path.abspath(__file__)))
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, name), version=version)
+
+    def hash_for(self, text: str) -> str:
+        return content_hash(text, self.version)
+
+    def get(self, job_id: str) -> Optional[JobFeatures]:
+        """Features for a job id, whatever version of the posting they describe"""
+        return self._by_id.get(job_id)
+
+    def get_by_text(self, text: str) -> Optional[JobFeatures]:
+        """Features computed for exactly this posting text, or None"""
+        key = self.hash_for(text)
+        features = self._by_hash.get(key)
+        if features is None:
+            with self._lock:
+                row = self._connection.execute(
+                    'SELECT * FROM job_features WHERE content_hash = ? LIMIT 1', (key,)
+                ).fetchone()
+                if row is not None:
+                    features = self._from_row(row)
+                    self._forget(features.job_id)
+                    self._remember(features, row[-1])
+        if features is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return features
+
+    def is_current(self, job_id: str, text: str) -> bool:
+        features = self._by_id.get(job_id)
+        return features is not None and features.content_hash == self.hash_for(text)
+
+    def put(self, features: JobFeatures) -> None:
+        embedding = None
+        if features.embedding is not None:
+            features.embedding = np.asarray(features.embedding, dtype=np.float32)
+            embedding = features.embedding.tobytes()
+        updated = time.time()
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO job_features VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (features.job_id, features.content_hash, features.normalized_text, embedding,
+                 json.dumps(features.keywords), json.dumps(features.skills), features.title, updated)
+            )
+            self._connection.commit()
+            self._forget(features.job_id)
+            self._remember(features, updated)
+
+    def remove(self, job_id: str) -> bool:
+        """Drop a job's features; returns whether it was stored"""
+        with self._lock:
+            deleted = self._connection.execute('DELETE FROM job_features WHERE job_id = ?', (job_id,)).rowcount
+            self._connection.commit()
+            features = self._forget(job_id)
+        return bool(deleted) or features is not None
+
+    def sync(self) -> Tuple[List[JobFeatures], List[str]]:
+        """Load jobs other connections (other workers) added or edited and drop those they removed.
+
+        Returns the changed features and the removed job ids. Costs one PRAGMA when nothing
+        was committed elsewhere since the last call.
+        """
+        with self._lock:
+            data_version = self._read_data_version()
+            if data_version == self._data_version:
+                return [], []
+            self._data_version = data_version
+            stored = dict(self._connection.execute('SELECT job_id, updated FROM job_features'))
+            removed = [job_id for job_id in self._by_id if job_id not in stored]
+            for job_id in removed:
+                self._forget(job_id)
+            stale = [job_id for job_id, updated in stored.items() if self._updated.get(job_id) != updated]
+            changed = []
+            for start in range(0, len(stale), SYNC_BATCH):
+                batch = stale[start:start + SYNC_BATCH]
+                rows = self._connection.execute(
+                    f"SELECT * FROM job_features WHERE job_id IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall()
+                for row in rows:
+                    features = self._from_row(row)
+                    self._forget(features.job_id)
+                    self._remember(features, row[-1])
+                    changed.append(features)
+        return changed, removed
+
+    def refresh(self, jobs: Sequence[Tuple[str, str]],
+                compute: Callable[[List[Tuple[str, str]]], List[JobFeatures]]) -> Dict[str, int]:
+        """Recompute features for new or edited (job id, text) pairs only; `compute` gets them in one batch"""
+        stale = [(job_id, text) for job_id, text in jobs if not self.is_current(job_id, text)]
+        added = sum(1 for job_id, _ in stale if job_id not in self._by_id)
+        if stale:
+            for features in compute(stale):
+                self.put(features)
+        return {'added': added, 'updated': len(stale) - added, 'unchanged': len(jobs) - len(stale)}
+
+    def all(self) -> List[JobFeatures]:
+        with self._lock:
+            return list(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {'jobs': len(self._by_id), 'hits': self.hits, 'misses': self.misses}
+
+    def _remember(self, features: JobFeatures, updated: float) -> None:
+        self._by_id[features.job_id] = features
+        self._by_hash[features.content_hash] = features
+        self._updated[features.job_id] = updated
+
+    def _forget(self, job_id: str) -> Optional[JobFeatures]:
+        features = self._by_id.pop(job_id, None)
+        self._updated.pop(job_id, None)
+        if features is not None and self._by_hash.get(features.content_hash) is features:
+            del self._by_hash[features.content_hash]
+        return features
+
+    def _read_data_version(self) -> int:
+        return self._connection.execute('PRAGMA data_version').fetchone()[0]
+
+    @staticmethod
+    def _from_row(row: Tuple) -> JobFeatures:
+        job_id, key, normalized_text, embedding, keywords, skills, title, _ = row
+        return JobFeatures(
+            job_id=job_id,
+            content_hash=key,
+            normalized_text=normalized_text,
+            embedding=np.frombuffer(embedding, dtype=np.float32).copy() if embedding is not None else None,
+            keywords=json.loads(keywords) if keywords else None,
+            skills=json.loads(skills) if skills else None,
+            title=title
+        )
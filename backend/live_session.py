@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Live Resume Session
+Incremental analysis of a resume being edited: only sections whose text changed are analyzed again
+"""
+
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from improved_ats_analysis import AnalysisContext, ImprovedATSAnalyzer, SectionType
+from pattern_engine import ScanResult
+from result_cache import content_hash
+from document_embedding import DEFAULT_CHUNK_WORDS, Chunk, chunk_document
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ResumeSegment:
+    """One piece of the resume, from a header line to the line before the next header.
+
+    Detector results are memoized on the piece's own context, so a piece seen before
+    (in this version of the text or an earlier one) is never analyzed twice.
+    """
+    key: str
+    section: Optional[SectionType]
+    context: AnalysisContext
+    line_count: int
+    block: Optional[Tuple[int, int]]
+    content: str
+    chunks: List[Chunk]
+    vectors: Optional[np.ndarray] = None
+
+class LiveResume:
+    """Analysis state of one resume across edits.
+
+    Each version of the text is split before every section header and each piece is
+    looked up by its content hash; only new pieces are scanned, and only their chunks are
+    encoded. Whole-resume results are recombined from the pieces' results with the
+    analyzer's own scoring, so they equal a full analysis of the text unless a pattern
+    match runs across a section header line.
+    """
+
+    def __init__(self, analyzer: ImprovedATSAnalyzer, max_words: int = DEFAULT_CHUNK_WORDS, max_segments: int = 64):
+        self.analyzer = analyzer
+        self.max_words = max_words
+        self.max_segments = max_segments
+        self.text = ''
+        self.segments: List[ResumeSegment] = []
+        self._known: 'OrderedDict[str, ResumeSegment]' = OrderedDict()
+
+    def update(self, text: str) -> List[ResumeSegment]:
+        """Adopt a new version of the text; returns the pieces that had to be analyzed"""
+        lines = text.split('\n')
+        segments, analyzed = [], []
+        for start, end, section_type in self.analyzer.section_segments(lines):
+            segment_lines = lines[start:end + 1]
+            segment_text = '\n'.join(segment_lines)
+            key = content_hash(segment_text)
+            segment = self._known.get(key)
+            if segment is None:
+                segment = self._analyze(key, segment_text, segment_lines, section_type)
+                self._known[key] = segment
+                analyzed.append(segment)
+            else:
+                self._known.move_to_end(key)
+            segments.append(segment)
+
+        # Pieces of earlier versions are kept a while so undoing an edit is free too
+        while len(self._known) > max(self.max_segments, len(segments)):
+            self._known.popitem(last=False)
+        self.text, self.segments = text, segments
+        return analyzed
+
+    def _analyze(self, key: str, text: str, lines: List[str], section_type: Optional[SectionType]) -> ResumeSegment:
+        analyzer = self.analyzer
+        context = AnalysisContext(text)
+        block = analyzer.segment_block(lines, section_type)
+        label = section_type.value if section_type else None
+        segment = ResumeSegment(
+            key=key,
+            section=section_type,
+            context=context,
+            line_count=len(lines),
+            block=block,
+            content=analyzer.block_content(lines[block[0]:block[1] + 1]) if block else '',
+            chunks=[chunk._replace(section=label) for chunk in chunk_document(text, None, self.max_words)]
+        )
+        # Everything recombination reads, computed while the piece is new
+        analyzer.scan(context)
+        analyzer.header_hits(context)
+        analyzer.format_counts(context)
+        analyzer.experience_count(context)
+        self._inner_achievement_sentences(segment)
+        return segment
+
+    def _inner_achievement_sentences(self, segment: ResumeSegment) -> List[str]:
+        """Achievement sentences that start and end inside the piece"""
+        context = segment.context
+        return context.memoize('inner_achievement_sentences', lambda: [
+            sentence.strip() for sentence in context.sentences[1:-1] if self.analyzer.is_achievement_sentence(sentence)
+        ])
+
+    def scan(self) -> ScanResult:
+        """The pieces' pattern hits as one scan of the whole text"""
+        hits = []
+        offset = 0
+        for segment in self.segments:
+            hits.extend(hit._replace(span=(hit.span[0] + offset, hit.span[1] + offset))
+                        for hit in self.analyzer.scan(segment.context).hits)
+            offset += len(segment.context.text) + 1
+        return ScanResult(self.text, hits)
+
+    def achievement_sentences(self) -> List[str]:
+        """Achievement sentences of the whole text; only sentences running across pieces are checked again"""
+        sentences = []
+        open_sentence = None
+        for segment in self.segments:
+            fragments = segment.context.sentences
+            head = fragments[0] if open_sentence is None else open_sentence + '\n' + fragments[0]
+            if len(fragments) == 1:
+                open_sentence = head
+                continue
+            if self.analyzer.is_achievement_sentence(head):
+                sentences.append(head.strip())
+            sentences.extend(self._inner_achievement_sentences(segment))
+            open_sentence = fragments[-1]
+        if open_sentence is not None and self.analyzer.is_achievement_sentence(open_sentence):
+            sentences.append(open_sentence.strip())
+        return sentences
+
+    def detect_sections(self, scan: ScanResult) -> Dict[str, Any]:
+        analyzer = self.analyzer
+        header_hits: Dict[str, List[bool]] = {}
+        blocks = []
+        contents_at = {}
+        line_offset = 0
+        for segment in self.segments:
+            for section_name, hits in analyzer.header_hits(segment.context).items():
+                header_hits.setdefault(section_name, []).extend(hits)
+            if segment.block:
+                start = line_offset + segment.block[0]
+                blocks.append((segment.section, start, line_offset + segment.block[1]))
+                contents_at[start] = segment.content
+            line_offset += segment.line_count
+
+        grouped = analyzer.group_blocks(blocks)
+        contents = {
+            section_type: '\n'.join(filter(None, (contents_at[start] for start, _ in section_type_blocks)))
+            for section_type, section_type_blocks in grouped.items()
+        }
+        return analyzer.section_summary(scan, header_hits, grouped, contents)
+
+    def resume_side(self) -> Dict[str, Any]:
+        """Standalone analysis and keywords of the current text, as compute_resume_side returns them"""
+        analyzer = self.analyzer
+        scan = self.scan()
+
+        format_counts: Dict[str, int] = {}
+        for segment in self.segments:
+            for name, count in analyzer.format_counts(segment.context).items():
+                format_counts[name] = format_counts.get(name, 0) + count
+
+        standalone_analysis = analyzer.standalone_summary(
+            scan,
+            word_count=sum(len(segment.context.tokens) for segment in self.segments),
+            experience_count=sum(analyzer.experience_count(segment.context) for segment in self.segments),
+            detected_verbs=analyzer.found_verbs(scan),
+            achievements=analyzer.achievement_summary(scan, self.achievement_sentences()),
+            section_analysis=self.detect_sections(scan),
+            format_analysis=analyzer.format_summary(format_counts)
+        )
+        return {'standalone_analysis': standalone_analysis, 'resume_keywords': analyzer.found_keywords(scan)}
+
+    async def embed(self, store, scheduler) -> Tuple[List[Chunk], np.ndarray]:
+        """Chunks of the text and their vectors; only chunks of pieces not yet embedded are encoded"""
+        pending = [segment for segment in self.segments if segment.vectors is None and segment.chunks]
+        if pending:
+            vectors = await store.encode_async(scheduler, [chunk.text for segment in pending for chunk in segment.chunks])
+            offset = 0
+            for segment in pending:
+                segment.vectors = np.stack(vectors[offset:offset + len(segment.chunks)])
+                offset += len(segment.chunks)
+
+        embedded = [segment for segment in self.segments if segment.chunks]
+        if not embedded:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        return ([chunk for segment in embedded for chunk in segment.chunks],
+                np.concatenate([segment.vectors for segment in embedded]))
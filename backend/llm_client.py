@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+LLM Client
+Async pooled Ollama client with in-flight deduplication, a persistent response cache and a circuit breaker
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from result_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434/api/generate"
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one trial call through per cooldown"""
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.cooldown_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; a half-open breaker admits one trial and re-arms"""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open':
+            self.opened_at = self.clock()  # Further callers wait for the trial's outcome
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"LLM circuit opened after {self.consecutive_failures} failures")
+            self.opened_at = self.clock()
+
+class PromptCache:
+    """Prompt-hash to response store in SQLite, shared by workers on the same host"""
+
+    def __init__(self, path: str = ':memory:', ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._inherited: List[sqlite3.Connection] = []
+        self._connection = self._connect()
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        self._connection.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        connection.execute('PRAGMA journal_mode=WAL' if self.path != ':memory:' else 'PRAGMA journal_mode=MEMORY')
+        return connection
+
+    def after_fork(self) -> None:
+        """Open a fresh connection in a forked worker, leaving the parent's one untouched"""
+        self._lock = threading.Lock()
+        if self.path != ':memory:':
+            self._inherited.append(self._connection)
+            self._connection = self._connect()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute('SELECT response, created FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        response, created = row
+        if self.ttl_seconds is not None and time.time() - created > self.ttl_seconds:
+            return None
+        return response
+
+    def put(self, key: str, response: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)', (key, response, time.time())
+            )
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+class OllamaClient:
+    """Keep-alive Ollama client: cache, then in-flight dedupe, then breaker, then a semaphore-limited call.
+
+    Failures and an open breaker return "" so callers fall back to their default insights.
+    """
+
+    def __init__(self, url: str = DEFAULT_OLLAMA_URL, model: str = 'llama2', timeout: float = 10.0,
+                 max_concurrency: int = 4, cache: Optional[PromptCache] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.cache = cache if cache is not None else PromptCache()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._closer: Optional['asyncio.Task[None]'] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, 'asyncio.Future[str]'] = {}
+        self.calls = 0
+        self.cache_hits = 0
+        self.deduplicated = 0
+        self.short_circuited = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls, timeout: float) -> 'OllamaClient':
+        """Client configured by OLLAMA_URL, OLLAMA_MODEL, OLLAMA_MAX_CONCURRENCY, OLLAMA_CACHE_PATH,
+        OLLAMA_CACHE_TTL_SECONDS, OLLAMA_BREAKER_FAILURES and OLLAMA_BREAKER_COOLDOWN_SECONDS"""
+        default_cache = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'llm_cache.sqlite3')
+        return cls(
+            url=os.environ.get('OLLAMA_URL', DEFAULT_OLLAMA_URL),
+            model=os.environ.get('OLLAMA_MODEL', 'llama2'),
+            timeout=timeout,
+            max_concurrency=int(os.environ.get('OLLAMA_MAX_CONCURRENCY', '4')),
+            cache=PromptCache(
+                os.environ.get('OLLAMA_CACHE_PATH', default_cache),
+                ttl_seconds=float(os.environ.get('OLLAMA_CACHE_TTL_SECONDS', '86400'))
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get('OLLAMA_BREAKER_FAILURES', '3')),
+                cooldown_seconds=float(os.environ.get('OLLAMA_BREAKER_COOLDOWN_SECONDS', '30'))
+            )
+        )
+
+    def _bind_loop(self) -> None:
+        """Connection pool, semaphore and in-flight table belong to the running event loop.
+
+        Each pool is closed on its own loop when that loop cancels its remaining tasks on the way
+        out (as asyncio.run does), so moving to a new loop leaves no connections of the old one open.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            )
+            self._closer = loop.create_task(self._close_with_loop(self._client))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._in_flight = {}
+
+    @staticmethod
+    async def _close_with_loop(client: httpx.AsyncClient) -> None:
+        try:
+            await asyncio.Future()
+        finally:
+            await client.aclose()
+
+    async def generate(self, prompt: str) -> str:
+        """Response text for the prompt, or "" when the LLM is unavailable"""
+        key = content_hash(self.model, prompt)
+        # SQLite reads and writes go through the default executor, off the event loop
+        cached = await asyncio.get_running_loop().run_in_executor(None, self.cache.get, key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        self._bind_loop()
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(pending)
+
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            return ""
+
+        task = asyncio.ensure_future(self._call(prompt, key))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _call(self, prompt: str, key: str) -> str:
+        async with self._semaphore:
+            self.calls += 1
+            try:
+                response = await self._client.post(
+                    self.url,
+                    json={
+                        "model": self.model,
+                        "prompt": prompt,
+                        "stream": False
+                    }
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"Ollama returned {response.status_code}")
+                text = response.json().get('response', '')
+            except Exception as e:
+                self.failures += 1
+                self.breaker.record_failure()
+                logger.debug(f"Ollama not available: {e}")
+                return ""
+        self.breaker.record_success()
+        if text:
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.put, key, text)
+        return text
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._closer.cancel()
+            self._client = None
+            self._closer = None
+            self._loop = None
+
+    def after_fork(self) -> None:
+        """Drop the parent's connection pool and reopen the prompt cache in a forked worker"""
+        self._loop = None
+        self._client = None
+        self._closer = None
+        self._semaphore = None
+        self._in_flight = {}
+        self.cache.after_fork()
+
+    def stats(self) -> Dict[str, Any]:
+        """Call, cache, dedupe and breaker counters"""
+        return {
+            'calls': self.calls,
+            'cache_hits': self.cache_hits,
+            'deduplicated': self.deduplicated,
+            'short_circuited': self.short_circuited,
+            'failures': self.failures,
+            'in_flight': len(self._in_flight),
+            'breaker_state': self.breaker.state,
+            'cached_responses': len(self.cache)
+        }
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Model Registry
+Lazy, thread-safe model loading with optional parallel preloading and readiness reporting
+"""
+
+import os
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from embedding_backend import backend_from_env, load_backend, model_id
+
+logger = logging.getLogger(__name__)
+
+# Embedding inference backend (torch, torch-int8 or onnx) and an optional local model path
+EMBEDDING_BACKEND = backend_from_env()
+EMBEDDING_MODEL_PATH = os.environ.get('EMBEDDING_MODEL_PATH')
+
+# Keys stored embeddings and job features, so vectors from different backends or models never mix
+EMBEDDING_MODEL_ID = model_id(EMBEDDING_BACKEND, EMBEDDING_MODEL_PATH)
+
+class ModelUnavailableError(RuntimeError):
+    """Raised when a model failed to load"""
+
+class ModelRegistry:
+    """Named model loaders that run once, on first use or in a background preload thread.
+
+    Nothing is imported or downloaded until a model is requested. A failed load is
+    remembered for `retry_seconds` so requests do not all wait on the same failure.
+    """
+
+    def __init__(self, retry_seconds: float = 60.0):
+        self.retry_seconds = retry_seconds
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._models: Dict[str, Any] = {}
+        self._states: Dict[str, str] = {}
+        self._errors: Dict[str, str] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._load_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """Add a loader; re-registering a name that is already loaded keeps the loaded model"""
+        self._loaders[name] = loader
+        self._locks.setdefault(name, threading.Lock())
+        self._states.setdefault(name, 'not_loaded')
+
+    def set(self, name: str, model: Any) -> None:
+        """Install an already-built model (e.g. a stand-in in tests)"""
+        self._locks.setdefault(name, threading.Lock())
+        self._models[name] = model
+        self._states[name] = 'ready'
+        self._errors.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Model by name, loading it on first use"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._locks:
+            raise KeyError(f"No model registered as {name!r}")
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            failed_at = self._failed_at.get(name)
+            if failed_at is not None and time.monotonic() - failed_at < self.retry_seconds:
+                raise ModelUnavailableError(f"{name} failed to load: {self._errors[name]}")
+            self._states[name] = 'loading'
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._states[name] = 'failed'
+                self._errors[name] = str(e)
+                self._failed_at[name] = time.monotonic()
+                logger.error(f"Failed to load {name}: {e}")
+                raise ModelUnavailableError(f"{name} failed to load: {e}") from e
+            self._load_seconds[name] = time.perf_counter() - start
+            self._models[name] = model
+            self._states[name] = 'ready'
+            self._errors.pop(name, None)
+            self._failed_at.pop(name, None)
+            logger.info(f"Loaded {name} in {self._load_seconds[name]:.2f}s")
+            return model
+
+    def get_optional(self, name: str) -> Optional[Any]:
+        """Model by name, or None if it cannot be loaded"""
+        try:
+            return self.get(name)
+        except ModelUnavailableError:
+            return None
+
+    def preload(self, names: Optional[Iterable[str]] = None) -> List[threading.Thread]:
+        """Load models in parallel background threads; returns the threads"""
+        threads = []
+        for name in names if names is not None else list(self._loaders):
+            if name in self._models:
+                continue
+            thread = threading.Thread(target=self.get_optional, args=(name,), name=f'load-{name}', daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def is_ready(self, names: Optional[Iterable[str]] = None) -> bool:
+        """Whether every named (default: every registered) model is loaded"""
+        return all(name in self._models for name in (names if names is not None else self._loaders))
+
+    def status(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Load state, load time and last error per model"""
+        status = {}
+        for name in names if names is not None else self._states:
+            entry = {'state': self._states.get(name, 'not_loaded')}
+            if name in self._load_seconds:
+                entry['load_seconds'] = round(self._load_seconds[name], 3)
+            if name in self._errors:
+                entry['error'] = self._errors[name]
+            status[name] = entry
+        return status
+
+def load_sentence_transformer() -> Any:
+    return load_backend(EMBEDDING_BACKEND, EMBEDDING_MODEL_PATH)
+
+# Only noun chunks are read, which need the tagger and parser; NER and lemmas are never used
+SPACY_EXCLUDE = ['ner', 'lemmatizer', 'senter']
+
+def load_spacy() -> Any:
+    import spacy
+    return spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)  # You'll need to install this: python -m spacy download en_core_web_sm
+
+def load_stopwords() -> Any:
+    import nltk
+    try:
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        nltk.download('stopwords')
+    from nltk.corpus import stopwords
+    return set(stopwords.words('english'))
+
+def load_tfidf() -> Any:
+    from tfidf_model import TfidfModel
+    return TfidfModel.load_or_default()
+
+# Shared by every service module imported into the process
+models = ModelRegistry(retry_seconds=float(os.environ.get('MODEL_RETRY_SECONDS', '60')))
+models.register('sentence_transformer', load_sentence_transformer)
+models.register('spacy', load_spacy)
+models.register('stopwords', load_stopwords)
+models.register('tfidf', load_tfidf)
+
+def preload_enabled() -> bool:
+    """Whether services should start loading their models at startup (PRELOAD_MODELS, default on)"""
+    return os.environ.get('PRELOAD_MODELS', '1') == '1'
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+NDJSON Stream
+Incremental newline-delimited JSON parsing and bounded chunking for streaming endpoints
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterable, AsyncIterator, List, Tuple
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+class LineTooLongError(ValueError):
+    """A record exceeded the configured line limit and was skipped"""
+
+async def iter_ndjson(byte_chunks: AsyncIterable[bytes], max_line_bytes: int = 1024 * 1024) -> AsyncIterator[Tuple[int, Any]]:
+    """(record index, parsed object or exception) for each non-blank line.
+
+    Only the current partial line is buffered, so memory is bounded by `max_line_bytes`
+    however large the body is. Malformed and over-long lines are yielded as exceptions
+    so the caller can report them in place and carry on.
+    """
+    buffer = bytearray()
+    skipping = False
+    index = 0
+    async for chunk in byte_chunks:
+        start = 0
+        while True:
+            end = chunk.find(b'\n', start)
+            if end == -1:
+                if not skipping:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        yield index, LineTooLongError(f"Line exceeds {max_line_bytes} bytes")
+                        index += 1
+                        buffer.clear()
+                        skipping = True
+                break
+            if skipping:
+                skipping = False
+            else:
+                buffer += chunk[start:end]
+                if len(buffer) > max_line_bytes:
+                    yield index, LineTooLongError(f"Line exceeds {max_line_bytes} bytes")
+                    index += 1
+                elif buffer.strip():
+                    yield index, _parse(buffer)
+                    index += 1
+            buffer.clear()
+            start = end + 1
+    if not skipping and buffer.strip():
+        yield index, _parse(buffer)
+
+def _parse(line: bytearray) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+async def chunked(items: AsyncIterable[Any], size: int) -> AsyncIterator[List[Any]]:
+    """Group an async iterable into lists of at most `size` items"""
+    chunk: List[Any] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator may still be reading the request body.
+
+    Starlette's default listens for disconnects with a concurrent receive(), which would
+    swallow request body messages; here the body reader sees the disconnect instead.
+    The background task runs even after a disconnect, so it can release what the
+    handler acquired.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        finally:
+            if self.background is not None:
+                await self.background()
@@ -0,0 +1,399 @@
+"""
+Compiled Pattern Engine
+Single-pass multi-pattern matching shared by the ATS detectors
+"""
+
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Regex escapes that stand for a character class or an assertion, not a literal
+_CLASS_ESCAPES = set('dDwWsSbBAZ0123456789')
+# Escapes that match without consuming text
+_ZERO_WIDTH_ESCAPES = set('bBAZ')
+# Escapes that stand for one control character
+_CONTROL_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v', 'a': '\a'}
+# Escapes with an argument: character codes (\x41, \u00e9, \U0001f600), named characters and
+# octal or group-reference numbers
+_ARGUMENT_ESCAPE = re.compile(r'x(?P<x>[0-9a-fA-F]{2})|u(?P<u>[0-9a-fA-F]{4})|U(?P<U>[0-9a-fA-F]{8})|N\{[^}]*\}|\d{1,3}')
+_WHITESPACE_RUN = re.compile(r'\s+')
+
+
+class PatternHit(NamedTuple):
+    category: str
+    pattern_id: int
+    span: Tuple[int, int]
+    value: Any  # Same shape re.findall would return for this match
+
+
+class AhoCorasick:
+    """Multi-literal matcher that reports every occurrence in one pass over the text"""
+
+    def __init__(self, literals: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+
+        for literal in literals:
+            if literal:
+                self._insert(literal)
+        self._build_failure_links()
+
+    def _insert(self, literal: str) -> None:
+        state = 0
+        for char in literal:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = next_state
+            state = next_state
+        if literal not in self._output[state]:
+            self._output[state] += (literal,)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+        # Transitions resolved through failure links are memoized on first use
+        self._delta: List[Dict[str, int]] = [dict(transitions) for transitions in self._goto]
+
+    def _resolve(self, state: int, char: str) -> int:
+        origin = state
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        target = self._goto[state].get(char, 0)
+        self._delta[origin][char] = target
+        return target
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (start, literal) for every occurrence, overlapping ones included"""
+        delta, output, resolve = self._delta, self._output, self._resolve
+        state = 0
+        for index, char in enumerate(text):
+            next_state = delta[state].get(char)
+            state = resolve(state, char) if next_state is None else next_state
+            if output[state]:
+                for literal in output[state]:
+                    yield index - len(literal) + 1, literal
+
+    def find_positions(self, text: str) -> Dict[str, List[int]]:
+        """Map each literal that occurs in the text to its start offsets"""
+        positions: Dict[str, List[int]] = {}
+        for start, literal in self.iter_matches(text):
+            positions.setdefault(literal, []).append(start)
+        return positions
+
+
+def required_literal(pattern: str) -> Tuple[Optional[str], bool]:
+    """Longest literal run every match of the pattern must contain (lowercased)
+
+    Returns the literal and whether matches always begin with it. Only the regex
+    subset used by the analyzers is understood; anything else (top-level
+    alternation, inline flags) yields no literal so the pattern is always run.
+    """
+    runs: List[Tuple[str, bool]] = []
+    current: List[str] = []
+    state = {'leading': True, 'run_leading': True}
+
+    def consume():
+        # A consuming atom follows: the next run can no longer start the match
+        close_run()
+        state['leading'] = False
+
+    def close_run():
+        if current:
+            runs.append((''.join(current), state['run_leading']))
+            current.clear()
+
+    def append_literal(char):
+        if not current:
+            state['run_leading'] = state['leading']
+        state['leading'] = False
+        current.append(char.lower())
+
+    i = 0
+    length = len(pattern)
+    while i < length:
+        char = pattern[i]
+        if char == '\\' and i + 1 < length:
+            escaped = pattern[i + 1]
+            argument = _ARGUMENT_ESCAPE.match(pattern, i + 1)
+            if argument:
+                i = argument.end()
+                code = argument.group('x') or argument.group('u') or argument.group('U')
+                if code:
+                    append_literal(chr(int(code, 16)))
+                else:
+                    consume()  # Named characters, octal escapes and backreferences end the run
+                continue
+            i += 2
+            if escaped in _ZERO_WIDTH_ESCAPES:
+                close_run()
+            elif escaped in _CONTROL_ESCAPES:
+                append_literal(_CONTROL_ESCAPES[escaped])
+            elif escaped in _CLASS_ESCAPES or escaped.isalnum():
+                consume()  # Class escapes, and any letter escape not known to be a literal
+            else:
+                append_literal(escaped)
+        elif char == '[':
+            consume()
+            i += 1
+            if i < length and pattern[i] == '^':
+                i += 1
+            if i < length and pattern[i] == ']':
+                i += 1
+            while i < length and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+        elif char == '(':
+            if pattern.startswith('(?', i) and not pattern.startswith(('(?:', '(?P<', '(?=', '(?!', '(?<'), i):
+                return None, False  # Inline flags change how the literals match
+            consume()
+            depth = 0
+            while i < length:
+                if pattern[i] == '\\':
+                    i += 2
+                    continue
+                if pattern[i] == '(':
+                    depth += 1
+                elif pattern[i] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+            i += 1
+        elif char == '|':
+            return None, False
+        elif char == '^':
+            close_run()
+            i += 1
+        elif char in '.$':
+            consume()
+            i += 1
+        elif char in '?*+{' and not (char == '{' and '}' not in pattern[i:]):
+            # The quantifier applies to the last atom; drop it if it may be absent
+            if char == '{':
+                close = pattern.index('}', i)
+                minimum = pattern[i + 1:close].split(',')[0].strip()
+                optional = minimum in ('', '0')
+                i = close + 1
+            else:
+                optional = char != '+'
+                i += 1
+            if optional and current:
+                current.pop()
+            consume()
+            if i < length and pattern[i] in '?+':
+                i += 1  # Lazy / possessive modifier
+        else:
+            append_literal(char)
+            i += 1
+    close_run()
+
+    runs = [run for run in runs if run[0]]
+    if not runs:
+        return None, False
+    return max(runs, key=lambda run: (len(run[0]), run[1]))
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def _lower_in_place(text: str) -> str:
+    """Lowercase without changing length, so offsets still point into the original"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+
+class KeywordMatcher:
+    """Dictionary matcher for keyword lists with word-boundary semantics
+
+    All terms are matched case-insensitively in one Aho-Corasick pass. Any run
+    of whitespace in the text matches the single space of a multi-word term
+    ('sql server', 'github actions'), and a term only matches where its
+    alphanumeric edges are not glued to another word character, so 'go' does
+    not match inside 'google' while 'c++' and 'node.js' still match.
+    """
+
+    def __init__(self):
+        self._terms: Dict[str, List[Tuple[str, int, str]]] = {}
+        self._automaton: Optional[AhoCorasick] = None
+
+    def add(self, category: str, term_id: int, term: str) -> None:
+        normalized = ' '.join(term.lower().split())
+        if normalized:
+            self._terms.setdefault(normalized, []).append((category, term_id, term))
+            self._automaton = None
+
+    def add_terms(self, category: str, terms: Iterable[str]) -> None:
+        for term_id, term in enumerate(terms):
+            self.add(category, term_id, term)
+
+    def compile(self) -> 'KeywordMatcher':
+        self._automaton = AhoCorasick(self._terms.keys())
+        return self
+
+    def find(self, text: str) -> List[PatternHit]:
+        """Every whole-word term occurrence, with spans in the original text"""
+        if self._automaton is None:
+            self.compile()
+
+        lowered = _lower_in_place(text)
+        normalized = _WHITESPACE_RUN.sub(' ', lowered)
+
+        # Breakpoints to map offsets in the collapsed text back to the original
+        breaks, shifts = [0], [0]
+        if len(normalized) != len(text):
+            collapsed = 0
+            for run in _WHITESPACE_RUN.finditer(lowered):
+                extra = run.end() - run.start() - 1
+                if extra:
+                    collapsed += extra
+                    breaks.append(run.end() - collapsed)
+                    shifts.append(collapsed)
+
+        def original(offset: int) -> int:
+            return offset + shifts[bisect_right(breaks, offset) - 1]
+
+        hits = []
+        length = len(normalized)
+        for start, term in self._automaton.iter_matches(normalized):
+            end = start + len(term)
+            if _is_word_char(term[0]) and start > 0 and _is_word_char(normalized[start - 1]):
+                continue
+            if _is_word_char(term[-1]) and end < length and _is_word_char(normalized[end]):
+                continue
+            span = (original(start), original(end - 1) + 1)
+            for category, term_id, source in self._terms[term]:
+                hits.append(PatternHit(category, term_id, span, source))
+        return hits
+
+
+class ScanResult:
+    """Tagged hits from a single scan, indexed by category and pattern id"""
+
+    def __init__(self, text: str, hits: List[PatternHit]):
+        self.text = text
+        self.hits = hits
+        self._by_category: Dict[str, Dict[int, List[PatternHit]]] = {}
+        for hit in hits:
+            self._by_category.setdefault(hit.category, {}).setdefault(hit.pattern_id, []).append(hit)
+
+    def has(self, category: str, pattern_id: int) -> bool:
+        return pattern_id in self._by_category.get(category, {})
+
+    def matched_ids(self, category: str) -> List[int]:
+        return sorted(self._by_category.get(category, {}))
+
+    def category_hits(self, category: str) -> List[PatternHit]:
+        by_id = self._by_category.get(category, {})
+        return [hit for pattern_id in sorted(by_id) for hit in by_id[pattern_id]]
+
+
+class PatternEngine:
+    """All analyzer patterns compiled once and matched in one pass per text
+
+    A single Aho-Corasick pass over the lowercased text finds where each
+    required literal occurs. Patterns whose literal is absent are skipped,
+    patterns that start with their literal are only tried at those offsets,
+    and the rest are run normally, so cost follows text length rather than
+    pattern count.
+    """
+
+    def __init__(self, flags: int = re.IGNORECASE):
+        self.flags = flags
+        self._entries: List[Tuple[str, int, re.Pattern, bool]] = []
+        self._anchored: Dict[str, List[int]] = {}
+        self._unanchored: List[int] = []
+        self._automaton: Optional[AhoCorasick] = None
+        self._keywords = KeywordMatcher()
+
+    def add(self, category: str, pattern_id: int, pattern: str) -> None:
+        compiled = re.compile(pattern, self.flags)
+        literal, leading = required_literal(pattern)
+        entry_index = len(self._entries)
+        self._entries.append((category, pattern_id, compiled, leading))
+
+        if literal:
+            self._anchored.setdefault(literal, []).append(entry_index)
+        else:
+            self._unanchored.append(entry_index)
+        self._automaton = None
+
+    def add_patterns(self, category: str, patterns: Iterable[str]) -> None:
+        for pattern_id, pattern in enumerate(patterns):
+            self.add(category, pattern_id, pattern)
+
+    def add_terms(self, category: str, terms: Iterable[str]) -> None:
+        """Register plain keyword terms, matched as whole words in one dictionary pass"""
+        self._keywords.add_terms(category, terms)
+        self._automaton = None
+
+    def compile(self) -> 'PatternEngine':
+        self._automaton = AhoCorasick(self._anchored.keys())
+        self._keywords.compile()
+        return self
+
+    def scan(self, text: str) -> ScanResult:
+        if self._automaton is None:
+            self.compile()
+
+        lowered = text.lower()
+        # Offsets are only reusable when lowercasing kept every character in place
+        offsets_valid = len(lowered) == len(text)
+        positions = self._automaton.find_positions(lowered)
+
+        candidates: Dict[int, Optional[List[int]]] = {index: None for index in self._unanchored}
+        for literal, starts in positions.items():
+            for entry_index in self._anchored[literal]:
+                candidates[entry_index] = starts
+
+        hits = []
+        for entry_index in sorted(candidates):
+            category, pattern_id, compiled, leading = self._entries[entry_index]
+            starts = candidates[entry_index]
+            if starts is not None and leading and offsets_valid:
+                matches = self._match_at(compiled, text, starts)
+            else:
+                matches = compiled.finditer(text)
+            for match in matches:
+                hits.append(PatternHit(category, pattern_id, match.span(), self._findall_value(match)))
+        hits.extend(self._keywords.find(text))
+        return ScanResult(text, hits)
+
+    @staticmethod
+    def _match_at(compiled: re.Pattern, text: str, starts: List[int]) -> Iterator[re.Match]:
+        """Same matches finditer would return, trying only the given start offsets"""
+        resume_at = 0
+        for start in starts:
+            if start < resume_at:
+                continue
+            match = compiled.match(text, start)
+            if match:
+                yield match
+                resume_at = max(match.end(), start + 1)
+
+    @staticmethod
+    def _findall_value(match: re.Match) -> Any:
+        group_count = match.re.groups
+        if group_count == 0:
+            return match.group()
+        if group_count == 1:
+            return match.group(1) or ''
+        return match.groups(default='')
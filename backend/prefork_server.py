@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Pre-fork Server
+Loads models once in a parent process, then forks uvicorn workers that share them copy-on-write
+"""
+
+import os
+import gc
+import sys
+import asyncio
+import time
+import random
+import signal
+import socket
+import argparse
+import importlib
+import logging
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# Requests a worker serves before it is replaced (0 = never), plus up to this many more so workers do not restart together
+MAX_REQUESTS = int(os.environ.get('WORKER_MAX_REQUESTS', '0'))
+MAX_REQUESTS_JITTER = int(os.environ.get('WORKER_MAX_REQUESTS_JITTER', '0'))
+
+# Memory a worker may stop sharing with the parent before it is replaced, in MB (0 = no limit)
+MAX_PRIVATE_MB = float(os.environ.get('WORKER_MAX_PRIVATE_MB', '0'))
+
+# Seconds a retiring worker gets to finish in-flight requests before it is killed
+GRACEFUL_TIMEOUT = float(os.environ.get('WORKER_GRACEFUL_TIMEOUT', '30'))
+
+# How often the supervisor reaps workers and checks their memory
+POLL_SECONDS = 0.2
+MEMORY_CHECK_SECONDS = 5.0
+
+# Seconds a retiring worker, no longer accepting, gives connections it just accepted to send their request
+ACCEPT_GRACE_SECONDS = 0.5
+
+def private_memory_mb(pid: int) -> Optional[float]:
+    """Memory a process does not share with any other (Private_Clean + Private_Dirty), or None off Linux"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    kilobytes = sum(int(line.split()[1]) for line in lines if line.startswith(('Private_Clean:', 'Private_Dirty:')))
+    return kilobytes / 1024
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn server of one worker. It tells the supervisor once it has served `max_requests`
+    and keeps serving until it is retired; on shutdown it stops accepting before it drains.
+    """
+
+    def __init__(self, config: uvicorn.Config, max_requests: Optional[int] = None, report_fd: Optional[int] = None):
+        super().__init__(config)
+        self.max_requests = max_requests
+        self.report_fd = report_fd
+        self.reported = False
+
+    async def on_tick(self, counter: int) -> bool:
+        if (self.max_requests and self.report_fd is not None and not self.reported
+                and self.server_state.total_requests >= self.max_requests):
+            self.reported = True
+            os.write(self.report_fd, f"{os.getpid()}\n".encode())
+        return await super().on_tick(counter)
+
+    async def shutdown(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        # uvicorn closes every connection without a request in progress; one accepted just before
+        # the listener closed gets a moment to send its request, which is then served
+        for server in self.servers:
+            server.close()
+        await asyncio.sleep(ACCEPT_GRACE_SECONDS)
+        await super().shutdown(sockets)
+
+class PreforkServer:
+    """Parent process that owns the listening socket and supervises N forked uvicorn workers.
+
+    The service module's `before_fork` hook loads models and builds analyzers once here;
+    the heap is then frozen (gc.freeze) so garbage collection in the workers never writes
+    to, and so never copies, the inherited pages. Each worker runs the module's `after_fork`
+    hook for its own threads and connections, then serves `module.app` on the shared socket.
+
+    Workers that exit are replaced. A worker that has served `max_requests` (reported over
+    a pipe) or whose private memory passes `max_private_mb` is replaced before it is retired.
+    SIGHUP replaces every worker without dropping capacity; SIGTERM and SIGINT stop them
+    gracefully.
+    """
+
+    def __init__(self, module: ModuleType, host: str = '0.0.0.0', port: int = 8001, workers: Optional[int] = None,
+                 max_requests: int = MAX_REQUESTS, max_requests_jitter: int = MAX_REQUESTS_JITTER,
+                 max_private_mb: float = MAX_PRIVATE_MB, graceful_timeout: float = GRACEFUL_TIMEOUT,
+                 torch_threads: Optional[int] = None, log_level: str = 'info'):
+        self.module = module
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.max_private_mb = max_private_mb
+        self.graceful_timeout = graceful_timeout
+        # Split the cores between workers instead of letting each one use all of them
+        self.torch_threads = torch_threads if torch_threads is not None else max(1, (os.cpu_count() or 1) // self.workers)
+        self.log_level = log_level
+        self.socket: Optional[socket.socket] = None
+        self.children: Dict[int, float] = {}
+        self._retiring: Dict[int, float] = {}
+        self._reports: Optional[Tuple[int, int]] = None
+        self._stopping = False
+        self._reload = False
+        self._memory_checked = 0.0
+        self.restarts = 0
+
+    def bind(self) -> socket.socket:
+        """Listen before forking so every worker accepts from the same socket"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.socket = sock
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def prepare(self) -> None:
+        """Run the module's before_fork hook, then move everything alive into the permanent GC generation"""
+        hook = getattr(self.module, 'before_fork', None)
+        if hook is not None:
+            hook()
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Froze {gc.get_freeze_count()} objects before forking {self.workers} workers")
+
+    def active(self) -> List[int]:
+        """Workers that are serving and not being retired"""
+        return [pid for pid in self.children if pid not in self._retiring]
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._serve()
+            except BaseException:
+                logger.exception("Worker failed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def _serve(self) -> None:
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        random.seed()
+        if self.torch_threads and 'torch' in sys.modules:
+            sys.modules['torch'].set_num_threads(self.torch_threads)
+        hook = getattr(self.module, 'after_fork', None)
+        if hook is not None:
+            hook()
+        limit = self.max_requests + random.randint(0, self.max_requests_jitter) if self.max_requests else None
+        config = uvicorn.Config(self.module.app, timeout_graceful_shutdown=self.graceful_timeout, log_level=self.log_level)
+        WorkerServer(config, max_requests=limit, report_fd=self._reports[1] if self._reports else None).run(
+            sockets=[self.socket]
+        )
+
+    def retire(self, pid: int) -> None:
+        """Ask a worker to finish its in-flight requests and exit"""
+        if pid in self.children and pid not in self._retiring:
+            self._retiring[pid] = time.monotonic() + self.graceful_timeout
+            self._signal(pid, signal.SIGTERM)
+
+    def replace(self, pid: int) -> None:
+        """Start a new worker, then retire the old one, so capacity never drops"""
+        self.spawn()
+        self.retire(pid)
+        self.restarts += 1
+
+    def reap(self) -> None:
+        """Collect exited workers and kill retiring ones that overran the graceful timeout"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                break
+            if pid == 0:
+                break
+            self.children.pop(pid, None)
+            if self._retiring.pop(pid, None) is None and not self._stopping:
+                code = os.waitstatus_to_exitcode(status)
+                if code != 0:
+                    logger.warning(f"Worker {pid} exited with {code}")
+                else:
+                    self.restarts += 1
+        now = time.monotonic()
+        for pid, deadline in list(self._retiring.items()):
+            if now > deadline:
+                logger.warning(f"Worker {pid} did not stop within {self.graceful_timeout}s; killing it")
+                self._signal(pid, signal.SIGKILL)
+
+    def check_requests(self) -> None:
+        """Replace workers that reported serving their maximum number of requests"""
+        if self._reports is None:
+            return
+        try:
+            reported = os.read(self._reports[0], 65536)
+        except BlockingIOError:
+            return
+        for pid in map(int, reported.split()):
+            if pid in self.active():
+                logger.info(f"Worker {pid} served its maximum number of requests; replacing it")
+                self.replace(pid)
+
+    def check_memory(self) -> None:
+        if not self.max_private_mb or time.monotonic() - self._memory_checked < MEMORY_CHECK_SECONDS:
+            return
+        self._memory_checked = time.monotonic()
+        for pid in self.active():
+            private_mb = private_memory_mb(pid)
+            if private_mb is not None and private_mb > self.max_private_mb:
+                logger.info(f"Worker {pid} holds {private_mb:.0f}MB of private memory; replacing it")
+                self.replace(pid)
+
+    def run(self) -> None:
+        """Bind, load, fork and supervise until SIGTERM or SIGINT"""
+        if self.socket is None:
+            self.bind()
+        if self.max_requests and self._reports is None:
+            self._reports = os.pipe()
+            os.set_blocking(self._reports[0], False)
+        self.prepare()
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        logger.info(f"Serving on {self.host}:{self.port} with {self.workers} workers")
+        try:
+            while not self._stopping:
+                self.reap()
+                if self._reload:
+                    self._reload = False
+                    logger.info("Replacing all workers")
+                    for pid in self.active():
+                        self.replace(pid)
+                self.check_requests()
+                self.check_memory()
+                for _ in range(self.workers - len(self.active())):
+                    self.spawn()
+                time.sleep(POLL_SECONDS)
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Retire every worker and wait for all of them to exit"""
+        self._stopping = True
+        for pid in list(self.children):
+            self.retire(pid)
+        while self.children:
+            self.reap()
+            time.sleep(POLL_SECONDS / 2)
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+        if self._reports is not None:
+            for fd in self._reports:
+                os.close(fd)
+            self._reports = None
+
+    def _handle_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame) -> None:
+        self._reload = True
+
+    def _signal(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve an analysis service from pre-forked workers")
+    parser.add_argument('module', nargs='?', default='hybrid_analysis_simple', help="Service module exposing `app`")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', '0')) or None,
+                        help="Worker processes (default: WEB_WORKERS, else CPU count)")
+    parser.add_argument('--max-requests', type=int, default=MAX_REQUESTS)
+    parser.add_argument('--max-requests-jitter', type=int, default=MAX_REQUESTS_JITTER)
+    parser.add_argument('--max-private-mb', type=float, default=MAX_PRIVATE_MB)
+    parser.add_argument('--graceful-timeout', type=float, default=GRACEFUL_TIMEOUT)
+    parser.add_argument('--torch-threads', type=int, default=None, help="Per-worker torch threads (default: cores / workers)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = PreforkServer(importlib.import_module(args.module), host=args.host, port=args.port, workers=args.workers,
+                           max_requests=args.max_requests, max_requests_jitter=args.max_requests_jitter,
+                           max_private_mb=args.max_private_mb, graceful_timeout=args.graceful_timeout,
+                           torch_threads=args.torch_threads)
+    server.run()
+
+if __name__ == '__main__':
+    main()
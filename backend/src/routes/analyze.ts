@@ -1,11 +1,50 @@
 import express from "express";
 import fetch from "node-fetch";
+import { StringDecoder } from "string_decoder";
 import { Resume } from "../entities/Resume";
 import { auth } from "../middleware/auth";
 import { User } from "../entities/User";
 import { postgresConnection } from "../config/database";
 const router = express.Router();
 
+// The analysis service sheds load with 429 + Retry-After; pass both on so clients back off
+function rejectOverloaded(
+  pyRes: { headers: { get(name: string): string | null } },
+  res: express.Response
+) {
+  const retryAfter = pyRes.headers.get("retry-after") || "1";
+  console.warn("Analysis service overloaded, retry after", retryAfter);
+  res.set("Retry-After", retryAfter);
+  return res.status(429).json({
+    error: "Analysis service is busy. Please try again shortly.",
+    retryAfter: Number(retryAfter),
+  });
+}
+
+// Keep the latest analysis on the resume; a failed update does not fail the request
+async function saveAnalysis(resumeId: string, jobTitle: string, analysisResult: any) {
+  console.log("Updating database with analysis results...");
+  try {
+    await postgresConnection.getRepository(Resume).update(resumeId, {
+      aiAnalysis: {
+        strengths:
+          analysisResult.detailed_analysis.llm_insights.strengths || [],
+        improvements:
+          analysisResult.detailed_analysis.llm_insights.weaknesses || [],
+        suggestedRoles: [jobTitle], // Based on current analysis
+        score: analysisResult.overall_score,
+        summary:
+          analysisResult.detailed_analysis.llm_insights.overall_assessment ||
+          "Analysis completed",
+      },
+    });
+    console.log("Database update completed successfully");
+  } catch (dbError) {
+    console.error("Database update failed:", dbError);
+    // Continue without database update for now
+  }
+}
+
 // POST /api/analyze
 // Requires: { jobTitle, jobDescription, resumeId }
 /**
@@ -14,7 +53,7 @@ const router = express.Router();
  */
 router.post("/", auth, async (req, res) => {
   try {
-    const { jobTitle, jobDescription, jobLevel, resumeId } = req.body;
+    const { jobTitle, jobDescription, jobLevel, resumeId, mode, deadlineMs } = req.body;
     if (!resumeId || !jobTitle || !jobLevel) {
       return res.status(400).json({
         error:
@@ -57,8 +96,14 @@ router.post("/", auth, async (req, res) => {
         resume: resumeText,
         job: jobText,
         jobLevel: jobLevel,
+        // Optional: "fast" | "standard" | "deep" and a latency budget in ms
+        mode: mode,
+        deadline_ms: deadlineMs,
       }),
     });
+    if (pyRes.status === 429) {
+      return rejectOverloaded(pyRes, res);
+    }
     if (!pyRes.ok) {
       console.error("Python service error:", pyRes.status, pyRes.statusText);
       return res.status(500).json({ error: "Hybrid analysis service error." });
@@ -67,26 +112,7 @@ router.post("/", auth, async (req, res) => {
     console.log("Python service response received successfully");
 
     // 4. Store the detailed analysis in the database
-    console.log("Updating database with analysis results...");
-    try {
-      await resumeRepo.update(resumeId, {
-        aiAnalysis: {
-          strengths:
-            analysisResult.detailed_analysis.llm_insights.strengths || [],
-          improvements:
-            analysisResult.detailed_analysis.llm_insights.weaknesses || [],
-          suggestedRoles: [jobTitle], // Based on current analysis
-          score: analysisResult.overall_score,
-          summary:
-            analysisResult.detailed_analysis.llm_insights.overall_assessment ||
-            "Analysis completed",
-        },
-      });
-      console.log("Database update completed successfully");
-    } catch (dbError) {
-      console.error("Database update failed:", dbError);
-      // Continue without database update for now
-    }
+    await saveAnalysis(resumeId, jobTitle, analysisResult);
 
     // 5. Return the comprehensive analysis
     return res.json({
@@ -114,10 +140,100 @@ router.post("/", auth, async (req, res) => {
   }
 });
 
+// POST /api/analyze/events - /api/analyze as Server-Sent Events
+// Relays the analysis service's stage events (sections, standalone_score, skill_gap,
+// similarity, llm_insights) as they arrive, then `summary` with the full result
+router.post("/events", auth, async (req, res) => {
+  try {
+    const { jobTitle, jobDescription, jobLevel, resumeId, mode, deadlineMs } = req.body;
+    if (!resumeId || !jobTitle || !jobLevel) {
+      return res.status(400).json({
+        error:
+          "Missing required fields: resumeId, jobTitle, and jobLevel are required. jobDescription is optional.",
+      });
+    }
+
+    const userId = (req.user as User)?.id;
+    if (!userId) {
+      return res.status(401).json({ error: "Unauthorized" });
+    }
+
+    const resume = await postgresConnection.getRepository(Resume).findOne({
+      where: { id: resumeId, userId },
+    });
+    if (!resume) {
+      return res.status(404).json({ error: "Resume not found." });
+    }
+
+    const pyRes = await fetch("http://localhost:8001/analyze/events", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        resume: resume.originalText || "",
+        job: [jobTitle, jobDescription].filter(Boolean).join("\n"),
+        jobLevel: jobLevel,
+        mode: mode,
+        deadline_ms: deadlineMs,
+      }),
+    });
+    if (pyRes.status === 429) {
+      return rejectOverloaded(pyRes, res);
+    }
+    if (!pyRes.ok || !pyRes.body) {
+      console.error("Python service error:", pyRes.status, pyRes.statusText);
+      return res.status(500).json({ error: "Hybrid analysis service error." });
+    }
+
+    res.writeHead(200, {
+      "Content-Type": "text/event-stream",
+      "Cache-Control": "no-cache",
+      Connection: "keep-alive",
+    });
+    const body = pyRes.body;
+    // Events are relayed untouched; only the summary is parsed, to store it. The decoder
+    // keeps a character split across two chunks whole
+    const decoder = new StringDecoder("utf8");
+    let pending = "";
+    body.on("data", (chunk: Buffer) => {
+      res.write(chunk);
+      pending += decoder.write(chunk);
+      const messages = pending.split("\n\n");
+      pending = messages.pop() || "";
+      for (const message of messages) {
+        if (message.startsWith("event: summary\n")) {
+          const data = message.slice(message.indexOf("data: ") + 6);
+          try {
+            saveAnalysis(resumeId, jobTitle, JSON.parse(data));
+          } catch (parseError) {
+            console.error("Could not parse the analysis summary:", parseError);
+          }
+        }
+      }
+    });
+    body.on("end", () => res.end());
+    body.on("error", (streamError: Error) => {
+      console.error("Analysis event stream failed:", streamError);
+      res.end();
+    });
+    // Stop the analysis when the browser goes away
+    res.on("close", () => {
+      if (typeof (body as any).destroy === "function") {
+        (body as any).destroy();
+      }
+    });
+  } catch (err) {
+    console.error("Analysis events error:", err);
+    if (!res.headersSent) {
+      return res.status(500).json({ error: "Internal server error." });
+    }
+    res.end();
+  }
+});
+
 // POST /api/analyze/test - Test endpoint without authentication
 router.post("/test", async (req, res) => {
   try {
-    const { jobTitle, jobDescription, jobLevel, resumeText } = req.body;
+    const { jobTitle, jobDescription, jobLevel, resumeText, mode, deadlineMs } = req.body;
     if (!resumeText || !jobTitle || !jobLevel) {
       return res.status(400).json({
         error:
@@ -135,9 +251,15 @@ router.post("/test", async (req, res) => {
         resume: resumeText,
         job: jobText,
         jobLevel: jobLevel,
+        // Optional: "fast" | "standard" | "deep" and a latency budget in ms
+        mode: mode,
+        deadline_ms: deadlineMs,
       }),
     });
 
+    if (pyRes.status === 429) {
+      return rejectOverloaded(pyRes, res);
+    }
     if (!pyRes.ok) {
       return res.status(500).json({ error: "Hybrid analysis service error." });
     }
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Stage Metrics
+Per-stage latency histograms with per-request timings, rendered in the Prometheus text format
+"""
+
+import time
+import threading
+import contextvars
+import logging
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from cached lookups to a slow LLM call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Timings of the request being handled; stage pool threads run in a copy of the caller's context
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar('request_timings', default=None)
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, safe to observe from any thread"""
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[str, List[float]] = {}  # bucket counts..., +Inf count, sum
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """count, sum and mean per label value"""
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        return {
+            key: {'count': sum(values[:-1]), 'sum': values[-1], 'mean': values[-1] / max(sum(values[:-1]), 1)}
+            for key, values in series.items()
+        }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{{self.label}="{key}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label}="{key}"}} {values[-1]}')
+            lines.append(f'{self.name}_count{{{self.label}="{key}"}} {cumulative}')
+        return lines
+
+class StageMetrics:
+    """Times named stages into a histogram and, while a request is tracked, into its timings.
+
+    Stages nest freely and may run on other threads or concurrent tasks of the same
+    request: timings live in a context variable and each stage only adds its own entry.
+    """
+
+    def __init__(self, prefix: str = 'analysis', buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.stage_seconds = Histogram(f'{prefix}_stage_seconds', "Time spent in each analysis stage", 'stage', buckets)
+        self.request_seconds = Histogram(f'{prefix}_request_seconds', "End-to-end request latency", 'endpoint', buckets)
+        self._histograms: List[Histogram] = []
+        self._gauges: List[Tuple[str, str, Callable[[], Dict[str, float]], str, str]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_seconds.observe(name, elapsed)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings[name] = round(timings.get(name, 0.0) + elapsed * 1000, 3)
+
+    async def timed(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        """Await a stage under its timer, e.g. inside asyncio.gather"""
+        with self.stage(name):
+            return await awaitable
+
+    @contextmanager
+    def request(self, endpoint: str) -> Iterator[Dict[str, float]]:
+        """Track one request; yields the dict its stage timings (ms) are collected in"""
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            yield timings
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_timings.reset(token)
+            self.request_seconds.observe(endpoint, elapsed)
+            timings['total'] = round(elapsed * 1000, 3)
+
+    def histogram(self, name: str, documentation: str, label: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """A further histogram, observed by its owner and rendered with the rest"""
+        histogram = Histogram(name, documentation, label, buckets)
+        self._histograms.append(histogram)
+        return histogram
+
+    def gauge(self, name: str, documentation: str, collect: Callable[[], Dict[str, float]], label: str = 'name',
+              kind: str = 'gauge') -> None:
+        """Export values read at scrape time, one series per key of collect(); kind='counter' for totals"""
+        self._gauges.append((name, documentation, collect, label, kind))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = self.stage_seconds.render() + self.request_seconds.render()
+        for histogram in self._histograms:
+            lines += histogram.render()
+        for name, documentation, collect, label, kind in self._gauges:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            try:
+                lines += [f'{name}{{{label}="{key}"}} {value}' for key, value in sorted(collect().items())]
+            except Exception as e:
+                logger.error(f"Collecting {name} failed: {e}")
+        return '\n'.join(lines) + '\n'
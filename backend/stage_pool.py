@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Stage Pool
+Bounded worker pool that runs CPU-bound analysis stages off the event loop
+"""
+
+import os
+import asyncio
+import functools
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+class StagePool:
+    """Thread pool for regex, spaCy and TF-IDF stages; awaiting a stage never blocks the loop"""
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-stage')
+
+    @classmethod
+    def from_env(cls) -> 'StagePool':
+        """Pool sized by ANALYSIS_POOL_WORKERS (default: CPU count, at most 4)"""
+        default_workers = min(4, os.cpu_count() or 1)
+        return cls(max_workers=int(os.environ.get('ANALYSIS_POOL_WORKERS', str(default_workers))))
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run func(*args, **kwargs) on a pool thread, in a copy of the caller's context, and await its result"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, func, *args, **kwargs))
+
+    def after_fork(self) -> None:
+        """Replace the executor in a forked worker; threads started in the parent do not survive fork"""
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis-stage')
+
+    def shutdown(self) -> None:
+        """Wait for running stages and release the threads"""
+        self._executor.shutdown(wait=True)
@@ -8,6 +8,9 @@ from unittest.mock import Mock, patch
 import tempfile
 import os
 import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Dict, Any, List
 
 # Import the services we want to test
@@ -15,9 +18,26 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# The services open their stores at import; keep them in a scratch directory, out of the source tree
+import atexit
+import shutil
+_scratch = tempfile.mkdtemp(prefix='resume-analysis-tests-')
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+os.environ['EMBEDDING_STORE_PATH'] = os.path.join(_scratch, 'embeddings')
+os.environ['OLLAMA_CACHE_PATH'] = os.path.join(_scratch, 'llm_cache.sqlite3')
+os.environ['JOB_FEATURE_STORE_DIR'] = os.path.join(_scratch, 'job_features')
+
+import hybrid_analysis_simple
 from hybrid_analysis_simple import app as hybrid_app, ImprovedAnalyzer
 from embedding_service import app as embedding_app, HybridAnalyzer
 
+@pytest.fixture(autouse=True)
+def clear_result_caches():
+    """Every test starts cold: results cached by an earlier test are never served"""
+    for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache,
+                  hybrid_analysis_simple.job_keyword_cache):
+        cache.clear()
+
 @pytest.fixture
 def hybrid_client():
     """Test client for hybrid analysis service"""
@@ -282,6 +302,47 @@ def mock_ollama_response() -> str:
     }
     """
 
+class OllamaStub:
+    """Local HTTP server that answers /api/generate like Ollama"""
+    
+    def __init__(self):
+        self.response_text = '{"strengths": ["Stub strength"], "weaknesses": [], "suggestions": ["Stub suggestion"]}'
+        self.status_code = 200
+        self.delay = 0.0
+        self.prompts = []
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.prompts.append(body['prompt'])
+                time.sleep(stub.delay)
+                payload = json.dumps({"model": body["model"], "response": stub.response_text, "done": True}).encode()
+                self.send_response(stub.status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/generate"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def ollama_stub():
+    """Stub Ollama server on a free local port"""
+    stub = OllamaStub()
+    yield stub
+    stub.close()
+
 @pytest.fixture
 def industry_ats_keywords() -> Dict[str, List[str]]:
     """Industry-standard ATS keywords by category"""
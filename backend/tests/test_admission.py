@@ -0,0 +1,140 @@
+"""
+Tests for admission control
+Ensures interactive requests go first, full lanes are shed with 429 and Retry-After, and slots are never leaked
+"""
+import asyncio
+import pytest
+
+import hybrid_analysis_simple
+from admission import BULK, INTERACTIVE, AdmissionController, Lane, Overloaded
+from stage_metrics import Histogram
+
+def controller(max_in_flight=1, queue=4, bulk_in_flight=1, wait=5.0):
+    lanes = [Lane(INTERACTIVE, max_queue=queue, max_in_flight=max_in_flight, max_wait_seconds=wait),
+             Lane(BULK, max_queue=queue, max_in_flight=bulk_in_flight, max_wait_seconds=wait)]
+    return AdmissionController(lanes, max_in_flight, Histogram('wait_seconds', "Wait", 'lane'))
+
+class TestAdmissionController:
+    """Test suite for AdmissionController"""
+
+    def test_freed_slots_go_to_interactive_first(self):
+        """Test that a queued interactive request overtakes bulk requests queued before it"""
+        admission = controller()
+        order = []
+
+        async def request(lane, name):
+            async with admission.admit(lane):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            first = asyncio.ensure_future(request(BULK, 'bulk-1'))
+            await asyncio.sleep(0)
+            waiting = [asyncio.ensure_future(request(BULK, 'bulk-2'))]
+            await asyncio.sleep(0)
+            waiting.append(asyncio.ensure_future(request(INTERACTIVE, 'interactive')))
+            await asyncio.gather(first, *waiting)
+
+        asyncio.run(scenario())
+
+        assert order == ['bulk-1', 'interactive', 'bulk-2']
+        assert admission.in_flight == 0
+        assert admission.wait_seconds.snapshot()[BULK]['count'] == 2
+
+    def test_bulk_cap_leaves_room_for_interactive(self):
+        """Test that bulk cannot take every slot"""
+        admission = controller(max_in_flight=2, bulk_in_flight=1, wait=0.05)
+
+        async def scenario():
+            await admission.acquire(BULK)
+            with pytest.raises(Overloaded):
+                await admission.acquire(BULK)
+            await admission.acquire(INTERACTIVE)
+            return admission.stats()
+
+        stats = asyncio.run(scenario())
+
+        assert stats[BULK] == {'queued': 0, 'in_flight': 1, 'admitted': 1, 'rejected': 1}
+        assert stats[INTERACTIVE]['in_flight'] == 1
+
+    def test_full_queue_rejects_at_once_with_retry_after(self):
+        """Test that a request beyond the lane's queue fails without waiting"""
+        admission = controller(queue=1)
+
+        async def scenario():
+            await admission.acquire(INTERACTIVE)
+            queued = asyncio.ensure_future(admission.acquire(INTERACTIVE))
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded) as rejected:
+                await admission.acquire(INTERACTIVE)
+            admission.release(INTERACTIVE)
+            await queued
+            return rejected.value
+
+        rejected = asyncio.run(scenario())
+
+        assert rejected.lane == INTERACTIVE
+        assert rejected.reason == 'queue is full'
+        assert rejected.retry_after >= 1
+
+    def test_cancelled_and_timed_out_waiters_leave_the_queue(self):
+        """Test that waiters that give up neither hold a queue place nor leak a slot"""
+        admission = controller(wait=0.02)
+
+        async def scenario():
+            await admission.acquire(INTERACTIVE)
+            with pytest.raises(Overloaded, match='wait exceeded'):
+                await admission.acquire(INTERACTIVE)
+            cancelled = asyncio.ensure_future(admission.acquire(BULK))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            admission.release(INTERACTIVE)
+            return admission.stats()
+
+        stats = asyncio.run(scenario())
+
+        assert all(lane['queued'] == 0 and lane['in_flight'] == 0 for lane in stats.values())
+        assert admission.in_flight == 0
+
+class TestAdmissionEndpoints:
+    """Test the 429 response and lane selection of the hybrid service"""
+
+    @pytest.fixture
+    def full(self, monkeypatch):
+        admission = controller(max_in_flight=0, queue=0)
+        monkeypatch.setattr(hybrid_analysis_simple, 'admission', admission)
+        return admission
+
+    def test_overloaded_analyze_returns_429(self, hybrid_client, full, sample_resume_data, sample_job_data):
+        """Test that a shed request gets 429 with Retry-After and is counted in its lane"""
+        payload = {"resume": sample_resume_data["junior_developer"], "job": sample_job_data["junior_developer"],
+                   "jobLevel": "entry"}
+
+        response = hybrid_client.post("/analyze", json=payload)
+        bulk = hybrid_client.post("/analyze", json=payload, headers={"X-Priority": "bulk"})
+
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert response.json()["lane"] == INTERACTIVE
+        assert bulk.json()["lane"] == BULK
+        assert full.stats()[INTERACTIVE]['rejected'] == 1
+
+    def test_batch_defaults_to_bulk_lane(self, hybrid_client, full):
+        """Test that batch and stream endpoints are shed from the bulk lane"""
+        batch = hybrid_client.post("/analyze/batch", json={"jobLevel": "mid", "job": "Python", "resumes": ["a"]})
+        stream = hybrid_client.post("/analyze/stream", content=b'{"resume": "a", "jobLevel": "mid"}\n')
+
+        assert batch.status_code == 429 and batch.json()["lane"] == BULK
+        assert stream.status_code == 429 and stream.json()["lane"] == BULK
+        assert full.stats()[BULK]['rejected'] == 2
+
+    def test_admission_metrics_exported(self, hybrid_client):
+        """Test that queue depth, in-flight, rejections and wait time reach /metrics"""
+        text = hybrid_client.get("/metrics").text
+
+        assert 'admission_queue_depth{lane="interactive"} 0' in text
+        assert 'admission_in_flight{lane="bulk"} 0' in text
+        assert '# TYPE admission_rejected_total counter' in text
+        assert '# TYPE analysis_admission_wait_seconds histogram' in text
@@ -0,0 +1,115 @@
+"""
+Tests for the progressive /analyze/events stream
+Ensures each stage result is sent as soon as it is ready and the summary matches /analyze
+"""
+import asyncio
+import json
+import time
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from embedding_store import EmbeddingStore
+from encode_scheduler import EncodeScheduler
+
+class HashEncoder:
+    def encode(self, texts, **kwargs):
+        return np.stack([np.random.default_rng(len(text)).random(8, dtype=np.float32) for text in texts])
+
+async def slow_llm(prompt):
+    await asyncio.sleep(0.5)
+    return ""
+
+def read_events(client, payload):
+    """(event, data) for each SSE message"""
+    events = []
+    with client.stream("POST", "/analyze/events", json=payload) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+class TestAnalysisEvents:
+    """Test suite for the Server-Sent Events variant of /analyze"""
+
+    @pytest.fixture
+    def service(self, monkeypatch, tmp_path):
+        scheduler = EncodeScheduler(HashEncoder())
+        llm = AsyncMock(side_effect=slow_llm)
+        monkeypatch.setattr(hybrid_analysis_simple, 'encode_scheduler', scheduler)
+        monkeypatch.setattr(hybrid_analysis_simple, 'embedding_store', EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in'))
+        monkeypatch.setattr(hybrid_analysis_simple, 'require_sentence_model', AsyncMock())
+        monkeypatch.setattr(hybrid_analysis_simple.analyzer, 'call_ollama_llm_async', llm)
+        for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache):
+            cache.clear()
+        yield llm
+        for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache):
+            cache.clear()
+        scheduler.close()
+
+    @pytest.fixture
+    def payload(self, sample_resume_data, sample_job_data):
+        return {"resume": sample_resume_data["mid_developer"], "job": sample_job_data["mid_developer"], "jobLevel": "mid"}
+
+    def test_stage_events_arrive_before_the_slow_llm(self, service, payload):
+        """Test that every stage sends one event, the quick ones well before the LLM finishes"""
+        async def collect():
+            start = time.perf_counter()
+            request = hybrid_analysis_simple.AnalysisRequest(**payload)
+            return [(message.decode(), time.perf_counter() - start)
+                    async for message in hybrid_analysis_simple.analysis_events(request, hybrid_analysis_simple.StagePlan())]
+
+        messages = asyncio.run(collect())
+        names = [message.split('\n')[0][len('event: '):] for message, _ in messages]
+        arrived = dict(zip(names, (seconds for _, seconds in messages)))
+
+        assert names[:2] == ['sections', 'standalone_score']
+        assert sorted(names[2:4]) == ['similarity', 'skill_gap']
+        assert names[4:] == ['llm_insights', 'summary']
+        assert arrived['skill_gap'] < 0.4 < arrived['llm_insights']
+        assert all(message.endswith('\n\n') for message, _ in messages)
+
+    def test_events_over_http(self, hybrid_client, service, payload):
+        """Test the text/event-stream framing of the endpoint"""
+        events = read_events(hybrid_client, payload)
+
+        assert [name for name, _ in events][-1] == 'summary'
+        assert 'experience' in events[0][1]['detected_sections']
+
+    def test_summary_matches_analyze(self, hybrid_client, service, payload):
+        """Test that the summary is the /analyze response and stage events agree with it"""
+        events = {name: data for name, data in read_events(hybrid_client, payload)}
+        service.side_effect = None
+        service.return_value = ""
+        response = hybrid_client.post("/analyze", json=payload).json()
+
+        assert events['summary'] == response
+        assert events['standalone_score']['standalone_score'] == response['standalone_score']
+        assert events['similarity']['similarity'] == response['similarity']
+        assert events['skill_gap']['skill_gap_analysis'] == response['skill_gap_analysis']
+        assert events['sections'] == response['detailed_analysis']['section_analysis']
+
+    def test_cached_result_replays_the_events_of_its_mode(self, hybrid_client, service, payload):
+        """Test that a cached response sends the same stage events, without the stages skipped by its mode"""
+        fast = {**payload, "mode": "fast"}
+        first = [name for name, _ in read_events(hybrid_client, fast)]
+        second = [name for name, _ in read_events(hybrid_client, fast)]
+
+        assert first == second == ['sections', 'standalone_score', 'summary']
+        service.assert_not_called()
+
+    def test_failure_is_sent_as_an_error_event(self, hybrid_client, service, payload, monkeypatch):
+        """Test that an analysis failure after the stream started ends it with an error event"""
+        monkeypatch.setattr(hybrid_analysis_simple, 'require_sentence_model',
+                            AsyncMock(side_effect=RuntimeError("model missing")))
+
+        events = read_events(hybrid_client, payload)
+
+        assert [name for name, _ in events] == ['error']
+        assert 'model missing' in events[0][1]['detail']
@@ -0,0 +1,116 @@
+"""
+Tests for analysis modes and deadline budgets
+Ensures each mode runs only its stages and a deadline skips or cuts off optional stages without caching the partial result
+"""
+import asyncio
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from embedding_store import EmbeddingStore
+from encode_scheduler import EncodeScheduler
+from stage_metrics import StageMetrics
+
+class HashEncoder:
+    def encode(self, texts, **kwargs):
+        return np.stack([np.random.default_rng(len(text)).random(8, dtype=np.float32) for text in texts])
+
+async def slow_llm(prompt):
+    await asyncio.sleep(2)
+    return ""
+
+class TestAnalysisModes:
+    """Test the mode and deadline_ms fields of /analyze"""
+
+    @pytest.fixture
+    def service(self, monkeypatch, tmp_path):
+        scheduler = EncodeScheduler(HashEncoder())
+        llm = AsyncMock(return_value="")
+        require_model = AsyncMock()
+        monkeypatch.setattr(hybrid_analysis_simple, 'encode_scheduler', scheduler)
+        monkeypatch.setattr(hybrid_analysis_simple, 'embedding_store', EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in'))
+        monkeypatch.setattr(hybrid_analysis_simple, 'require_sentence_model', require_model)
+        monkeypatch.setattr(hybrid_analysis_simple.analyzer, 'call_ollama_llm_async', llm)
+        monkeypatch.setattr(hybrid_analysis_simple, 'metrics', StageMetrics())
+        for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache):
+            cache.clear()
+        yield llm, require_model
+        for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache):
+            cache.clear()
+        scheduler.close()
+
+    @pytest.fixture
+    def payload(self, sample_resume_data, sample_job_data):
+        return {"resume": sample_resume_data["mid_developer"], "job": sample_job_data["mid_developer"], "jobLevel": "mid"}
+
+    def test_fast_mode_runs_only_the_ats_detectors(self, hybrid_client, service, payload):
+        """Test that fast mode needs neither the embedding model nor the LLM and scores like a standalone analysis"""
+        llm, require_model = service
+
+        result = hybrid_client.post("/analyze", json={**payload, "mode": "fast"}).json()
+
+        assert result["mode"] == "fast"
+        assert result["skipped_stages"] == {"keyword_similarity": "mode", "embeddings": "mode", "llm": "mode"}
+        assert result["overall_score"] == result["standalone_score"]
+        assert result["detailed_analysis"]["llm_insights"]["strengths"], "Fallback insights keep the response shape"
+        llm.assert_not_called()
+        require_model.assert_not_called()
+
+    def test_standard_mode_skips_only_the_llm(self, hybrid_client, service, payload):
+        """Test that standard mode scores similarity and keywords but makes no LLM call"""
+        llm, _ = service
+
+        standard = hybrid_client.post("/analyze", json={**payload, "mode": "standard"}).json()
+        deep = hybrid_client.post("/analyze", json=payload).json()
+
+        assert standard["skipped_stages"] == {"llm": "mode"}
+        assert standard["similarity"] == deep["similarity"] > 0
+        assert deep["mode"] == "deep" and deep["skipped_stages"] == {}
+        assert llm.await_count == 1
+
+    def test_deadline_cuts_off_a_slow_stage_and_is_not_cached(self, hybrid_client, service, payload):
+        """Test that a stage still running at the deadline is dropped and the next caller gets a full result"""
+        llm, _ = service
+        llm.side_effect = slow_llm
+
+        cut = hybrid_client.post("/analyze", json={**payload, "deadline_ms": 300}).json()
+        llm.side_effect = None
+        full = hybrid_client.post("/analyze", json=payload).json()
+
+        assert cut["skipped_stages"] == {"llm": "deadline"}
+        assert cut["timings"] is None
+        assert full["skipped_stages"] == {}
+        assert llm.await_count == 2
+
+    def test_stages_expected_to_overrun_are_not_started(self, hybrid_client, service, payload):
+        """Test that a stage whose mean latency exceeds the remaining budget is skipped up front"""
+        llm, _ = service
+        hybrid_analysis_simple.metrics.stage_seconds.observe('llm', 5.0)
+
+        result = hybrid_client.post("/analyze", json={**payload, "deadline_ms": 1000}).json()
+
+        assert result["skipped_stages"] == {"llm": "budget"}
+        llm.assert_not_called()
+
+    def test_admission_wait_counts_against_the_deadline(self, hybrid_client, service, payload, monkeypatch):
+        """Test that a request queued past its deadline runs only the required stages"""
+        llm, _ = service
+        admission = hybrid_analysis_simple.admission
+        acquire = admission.acquire
+
+        async def slow_acquire(lane):
+            await asyncio.sleep(0.5)
+            await acquire(lane)
+
+        monkeypatch.setattr(admission, 'acquire', slow_acquire)
+
+        result = hybrid_client.post("/analyze", json={**payload, "deadline_ms": 300}).json()
+
+        assert result["skipped_stages"] == {"keyword_similarity": "budget", "embeddings": "budget", "llm": "budget"}
+        llm.assert_not_called()
+
+    def test_invalid_mode_or_deadline_is_rejected(self, hybrid_client, service, payload):
+        """Test request validation"""
+        assert hybrid_client.post("/analyze", json={**payload, "mode": "turbo"}).status_code == 422
+        assert hybrid_client.post("/analyze", json={**payload, "deadline_ms": 0}).status_code == 422
@@ -5,7 +5,7 @@ Ensures proper functionality, error handling, and response formats
 import pytest
 import json
 from fastapi.testclient import TestClient
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 
 class TestAPIEndpoints:
     """Test suite for API endpoints"""
@@ -237,7 +237,7 @@ class TestAPIEndpoints:
         # Scores should be reasonably consistent (not exactly the same due to model variations)
         # We'll just check that they're all valid and in reasonable ranges
     
-    @patch('requests.post')
+    @patch('httpx.AsyncClient.post', new_callable=AsyncMock)
     def test_analyze_endpoint_with_llm_failure(self, mock_post, hybrid_client, sample_resume_data, sample_job_data):
         """Test analyze endpoint when LLM service is unavailable"""
         # Mock LLM failure
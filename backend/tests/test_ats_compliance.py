@@ -126,6 +126,32 @@ class TestATSCompliance:
         assert 0 <= complete_score['completeness_score'] <= 1, "Completeness score should be between 0 and 1"
         assert 0 <= incomplete_score['completeness_score'] <= 1, "Completeness score should be between 0 and 1"
     
+    def test_section_boundaries_detection(self, improved_analyzer):
+        """Test that detected sections carry their line range and content"""
+        resume = """JOHN DOE
+        john.doe@email.com | (555) 123-4567
+
+        EXPERIENCE:
+        Software Engineer | TechCorp | 2020-2023
+        - Developed web applications
+
+        • Technical Skills
+        Python, JavaScript, React, Django
+        """
+
+        sections = improved_analyzer.enhanced_section_detection(resume)['detected_sections']
+
+        experience = sections['experience']
+        assert (experience.start_line, experience.end_line) == (3, 5), "Experience should span its header to the next header"
+        assert experience.content == "Software Engineer | TechCorp | 2020-2023\n- Developed web applications"
+
+        skills = sections['skills']
+        assert skills.start_line == 7, "Decorated header should still start the skills section"
+        assert skills.content == "Python, JavaScript, React, Django"
+
+        contact = sections['contact']
+        assert (contact.start_line, contact.end_line) == (0, 1), "Contact details above the first header belong to contact"
+    
     def test_ats_keyword_density(self, improved_analyzer):
         """Test ATS keyword density analysis"""
         high_density_resume = """
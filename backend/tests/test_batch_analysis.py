@@ -0,0 +1,107 @@
+"""
+Tests for the batch analysis endpoint
+Ensures one job can be scored against many resumes (and the reverse) in input order
+"""
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from embedding_store import EmbeddingStore
+from encode_scheduler import EncodeScheduler
+
+class StandInEncoder:
+    """Deterministic bag-of-characters encoder that records each encode call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), 32), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for char in text.lower():
+                vectors[row, ord(char) % 32] += 1
+        return vectors
+
+@pytest.fixture
+def stand_in_encoder(monkeypatch, tmp_path):
+    """Route the hybrid service's embeddings through StandInEncoder and silence the LLM"""
+    encoder = StandInEncoder()
+    scheduler = EncodeScheduler(encoder, window_ms=20)
+    monkeypatch.setattr(hybrid_analysis_simple, 'encode_scheduler', scheduler)
+    monkeypatch.setattr(hybrid_analysis_simple, 'embedding_store',
+                        EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in'))
+    monkeypatch.setattr(hybrid_analysis_simple.models, 'get_optional', lambda name: encoder)
+    monkeypatch.setattr(hybrid_analysis_simple.analyzer, 'call_ollama_llm_async', AsyncMock(return_value=""))
+    # Responses scored with the stand-in must not be served to other tests
+    hybrid_analysis_simple.response_cache.clear()
+    yield encoder
+    hybrid_analysis_simple.response_cache.clear()
+    scheduler.close()
+
+class TestBatchAnalysis:
+    """Test suite for /analyze/batch"""
+
+    def test_one_job_against_many_resumes(self, hybrid_client, stand_in_encoder, sample_resume_data, sample_job_data):
+        """Test that results come back in input order and match single /analyze calls"""
+        resumes = [sample_resume_data["senior_developer"], sample_resume_data["junior_developer"],
+                   sample_resume_data["mid_developer"]]
+        job = sample_job_data["senior_developer"]
+
+        response = hybrid_client.post("/analyze/batch", json={"job": job, "resumes": resumes, "jobLevel": "senior"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 3 and data["failed"] == 0
+        assert [item["index"] for item in data["results"]] == [0, 1, 2]
+        for resume, item in zip(resumes, data["results"]):
+            single = hybrid_client.post("/analyze", json={"resume": resume, "job": job, "jobLevel": "senior"})
+            assert item["result"] == single.json()
+
+        encoded = [text for call in stand_in_encoder.calls for text in call]
+        assert sorted(encoded) == sorted(set(resumes + [job])), "Each distinct text is encoded once"
+
+    def test_one_resume_against_many_jobs(self, hybrid_client, stand_in_encoder, sample_resume_data, sample_job_data):
+        """Test the reverse direction, including a blank job description"""
+        jobs = [sample_job_data["senior_developer"], "", sample_job_data["junior_developer"]]
+
+        response = hybrid_client.post("/analyze/batch", json={
+            "resume": sample_resume_data["senior_developer"], "jobs": jobs, "jobLevel": "senior"
+        })
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert len(results) == 3
+        assert results[1]["result"]["detailed_analysis"]["semantic_similarity"] == 0.0
+
+    def test_failed_items_do_not_fail_the_batch(self, hybrid_client, stand_in_encoder, monkeypatch, sample_job_data):
+        """Test that a per-item error is reported in place"""
+        original = hybrid_analysis_simple.analyze_resume_side
+
+        def analyze_resume_side(resume):
+            if 'broken' in resume.text:
+                raise ValueError("cannot parse resume")
+            return original(resume)
+
+        monkeypatch.setattr(hybrid_analysis_simple, 'analyze_resume_side', analyze_resume_side)
+
+        response = hybrid_client.post("/analyze/batch", json={
+            "job": sample_job_data["senior_developer"],
+            "resumes": ["Python developer with AWS experience", "broken resume text"],
+            "jobLevel": "mid"
+        })
+
+        data = response.json()
+        assert data["succeeded"] == 1 and data["failed"] == 1
+        assert data["results"][1]["error"] == "cannot parse resume"
+        assert data["results"][1]["result"] is None
+
+    def test_request_shape_is_validated(self, hybrid_client, monkeypatch):
+        """Test that ambiguous and oversized batches are rejected"""
+        response = hybrid_client.post("/analyze/batch", json={"job": "x", "jobs": ["y"], "jobLevel": "mid"})
+        assert response.status_code == 422
+
+        monkeypatch.setattr(hybrid_analysis_simple, 'BATCH_MAX_ITEMS', 2)
+        response = hybrid_client.post("/analyze/batch", json={"job": "x", "resumes": ["a", "b", "c"], "jobLevel": "mid"})
+        assert response.status_code == 413
@@ -0,0 +1,66 @@
+"""
+Tests for the pipeline benchmark suite
+Ensures synthetic documents are deterministic and the baseline comparison flags real regressions only
+"""
+import json
+
+from benchmarks.run_benchmarks import compare, main, run
+from benchmarks.synthetic import PAGE_WORDS, generate_job, generate_resume
+from improved_ats_analysis import ImprovedATSAnalyzer
+
+def report(**medians):
+    results = {name: {'median_ms': value, 'p95_ms': value} for name, value in medians.items()}
+    return {'meta': {'embeddings': 'stub'}, 'results': results}
+
+class TestSyntheticDocuments:
+    """Test suite for the synthetic resume and job generator"""
+
+    def test_resumes_scale_with_pages_and_are_deterministic(self):
+        """Test that length tracks the page count and the same seed gives the same text"""
+        for pages in (1, 5, 20):
+            words = len(generate_resume(pages).split())
+            assert pages * PAGE_WORDS <= words < pages * PAGE_WORDS + 200
+
+        assert generate_resume(3, seed=1) == generate_resume(3, seed=1)
+        assert generate_resume(3, seed=1) != generate_resume(3, seed=2)
+        assert generate_job(seed=4) == generate_job(seed=4)
+
+    def test_resumes_look_like_resumes(self):
+        """Test that the detectors find the usual sections and achievements"""
+        analyzer = ImprovedATSAnalyzer()
+        resume = generate_resume(2)
+
+        sections = analyzer.detect_sections(resume)['detected_sections']
+        assert {'contact', 'summary', 'experience', 'education', 'skills', 'projects'} <= set(sections)
+        assert analyzer.detect_quantifiable_achievements(resume)['achievement_score'] > 0.5
+
+class TestBenchmarkComparison:
+    """Test suite for running benchmarks and gating on a baseline"""
+
+    def test_compare_flags_slowdowns_beyond_threshold_and_noise(self):
+        """Test that only slowdowns above both the relative and absolute limits count"""
+        baseline = report(scan=10.0, sections=0.1, verbs=4.0, removed=1.0)
+        current = report(scan=14.0, sections=0.3, verbs=4.5, added=9.0)
+
+        regressions = compare(current, baseline, threshold=0.25, min_delta_ms=0.5)
+
+        assert [regression['name'] for regression in regressions] == ['scan']
+        assert regressions[0]['change'] == 0.4
+
+    def test_main_exits_nonzero_on_regression(self, tmp_path):
+        """Test the --input/--compare gate used in CI"""
+        (tmp_path / 'baseline.json').write_text(json.dumps(report(scan=10.0)))
+        (tmp_path / 'slow.json').write_text(json.dumps(report(scan=20.0)))
+        (tmp_path / 'same.json').write_text(json.dumps(report(scan=10.5)))
+
+        assert main(['--input', str(tmp_path / 'slow.json'), '--compare', str(tmp_path / 'baseline.json')]) == 1
+        assert main(['--input', str(tmp_path / 'same.json'), '--compare', str(tmp_path / 'baseline.json')]) == 0
+
+    def test_run_writes_timings_per_stage_and_size(self):
+        """Test that a small run times every detector at every size"""
+        results = run(['detectors'], sizes=[1, 2], repeat=1, concurrency=[1], requests=1, e2e_pages=1,
+                      stub_embeddings=False)
+
+        assert len(results['results']) == 14
+        assert results['results']['detector.detect_sections[pages=2]']['median_ms'] > 0
+        assert results['skipped'] == {}
@@ -0,0 +1,126 @@
+"""
+Tests for chunked long-document embedding
+Ensures chunks follow section and sentence boundaries and pooled vectors see past the model's cut-off
+"""
+import asyncio
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from document_embedding import chunk_document, chunked_similarity, pool_vectors
+from embedding_store import EmbeddingStore
+from encode_scheduler import EncodeScheduler
+
+class KeywordEncoder:
+    """One dimension per keyword, so similarity depends only on which keywords a chunk holds"""
+
+    KEYWORDS = ['python', 'java', 'kubernetes', 'react', 'degree']
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        vectors = np.full((len(texts), len(self.KEYWORDS) + 1), 0.01, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for column, keyword in enumerate(self.KEYWORDS):
+                vectors[row, column] += text.lower().count(keyword)
+        return vectors
+
+@pytest.fixture
+def encoder(tmp_path):
+    encoder = KeywordEncoder()
+    scheduler = EncodeScheduler(encoder)
+    yield encoder, scheduler, EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in')
+    scheduler.close()
+
+class TestChunking:
+    """Test suite for chunk_document"""
+
+    def test_short_text_is_one_chunk(self):
+        """Test that a text within the budget is encoded whole, as in truncate mode"""
+        text = "Python developer.\nBuilt APIs."
+
+        assert [chunk.text for chunk in chunk_document(text, [('skills', 0, 1)], max_words=10)] == [text]
+        assert chunk_document("   ") == []
+
+    def test_chunks_respect_sections_and_budget(self):
+        """Test that no chunk crosses a section boundary or exceeds the word budget"""
+        lines = ["Jane Doe", "EXPERIENCE"] + [f"Built service number {i} in Python." for i in range(10)] + \
+                ["EDUCATION", "BSc degree in computer science."]
+        spans = [('contact', 0, 0), ('experience', 1, 11), ('education', 12, 13)]
+
+        chunks = chunk_document('\n'.join(lines), spans, max_words=12)
+
+        assert [chunk.section for chunk in chunks][0] == 'contact'
+        assert chunks[-1].section == 'education' and chunks[-1].text == "EDUCATION BSc degree in computer science."
+        assert all(chunk.words <= 12 for chunk in chunks)
+        experience = [chunk.text for chunk in chunks if chunk.section == 'experience']
+        assert all(text.endswith('.') for text in experience[1:]), "Chunks break at sentence ends"
+        assert ' '.join(chunk.text for chunk in chunks).split() == ' '.join(lines).split(), "No words lost"
+
+    def test_long_sentence_is_split(self):
+        """Test that a sentence longer than the budget is split mid-sentence"""
+        chunks = chunk_document(' '.join(['word'] * 25), max_words=10)
+
+        assert [chunk.words for chunk in chunks] == [10, 10, 5]
+
+class TestPooling:
+    """Test suite for pool_vectors"""
+
+    VECTORS = np.array([[1.0, 0.0], [0.0, 1.0], [0.0, 2.0]], dtype=np.float32)
+
+    def test_mean_and_max(self):
+        """Test word-weighted mean and element-wise max of the unit chunk vectors"""
+        np.testing.assert_allclose(pool_vectors(self.VECTORS, 'mean', [2, 1, 1]), [0.5, 0.5])
+        np.testing.assert_allclose(pool_vectors(self.VECTORS, 'max'), [1.0, 1.0])
+
+    def test_attention_follows_the_query(self):
+        """Test that attention pooling leans towards the chunks closest to the query"""
+        pooled = pool_vectors(self.VECTORS, 'attention', query=np.array([1.0, 0.0]))
+
+        assert pooled[0] > 0.9 > pooled[1]
+        with pytest.raises(ValueError):
+            pool_vectors(self.VECTORS, 'median')
+
+    def test_chunks_share_one_encode_call(self, encoder):
+        """Test that every chunk of both documents is encoded in a single batch"""
+        model, scheduler, store = encoder
+        resume = chunk_document("Python expert.\nJava too.\nReact later.", [('skills', 0, 1), ('projects', 2, 2)],
+                                max_words=2)
+        job = chunk_document("Python role. Kubernetes nice.", max_words=2)
+
+        similarity, sections = asyncio.run(chunked_similarity(store, scheduler, resume, job))
+
+        assert len(model.calls) == 1 and len(model.calls[0]) == len(resume) + len(job)
+        assert 0 < similarity < 1
+        assert sections['skills'] > sections['projects']
+
+class TestChunkedScoring:
+    """Test chunked mode end to end in the hybrid service"""
+
+    @pytest.fixture
+    def chunked(self, monkeypatch, encoder):
+        _, scheduler, store = encoder
+        monkeypatch.setattr(hybrid_analysis_simple, 'EMBEDDING_MODE', 'chunked')
+        monkeypatch.setattr(hybrid_analysis_simple, 'EMBEDDING_CHUNK_WORDS', 20)
+        monkeypatch.setattr(hybrid_analysis_simple, 'encode_scheduler', scheduler)
+        monkeypatch.setattr(hybrid_analysis_simple, 'embedding_store', store)
+        monkeypatch.setattr(hybrid_analysis_simple, 'require_sentence_model', AsyncMock())
+        monkeypatch.setattr(hybrid_analysis_simple.analyzer, 'call_ollama_llm_async', AsyncMock(return_value=""))
+        hybrid_analysis_simple.response_cache.clear()
+        yield
+        hybrid_analysis_simple.response_cache.clear()
+
+    def test_content_past_the_cut_off_counts(self, hybrid_client, chunked):
+        """Test that skills at the end of a long resume match and are reported per section"""
+        filler = ' '.join(f"Led team meeting number {i}." for i in range(60))
+        resume = f"Jane Doe\nSUMMARY\n{filler}\nSKILLS\nKubernetes, Python"
+        job = "Kubernetes and Python engineer"
+
+        analysis = hybrid_client.post("/analyze", json={"resume": resume, "job": job, "jobLevel": "mid"}).json()
+        sections = analysis["detailed_analysis"]["section_similarity"]
+
+        assert sections["skills"] > 0.9 > sections["summary"]
+        assert analysis["similarity"] > 0.5
@@ -0,0 +1,102 @@
+"""
+Tests for the pluggable embedding backends
+Ensures the int8 and ONNX backends load from local files and stay within cosine drift of fp32
+"""
+import numpy as np
+import pytest
+
+from embedding_backend import PARITY_TEXTS, backend_from_env, load_backend, model_id, parity_report
+
+@pytest.fixture(scope='module')
+def local_model(tmp_path_factory):
+    """A tiny randomly initialized BERT saved as a SentenceTransformer, so nothing is downloaded"""
+    torch = pytest.importorskip('torch')
+    from sentence_transformers import SentenceTransformer, models as modules
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    path = tmp_path_factory.mktemp('model')
+    words = "[PAD] [UNK] [CLS] [SEP] [MASK] python java developer senior engineer with experience in aws docker " \
+            "react team led data the a and of skills".split()
+    (path / 'vocab.txt').write_text('\n'.join(words))
+    BertTokenizerFast(str(path / 'vocab.txt')).save_pretrained(str(path / 'hf'))
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(words), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=64)
+    BertModel(config).save_pretrained(str(path / 'hf'))
+    transformer = modules.Transformer(str(path / 'hf'), max_seq_length=32)
+    model = SentenceTransformer(modules=[transformer, modules.Pooling(32, 'mean'), modules.Normalize()])
+    model.save(str(path / 'st'))
+    return str(path / 'st')
+
+class FlippedModel:
+    """Stand-in candidate whose vectors point the opposite way"""
+
+    def __init__(self, reference):
+        self.reference = reference
+
+    def encode(self, texts, **kwargs):
+        return -self.reference.encode(texts, **kwargs)
+
+class TestEmbeddingBackend:
+    """Test suite for embedding backend selection and parity"""
+
+    def test_backend_selection(self, monkeypatch):
+        """Test that the backend comes from EMBEDDING_BACKEND and keys its own stored vectors"""
+        monkeypatch.setenv('EMBEDDING_BACKEND', 'onnx')
+        assert backend_from_env() == 'onnx'
+        assert model_id('torch') == 'all-MiniLM-L6-v2'
+        assert model_id('onnx') == 'all-MiniLM-L6-v2:onnx'
+
+        monkeypatch.setenv('EMBEDDING_BACKEND', 'tensorrt')
+        with pytest.raises(ValueError):
+            backend_from_env()
+        with pytest.raises(ValueError):
+            load_backend('onnx')
+
+    def test_local_models_key_their_own_vectors(self, tmp_path):
+        """Test that each local model file or directory, and any change to it, gets its own id"""
+        (tmp_path / 'model.onnx').write_bytes(b'fp32')
+        (tmp_path / 'model.int8.onnx').write_bytes(b'int8')
+        (tmp_path / 'embedding_backend.json').write_text('{"model_file": "model.onnx"}')
+        directory = model_id('onnx', str(tmp_path))
+
+        assert directory.startswith('all-MiniLM-L6-v2:onnx:')
+        assert directory == model_id('onnx', str(tmp_path / '.'))
+        assert model_id('onnx', str(tmp_path / 'model.onnx')) != model_id('onnx', str(tmp_path / 'model.int8.onnx'))
+        assert model_id('torch', str(tmp_path)) != model_id('torch') != model_id('torch', 'sentence-transformers/all-mpnet-base-v2')
+
+        (tmp_path / 'embedding_backend.json').write_text('{"model_file": "model.int8.onnx"}')
+        assert model_id('onnx', str(tmp_path)) != directory
+
+    def test_int8_backend_stays_close_to_fp32(self, local_model):
+        """Test that dynamic quantization keeps every vector within the drift budget"""
+        report = parity_report(load_backend('torch', local_model), load_backend('torch-int8', local_model),
+                               PARITY_TEXTS, batch_size=4)
+
+        assert report['texts'] == len(PARITY_TEXTS)
+        assert report['max_drift'] < 0.01
+        assert report['candidate_texts_per_second'] > 0
+
+    def test_onnx_export_matches_fp32(self, local_model, tmp_path):
+        """Test that an exported model encodes like the original, with and without int8 weights"""
+        pytest.importorskip('onnxruntime')
+        pytest.importorskip('onnx')
+        from embedding_backend import export_onnx
+
+        reference = load_backend('torch', local_model)
+        export_onnx(reference, str(tmp_path / 'onnx'), quantize=True)
+
+        exported = load_backend('onnx', str(tmp_path / 'onnx' / 'model.onnx'))
+        np.testing.assert_allclose(exported.encode(PARITY_TEXTS, batch_size=3), reference.encode(PARITY_TEXTS),
+                                   atol=1e-5)
+        assert exported.get_sentence_embedding_dimension() == 32
+
+        quantized = load_backend('onnx', str(tmp_path / 'onnx'))
+        assert parity_report(reference, quantized, PARITY_TEXTS)['mean_drift'] < 0.01
+
+    def test_parity_report_measures_drift(self, local_model):
+        """Test that drift is one minus the cosine of each pair of vectors"""
+        reference = load_backend('torch', local_model)
+
+        assert parity_report(reference, reference, PARITY_TEXTS)['max_drift'] == pytest.approx(0.0, abs=1e-6)
+        assert parity_report(reference, FlippedModel(reference), PARITY_TEXTS)['mean_drift'] == pytest.approx(2.0)
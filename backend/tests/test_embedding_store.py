@@ -0,0 +1,83 @@
+"""
+Tests for the memory-mapped embedding store
+Uses a deterministic stand-in encoder so no model download is needed
+"""
+import hashlib
+import numpy as np
+import pytest
+
+from embedding_store import EmbeddingStore, text_key
+
+class CountingEncoder:
+    """Deterministic encoder that records every batch it is asked to encode"""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.batches = []
+
+    def encode(self, texts, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(' '.join(text.split()).encode()).digest()[:4], 'little')
+            vectors.append(np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32))
+        return np.stack(vectors)
+
+class TestEmbeddingStore:
+    """Test suite for EmbeddingStore"""
+
+    def test_key_ignores_whitespace_only(self):
+        """Test that only whitespace differences share a key"""
+        assert text_key("Senior  Python\n developer") == text_key("Senior Python developer")
+        assert text_key("Senior Python developer") != text_key("Junior Python developer")
+
+    def test_encode_only_runs_model_on_distinct_misses(self, tmp_path):
+        """Test that cached and duplicate texts are not re-encoded"""
+        store = EmbeddingStore(str(tmp_path), 'test-model')
+        encoder = CountingEncoder()
+
+        first = store.encode(encoder, ["resume text", "job text", "job  text"])
+        second = store.encode(encoder, ["job text", "resume text"])
+
+        assert encoder.batches == [["resume text", "job text"]]
+        np.testing.assert_array_equal(first[1], first[2])
+        np.testing.assert_array_equal(second[0], first[1])
+        assert store.stats()['encoded'] == 2
+
+    def test_vectors_persist_and_are_shared_read_only(self, tmp_path):
+        """Test that a read-only reader sees rows appended by a writer after it opened"""
+        encoder = CountingEncoder()
+        writer = EmbeddingStore(str(tmp_path), 'test-model')
+        writer.encode(encoder, ["first posting"])
+        reader = EmbeddingStore(str(tmp_path), 'test-model', readonly=True)
+
+        writer.encode(encoder, ["second posting"])
+
+        expected = encoder.encode(["second posting"])[0]
+        np.testing.assert_array_equal(reader.get("second posting"), expected)
+        assert reader.get("unknown text") is None
+        assert len(reader) == 2
+
+        reader.put("reader only", expected)
+        assert len(writer) == 2, "Read-only stores must not write to disk"
+
+    def test_float16_store_stays_close(self, tmp_path):
+        """Test that half-precision storage keeps cosine similarity intact"""
+        encoder = CountingEncoder(dim=384)
+        vector = encoder.encode(["resume text"])[0]
+        EmbeddingStore(str(tmp_path), 'test-model', dtype='float16').put("resume text", vector)
+
+        restored = EmbeddingStore(str(tmp_path), 'test-model', dtype='float16').get("resume text")
+
+        cosine = float(np.dot(vector, restored) / (np.linalg.norm(vector) * np.linalg.norm(restored)))
+        assert restored.dtype == np.float32
+        assert cosine > 0.9999
+
+    def test_mismatched_store_is_rejected(self, tmp_path):
+        """Test that a store written for another model or dtype refuses to open"""
+        EmbeddingStore(str(tmp_path), 'test-model').put("text", np.ones(8, dtype=np.float32))
+
+        with pytest.raises(ValueError):
+            EmbeddingStore(str(tmp_path), 'other-model')
+        with pytest.raises(ValueError):
+            EmbeddingStore(str(tmp_path), 'test-model', dtype='float16')
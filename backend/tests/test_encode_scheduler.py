@@ -0,0 +1,89 @@
+"""
+Tests for the micro-batching encode scheduler
+Uses a deterministic stand-in encoder so no model download is needed
+"""
+import asyncio
+import threading
+import numpy as np
+import pytest
+
+from encode_scheduler import EncodeScheduler
+
+class RecordingEncoder:
+    """Encoder whose vector for a text is its length, recording each batch"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("encoder unavailable")
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+class TestEncodeScheduler:
+    """Test suite for EncodeScheduler"""
+
+    def test_concurrent_callers_share_batches(self):
+        """Test that texts submitted within the window are encoded together"""
+        encoder = RecordingEncoder()
+        scheduler = EncodeScheduler(encoder, max_batch_size=64, window_ms=100)
+        texts = ['x' * n for n in range(1, 17)]
+        results = {}
+        barrier = threading.Barrier(len(texts))
+
+        def caller(text):
+            barrier.wait()
+            results[text] = scheduler.encode([text])[0]
+
+        threads = [threading.Thread(target=caller, args=(text,)) for text in texts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        scheduler.close()
+
+        assert len(encoder.batches) < len(texts)
+        for text in texts:
+            np.testing.assert_array_equal(results[text], [len(text), 1.0])
+
+    def test_max_batch_size_and_duplicates(self):
+        """Test that batches are capped and identical texts are encoded once"""
+        encoder = RecordingEncoder()
+        scheduler = EncodeScheduler(encoder, max_batch_size=3, window_ms=50)
+
+        vectors = scheduler.encode(['a', 'bb', 'a', 'ccc', 'dddd', 'eeeee'])
+        scheduler.close()
+
+        assert all(len(batch) <= 3 for batch in encoder.batches)
+        assert sum(len(batch) for batch in encoder.batches) == 5
+        assert [vector[0] for vector in vectors] == [1, 2, 1, 3, 4, 5]
+
+    def test_errors_reach_every_caller(self):
+        """Test that a failed batch fails each waiting future"""
+        scheduler = EncodeScheduler(RecordingEncoder(fail=True), window_ms=10)
+
+        with pytest.raises(RuntimeError):
+            scheduler.encode(['resume', 'job'])
+        scheduler.close()
+
+    def test_encode_async_does_not_block_event_loop(self):
+        """Test that the event loop keeps running while a batch is pending"""
+        scheduler = EncodeScheduler(RecordingEncoder(), window_ms=50)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(1)
+                await asyncio.sleep(0.005)
+
+        async def main():
+            vectors, _ = await asyncio.gather(scheduler.encode_async(['resume', 'job']), ticker())
+            return vectors
+
+        vectors = asyncio.run(main())
+        scheduler.close()
+
+        assert len(ticks) == 5
+        assert [vector[0] for vector in vectors] == [6, 3]
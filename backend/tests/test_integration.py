@@ -6,7 +6,7 @@ import pytest
 import json
 import time
 from typing import Dict, Any
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 
 class TestIntegrationWorkflow:
     """Integration test suite for complete workflow"""
@@ -132,7 +132,7 @@ class TestIntegrationWorkflow:
         for resume_type, data in results.items():
             print(f"📊 {resume_type.replace('_', ' ').title()} Score: {data['overall_score']:.3f}")
     
-    @patch('requests.post')
+    @patch('httpx.AsyncClient.post', new_callable=AsyncMock)
     def test_workflow_with_llm_integration(self, mock_post, hybrid_client, sample_resume_data, sample_job_data, mock_ollama_response):
         """Test complete workflow with LLM integration"""
         # Mock successful LLM response
@@ -0,0 +1,171 @@
+"""
+Tests for the persistent job feature store
+Ensures features survive restarts, only changed postings are recomputed and scoring reuses them
+"""
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from embedding_store import EmbeddingStore
+from encode_scheduler import EncodeScheduler
+from job_feature_store import JobFeatures, JobFeatureStore
+from vector_index import VectorIndex
+
+class FeatureCounter:
+    """compute callback that records which postings it was asked for"""
+
+    def __init__(self, store):
+        self.store = store
+        self.computed = []
+
+    def __call__(self, jobs):
+        self.computed.extend(job_id for job_id, _ in jobs)
+        return [
+            JobFeatures(job_id=job_id, content_hash=self.store.hash_for(text), normalized_text=text.lower(),
+                        embedding=np.full(4, len(text), dtype=np.float32),
+                        keywords={'words': text.split()}, skills={'skills': [text.split()[0].lower()]})
+            for job_id, text in jobs
+        ]
+
+class TestJobFeatureStore:
+    """Test suite for JobFeatureStore"""
+
+    def test_refresh_only_recomputes_changed_postings(self, tmp_path):
+        """Test that unchanged postings are skipped and edited ones replaced"""
+        store = JobFeatureStore(str(tmp_path / 'features.sqlite3'))
+        compute = FeatureCounter(store)
+
+        assert store.refresh([('1', 'Python developer'), ('2', 'Java developer')], compute) == \
+            {'added': 2, 'updated': 0, 'unchanged': 0}
+        assert store.refresh([('1', 'Python developer'), ('2', 'Senior Java developer')], compute) == \
+            {'added': 0, 'updated': 1, 'unchanged': 1}
+
+        assert compute.computed == ['1', '2', '2']
+        assert store.get('2').normalized_text == 'senior java developer'
+        assert store.get_by_text('Java developer') is None, "The old posting text no longer matches"
+
+    def test_features_persist_across_restarts(self, tmp_path):
+        """Test that a reopened store serves features without recomputing"""
+        path = str(tmp_path / 'features.sqlite3')
+        first = JobFeatureStore(path, version='v1')
+        first.refresh([('1', 'Python developer')], FeatureCounter(first))
+
+        reopened = JobFeatureStore(path, version='v1')
+        features = reopened.get_by_text('Python developer')
+
+        assert features.job_id == '1'
+        assert features.keywords == {'words': ['Python', 'developer']}
+        assert features.skills == {'skills': ['python']}
+        np.testing.assert_array_equal(features.embedding, np.full(4, 16, dtype=np.float32))
+        assert reopened.stats() == {'jobs': 1, 'hits': 1, 'misses': 0}
+
+    def test_version_change_invalidates_features(self, tmp_path):
+        """Test that features computed by older extraction logic are refreshed"""
+        path = str(tmp_path / 'features.sqlite3')
+        old = JobFeatureStore(path, version='v1')
+        old.refresh([('1', 'Python developer')], FeatureCounter(old))
+
+        new = JobFeatureStore(path, version='v2')
+        compute = FeatureCounter(new)
+
+        assert new.get_by_text('Python developer') is None
+        assert new.refresh([('1', 'Python developer')], compute)['updated'] == 1
+        assert compute.computed == ['1']
+
+    def test_rows_written_by_another_worker_are_found(self, tmp_path):
+        """Test that a text lookup falls back to SQLite for rows this process has not seen"""
+        path = str(tmp_path / 'features.sqlite3')
+        reader = JobFeatureStore(path)
+        writer = JobFeatureStore(path)
+        writer.refresh([('1', 'Go developer')], FeatureCounter(writer))
+
+        assert reader.get_by_text('Go developer').job_id == '1'
+
+    def test_sync_applies_changes_made_by_another_worker(self, tmp_path):
+        """Test that sync loads added and edited jobs and drops removed ones, and is a no-op otherwise"""
+        path = str(tmp_path / 'features.sqlite3')
+        writer = JobFeatureStore(path)
+        writer.refresh([('1', 'Go developer'), ('2', 'Java developer')], FeatureCounter(writer))
+        reader = JobFeatureStore(path)
+        reader.after_fork()
+
+        assert reader.sync() == ([], [])
+        writer.refresh([('2', 'Senior Java developer'), ('3', 'Rust developer')], FeatureCounter(writer))
+        writer.remove('1')
+        changed, removed = reader.sync()
+
+        assert sorted(features.job_id for features in changed) == ['2', '3'] and removed == ['1']
+        assert reader.get('1') is None and reader.get('2').normalized_text == 'senior java developer'
+        assert reader.get_by_text('Rust developer').job_id == '3'
+        assert reader.sync() == ([], [])
+        reader.put(JobFeatures(job_id='4', content_hash=reader.hash_for('Ruby'), normalized_text='ruby'))
+        assert reader.sync() == ([], []), "A worker's own writes are not reloaded"
+        assert [features.job_id for features in writer.sync()[0]] == ['4']
+
+    def test_remove(self):
+        """Test that removed jobs are gone by id and by text"""
+        store = JobFeatureStore()
+        store.refresh([('1', 'Rust developer')], FeatureCounter(store))
+
+        assert store.remove('1')
+        assert not store.remove('1')
+        assert store.get('1') is None and store.get_by_text('Rust developer') is None
+
+class CountingEncoder:
+    """Bag-of-characters encoder that records every text it encodes"""
+
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, **kwargs):
+        self.texts.extend(texts)
+        vectors = np.zeros((len(texts), 32), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for char in text.lower():
+                vectors[row, ord(char) % 32] += 1
+        return vectors
+
+class TestStoredJobScoring:
+    """Test that /analyze reuses stored job features in the hybrid service"""
+
+    @pytest.fixture
+    def encoder(self, monkeypatch, tmp_path):
+        encoder = CountingEncoder()
+        scheduler = EncodeScheduler(encoder)
+        monkeypatch.setattr(hybrid_analysis_simple, 'encode_scheduler', scheduler)
+        monkeypatch.setattr(hybrid_analysis_simple, 'embedding_store',
+                            EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in'))
+        monkeypatch.setattr(hybrid_analysis_simple, 'job_features', JobFeatureStore(str(tmp_path / 'features.sqlite3')))
+        monkeypatch.setattr(hybrid_analysis_simple, 'job_index', VectorIndex())
+        monkeypatch.setattr(hybrid_analysis_simple, 'require_sentence_model', AsyncMock())
+        monkeypatch.setattr(hybrid_analysis_simple.analyzer, 'call_ollama_llm_async', AsyncMock(return_value=""))
+        hybrid_analysis_simple.response_cache.clear()
+        hybrid_analysis_simple.job_keyword_cache.clear()
+        yield encoder
+        hybrid_analysis_simple.response_cache.clear()
+        hybrid_analysis_simple.job_keyword_cache.clear()
+        scheduler.close()
+
+    def test_stored_job_scores_like_a_new_one(self, hybrid_client, encoder, monkeypatch,
+                                              sample_resume_data, sample_job_data):
+        """Test that a registered posting gives the same result without job-side extraction"""
+        resume, job = sample_resume_data["senior_developer"], sample_job_data["senior_developer"]
+        payload = {"resume": resume, "job": job, "jobLevel": "senior"}
+        expected = hybrid_client.post("/analyze", json=payload).json()
+        hybrid_analysis_simple.response_cache.clear()
+        hybrid_analysis_simple.job_keyword_cache.clear()
+
+        response = hybrid_client.post("/jobs", json={"jobs": [{"id": "42", "title": "Senior Dev", "description": job}]})
+        assert response.json()["added"] == 1
+
+        extracted = []
+        extract_keywords = hybrid_analysis_simple.analyzer.extract_keywords
+        monkeypatch.setattr(hybrid_analysis_simple.analyzer, 'extract_keywords',
+                            lambda context: extracted.append(context.text) or extract_keywords(context))
+        encoder.texts.clear()
+
+        assert hybrid_client.post("/analyze", json=payload).json() == expected
+        assert job not in extracted, "Job keywords come from the store"
+        assert job not in encoder.texts
+        assert hybrid_client.post("/jobs", json={"jobs": [{"id": "42", "title": "Senior Dev", "description": job}]}).json()["unchanged"] == 1
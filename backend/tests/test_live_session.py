@@ -0,0 +1,176 @@
+"""
+Tests for live resume-editing sessions
+Ensures an edit re-analyzes only the sections it changed and the recombined scores equal a full analysis
+"""
+import asyncio
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from embedding_store import EmbeddingStore
+from encode_scheduler import EncodeScheduler
+from improved_ats_analysis import AnalysisContext, ImprovedATSAnalyzer, SectionType
+from live_session import LiveResume
+
+class CountingEncoder:
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, **kwargs):
+        self.texts.extend(texts)
+        return np.stack([np.random.default_rng(len(text)).random(8, dtype=np.float32) for text in texts])
+
+def full_resume_side(analyzer, text):
+    context = AnalysisContext(text)
+    return {'standalone_analysis': analyzer.calculate_standalone_score(context),
+            'resume_keywords': analyzer.extract_keywords(context)}
+
+EDITS = [
+    ("Collaborated with design team", "Led a team of 4 and increased conversion by 20%"),
+    ("Tools: Git", "Tools: Git, Docker, Kubernetes"),
+    ("3 years experience in web development.", "3 years experience in web development"),
+    ("SKILLS:", "PROJECTS:\n        Built a CLI used by 300 users.\n\n        SKILLS:"),
+]
+
+class TestLiveResume:
+    """Test suite for LiveResume"""
+
+    @pytest.fixture
+    def analyzer(self):
+        return ImprovedATSAnalyzer()
+
+    def test_recombined_results_match_a_full_analysis(self, analyzer, sample_resume_data):
+        """Test that results after each edit equal an analysis of the whole edited text"""
+        for text in sample_resume_data.values():
+            live = LiveResume(analyzer)
+            for old, new in [(None, None)] + EDITS:
+                text = text.replace(old, new) if old else text
+                live.update(text)
+                assert live.resume_side() == full_resume_side(analyzer, text)
+
+    def test_edit_analyzes_only_the_changed_section(self, analyzer, sample_resume_data, monkeypatch):
+        """Test that an edit inside one section scans only that section and undoing it scans nothing"""
+        text = sample_resume_data["mid_developer"]
+        live = LiveResume(analyzer)
+        first = live.update(text)
+        scanned = []
+        scan = analyzer.pattern_engine.scan
+        monkeypatch.setattr(analyzer.pattern_engine, 'scan', lambda piece: scanned.append(piece) or scan(piece))
+
+        edited = live.update(text.replace(*EDITS[0]))
+        undone = live.update(text)
+
+        assert len(first) == 4, "Preamble, summary, experience and skills"
+        assert [segment.section for segment in edited] == [SectionType.EXPERIENCE]
+        assert scanned == [edited[0].context.text]
+        assert undone == []
+
+    def test_sentence_running_across_sections(self, analyzer):
+        """Test that an achievement sentence split by a header is checked as a whole, like a full analysis"""
+        text = "Jane Smith\nIncreased revenue\nEXPERIENCE\nby 20% in 2022. Built 3 services.\nSKILLS\nPython"
+        live = LiveResume(analyzer)
+        live.update(text)
+
+        achievements = live.resume_side()['standalone_analysis']['achievements_analysis']
+
+        assert achievements == analyzer.detect_quantifiable_achievements(AnalysisContext(text))
+        assert achievements['achievement_sentences'][0].startswith("Jane Smith\nIncreased revenue\nEXPERIENCE")
+
+    def test_embed_encodes_only_new_sections(self, analyzer, sample_resume_data, tmp_path):
+        """Test that section vectors are kept across edits"""
+        encoder = CountingEncoder()
+        scheduler = EncodeScheduler(encoder)
+        store = EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in')
+        text = sample_resume_data["mid_developer"]
+        live = LiveResume(analyzer)
+
+        live.update(text)
+        chunks, vectors = asyncio.run(live.embed(store, scheduler))
+        encoded = len(encoder.texts)
+        edited = live.update(text.replace(*EDITS[1]))
+        chunks_after, vectors_after = asyncio.run(live.embed(store, scheduler))
+        scheduler.close()
+
+        assert encoded == len(chunks) == 4 and vectors.shape == (4, 8)
+        assert encoder.texts[encoded:] == [edited[0].context.text]
+        assert [chunk.section for chunk in chunks_after] == [None, 'summary', 'experience', 'skills']
+        assert np.array_equal(vectors_after[:3], vectors[:3])
+
+class TestLiveEndpoint:
+    """Test the /analyze/live WebSocket of the hybrid service"""
+
+    @pytest.fixture
+    def service(self, monkeypatch, tmp_path):
+        scheduler = EncodeScheduler(CountingEncoder())
+        llm = AsyncMock(return_value="")
+        monkeypatch.setattr(hybrid_analysis_simple, 'encode_scheduler', scheduler)
+        monkeypatch.setattr(hybrid_analysis_simple, 'embedding_store', EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in'))
+        monkeypatch.setattr(hybrid_analysis_simple, 'require_sentence_model', AsyncMock())
+        monkeypatch.setattr(hybrid_analysis_simple.analyzer, 'call_ollama_llm_async', llm)
+        for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache):
+            cache.clear()
+        yield llm
+        for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache):
+            cache.clear()
+        scheduler.close()
+
+    def test_edits_reuse_unchanged_sections(self, hybrid_client, service, sample_resume_data, sample_job_data):
+        """Test that the first message analyzes every section and later ones only the edited section"""
+        resume = sample_resume_data["mid_developer"]
+        with hybrid_client.websocket_connect("/analyze/live") as session:
+            session.send_json({"resume": resume, "job": sample_job_data["mid_developer"], "jobLevel": "mid", "revision": 1})
+            first = session.receive_json()
+            session.send_json({"resume": resume.replace(*EDITS[0]), "revision": 2})
+            second = session.receive_json()
+
+        assert first["revision"] == 1 and first["error"] is None
+        assert first["analyzed_sections"] == ["preamble", "summary", "experience", "skills"]
+        assert second["revision"] == 2
+        assert second["analyzed_sections"] == ["experience"] and second["reused_sections"] == 3
+        assert second["result"]["skipped_stages"] == {"llm": "mode"}
+        assert second["result"]["similarity"] > 0 and second["result"]["keyword_match_score"] > 0
+        service.assert_not_called()
+
+    def test_scores_match_analyze(self, hybrid_client, service, sample_resume_data, sample_job_data):
+        """Test that the ATS scores of a live edit equal those of /analyze for the same text"""
+        payload = {"resume": sample_resume_data["senior_developer"].replace(*EDITS[1]),
+                   "job": sample_job_data["senior_developer"], "jobLevel": "senior", "mode": "fast"}
+        with hybrid_client.websocket_connect("/analyze/live") as session:
+            session.send_json({**payload, "resume": sample_resume_data["senior_developer"]})
+            session.receive_json()
+            session.send_json(payload)
+            live = session.receive_json()["result"]
+        response = hybrid_client.post("/analyze", json=payload).json()
+
+        assert live["detailed_analysis"] == response["detailed_analysis"]
+        assert live["overall_score"] == response["overall_score"]
+
+    def test_bad_messages_keep_the_session_open(self, hybrid_client, service, sample_resume_data):
+        """Test that invalid messages get an error reply and the next valid edit is analyzed"""
+        with hybrid_client.websocket_connect("/analyze/live") as session:
+            session.send_text("not json")
+            malformed = session.receive_json()
+            session.send_json({"resume": "Python developer", "revision": 1})
+            no_level = session.receive_json()
+            session.send_json({"resume": sample_resume_data["junior_developer"], "jobLevel": "entry", "mode": "deep"})
+            deep = session.receive_json()
+            session.send_json({"resume": sample_resume_data["junior_developer"], "jobLevel": "entry", "revision": 3})
+            valid = session.receive_json()
+
+        assert malformed["error"] and malformed["result"] is None
+        assert "jobLevel is required" in no_level["error"] and no_level["revision"] == 1
+        assert deep["error"], "The LLM mode is not offered for live edits"
+        assert valid["error"] is None and valid["revision"] == 3
+        assert valid["result"]["overall_score"] == valid["result"]["standalone_score"]
+
+    def test_section_counts_exported(self, hybrid_client, service, sample_resume_data):
+        """Test that analyzed and reused sections reach /metrics"""
+        with hybrid_client.websocket_connect("/analyze/live") as session:
+            session.send_json({"resume": sample_resume_data["junior_developer"], "jobLevel": "entry"})
+            session.receive_json()
+
+        text = hybrid_client.get("/metrics").text
+
+        assert '# TYPE live_sections_total counter' in text
+        assert 'live_sections_total{result="analyzed"}' in text
@@ -0,0 +1,158 @@
+"""
+Tests for the pooled async Ollama client
+Runs against the local stub server from conftest instead of a real Ollama
+"""
+import asyncio
+import threading
+import time
+import pytest
+
+from llm_client import CircuitBreaker, OllamaClient, PromptCache
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestOllamaClient:
+    """Test suite for OllamaClient"""
+
+    def test_responses_are_cached_persistently(self, ollama_stub, tmp_path):
+        """Test that a prompt is sent once and later served from the SQLite cache"""
+        cache_path = str(tmp_path / 'llm_cache.sqlite3')
+        client = OllamaClient(url=ollama_stub.url, cache=PromptCache(cache_path))
+
+        async def main():
+            first = await client.generate("Analyze this resume")
+            second = await client.generate("Analyze this resume")
+            await client.aclose()
+            return first, second
+
+        first, second = asyncio.run(main())
+        restarted = OllamaClient(url=ollama_stub.url, cache=PromptCache(cache_path))
+
+        assert first == second == ollama_stub.response_text
+        assert asyncio.run(restarted.generate("Analyze this resume")) == first
+        assert len(ollama_stub.prompts) == 1
+        assert client.stats()['cache_hits'] == 1
+
+    def test_cache_is_used_off_the_event_loop(self, ollama_stub):
+        """Test that SQLite lookups and writes do not run on the event loop's thread"""
+        threads = []
+
+        class RecordingCache(PromptCache):
+            def get(self, key):
+                threads.append(threading.current_thread())
+                return super().get(key)
+
+            def put(self, key, response):
+                threads.append(threading.current_thread())
+                super().put(key, response)
+
+        client = OllamaClient(url=ollama_stub.url, cache=RecordingCache())
+
+        async def main():
+            await client.generate("Analyze this resume")
+            await client.aclose()
+            return threading.current_thread()
+
+        loop_thread = asyncio.run(main())
+
+        assert len(threads) == 2 and loop_thread not in threads
+
+    def test_pool_is_closed_with_its_event_loop(self, ollama_stub):
+        """Test that a client used from successive event loops closes each loop's connection pool"""
+        client = OllamaClient(url=ollama_stub.url)
+
+        async def generate(prompt):
+            await client.generate(prompt)
+            return client._client
+
+        first = asyncio.run(generate("first"))
+        second = asyncio.run(generate("second"))
+
+        assert first is not second
+        assert first.is_closed and second.is_closed
+        assert len(ollama_stub.prompts) == 2
+
+    def test_identical_in_flight_prompts_are_deduplicated(self, ollama_stub):
+        """Test that concurrent identical prompts share one upstream call"""
+        ollama_stub.delay = 0.2
+        client = OllamaClient(url=ollama_stub.url)
+
+        async def main():
+            results = await asyncio.gather(*[client.generate("Same prompt") for _ in range(5)])
+            await client.aclose()
+            return results
+
+        results = asyncio.run(main())
+
+        assert results == [ollama_stub.response_text] * 5
+        assert len(ollama_stub.prompts) == 1
+        assert client.stats()['deduplicated'] == 4
+
+    def test_concurrency_is_limited(self, ollama_stub):
+        """Test that no more than max_concurrency calls are outstanding"""
+        ollama_stub.delay = 0.2
+        client = OllamaClient(url=ollama_stub.url, max_concurrency=2)
+
+        async def main():
+            start = time.perf_counter()
+            await asyncio.gather(*[client.generate(f"Prompt {i}") for i in range(4)])
+            await client.aclose()
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(main())
+
+        assert len(ollama_stub.prompts) == 4
+        assert elapsed >= 0.4, "Four 0.2s calls through two slots need two rounds"
+
+    def test_circuit_breaker_skips_calls_during_cooldown(self, ollama_stub):
+        """Test that repeated failures open the breaker until a trial call succeeds"""
+        clock = FakeClock()
+        ollama_stub.status_code = 500
+        client = OllamaClient(url=ollama_stub.url, breaker=CircuitBreaker(failure_threshold=2, cooldown_seconds=30, clock=clock))
+
+        async def generate(prompt):
+            return await client.generate(prompt)
+
+        assert asyncio.run(generate("first")) == ""
+        assert asyncio.run(generate("second")) == ""
+        assert client.breaker.state == 'open'
+        assert asyncio.run(generate("third")) == ""
+        assert len(ollama_stub.prompts) == 2, "An open breaker must not call Ollama"
+
+        clock.now = 30
+        ollama_stub.status_code = 200
+        assert asyncio.run(generate("fourth")) == ollama_stub.response_text
+        assert client.breaker.state == 'closed'
+        assert client.stats()['short_circuited'] == 1
+
+    def test_unreachable_server_returns_empty(self):
+        """Test that connection errors fall back to an empty response"""
+        client = OllamaClient(url="http://127.0.0.1:9/api/generate", timeout=1,
+                              breaker=CircuitBreaker(failure_threshold=1))
+
+        assert asyncio.run(client.generate("prompt")) == ""
+        assert client.breaker.state == 'open'
+
+class TestSynchronousHelpers:
+    """Test that the services' synchronous LLM helpers go through the pooled client"""
+
+    def test_insights_are_cached_like_async_calls(self, ollama_stub, improved_analyzer, hybrid_analyzer):
+        """Test that repeated synchronous calls reach Ollama once per service and are served from the cache"""
+        ollama_stub.response_text = '{"strengths": ["Python"], "weaknesses": [], "suggestions": [], "overall_assessment": "Good"}'
+        for analyzer in (improved_analyzer, hybrid_analyzer):
+            analyzer.llm_client = OllamaClient(url=ollama_stub.url, model=type(analyzer).__name__)
+
+            first = analyzer.generate_llm_insights("Python developer", "Python role", "mid")
+            second = analyzer.generate_llm_insights("Python developer", "Python role", "mid")
+
+            assert first == second and first['strengths'] == ['Python']
+            assert analyzer.llm_client.stats()['cache_hits'] == 1
+
+        assert len(ollama_stub.prompts) == 2
@@ -0,0 +1,83 @@
+"""
+Tests for the lazy model registry
+Ensures models load once, on demand or in parallel, and report readiness
+"""
+import threading
+import time
+import pytest
+
+from model_registry import ModelRegistry, ModelUnavailableError
+
+class TestModelRegistry:
+    """Test suite for ModelRegistry"""
+
+    def test_models_load_lazily_and_once(self):
+        """Test that a loader runs on first use only, even with concurrent callers"""
+        registry = ModelRegistry()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        registry.register('encoder', loader)
+        assert calls == []
+        assert registry.status() == {'encoder': {'state': 'not_loaded'}}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get('encoder'))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert registry.status()['encoder']['state'] == 'ready'
+
+    def test_preload_runs_loaders_in_parallel(self):
+        """Test that preloading overlaps independent loaders"""
+        registry = ModelRegistry()
+        for name in ('encoder', 'parser', 'stopwords'):
+            registry.register(name, lambda name=name: time.sleep(0.2) or name)
+
+        start = time.perf_counter()
+        for thread in registry.preload():
+            thread.join()
+
+        assert time.perf_counter() - start < 0.5
+        assert registry.is_ready()
+
+    def test_failed_load_is_reported_and_retried_later(self):
+        """Test that a failure is surfaced in status and not retried until the retry window passes"""
+        registry = ModelRegistry(retry_seconds=0.1)
+        attempts = []
+
+        def loader():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("no network")
+            return 'model'
+
+        registry.register('encoder', loader)
+
+        assert registry.get_optional('encoder') is None
+        with pytest.raises(ModelUnavailableError):
+            registry.get('encoder')
+        assert len(attempts) == 1
+        assert registry.status()['encoder'] == {'state': 'failed', 'error': 'no network'}
+        assert not registry.is_ready()
+
+        time.sleep(0.1)
+        assert registry.get('encoder') == 'model'
+        assert registry.is_ready(['encoder'])
+
+    def test_set_installs_stand_in_models(self):
+        """Test that tests can inject a model without running its loader"""
+        registry = ModelRegistry()
+        registry.register('encoder', lambda: pytest.fail("loader should not run"))
+
+        registry.set('encoder', 'stand-in')
+
+        assert registry.get('encoder') == 'stand-in'
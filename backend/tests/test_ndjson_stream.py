@@ -0,0 +1,108 @@
+"""
+Tests for incremental NDJSON parsing and the streaming analysis endpoint
+Ensures records are parsed across arbitrary chunk boundaries and results stream back in order
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from ndjson_stream import LineTooLongError, chunked, iter_ndjson
+
+async def byte_chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+class TestNDJSONStream:
+    """Test suite for iter_ndjson and chunked"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+    def test_records_survive_any_chunk_boundary(self, chunk_size):
+        """Test that records split across network chunks parse the same"""
+        data = b'{"a": 1}\n\n{"b": "x\\ny"}\r\n  \n{"c": [1, 2]}'
+
+        records = asyncio.run(collect(iter_ndjson(byte_chunks(data, chunk_size))))
+
+        assert records == [(0, {"a": 1}), (1, {"b": "x\ny"}), (2, {"c": [1, 2]})]
+
+    def test_bad_lines_are_reported_in_place(self):
+        """Test that malformed and over-long lines become exceptions without stopping the stream"""
+        data = b'{"a": 1}\nnot json\n' + b'x' * 50 + b'\n{"b": 2}\n'
+
+        records = asyncio.run(collect(iter_ndjson(byte_chunks(data, 8), max_line_bytes=20)))
+
+        assert [index for index, _ in records] == [0, 1, 2, 3]
+        assert isinstance(records[1][1], ValueError)
+        assert isinstance(records[2][1], LineTooLongError)
+        assert records[3] == (3, {"b": 2})
+
+    def test_chunked_bounds_group_size(self):
+        """Test that chunked yields full groups and a final remainder"""
+        async def numbers():
+            for i in range(7):
+                yield i
+
+        assert asyncio.run(collect(chunked(numbers(), 3))) == [[0, 1, 2], [3, 4, 5], [6]]
+
+class TestStreamingAnalysis:
+    """Test suite for /analyze/stream"""
+
+    def test_stream_scores_records_in_order(self, hybrid_client, monkeypatch, sample_resume_data, sample_job_data):
+        """Test that each record gets one result line, including invalid ones"""
+        async def run_analysis(resume, job, job_level, plan=None):
+            return hybrid_analysis_simple.AnalysisResponse(
+                similarity=0.5, jobLevel=job_level, overall_score=len(resume.text) % 100,
+                keyword_match_score=0.5, skill_gap_analysis={}, improvement_suggestions=[],
+                detailed_analysis={'job_length': len(job.text)}
+            )
+
+        monkeypatch.setattr(hybrid_analysis_simple, 'run_analysis', run_analysis)
+        monkeypatch.setattr(hybrid_analysis_simple, 'pre_encode', AsyncMock())
+        monkeypatch.setattr(hybrid_analysis_simple, 'STREAM_CHUNK_SIZE', 2)
+        job = sample_job_data["senior_developer"]
+        records = [{"id": f"r{i}", "resume": resume, "job": job, "jobLevel": "senior"}
+                   for i, resume in enumerate(sample_resume_data.values())]
+        body = '\n'.join(json.dumps(record) for record in records[:2]) + '\n{"id": "bad"}\n' + json.dumps(records[2])
+
+        with hybrid_client.stream("POST", "/analyze/stream", content=body) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+
+        assert [line["index"] for line in lines] == [0, 1, 2, 3]
+        assert [line["id"] for line in lines] == ["r0", "r1", "bad", "r2"]
+        assert lines[2]["error"].startswith("Invalid record")
+        for line, record in zip([lines[0], lines[1], lines[3]], records):
+            assert line["result"]["overall_score"] == len(record["resume"]) % 100
+            assert line["result"]["detailed_analysis"] == {'job_length': len(job)}
+
+    def test_stream_stays_bounded_ahead_of_the_consumer(self, monkeypatch):
+        """Test that only one chunk is scored ahead of what the client has read"""
+        started = []
+
+        async def score_stream_chunk(chunk):
+            started.extend(index for index, _ in chunk)
+            return [hybrid_analysis_simple.StreamItemResult(index=index) for index, _ in chunk]
+
+        async def records():
+            for i in range(100):
+                yield i, {}
+
+        monkeypatch.setattr(hybrid_analysis_simple, 'score_stream_chunk', score_stream_chunk)
+        monkeypatch.setattr(hybrid_analysis_simple, 'STREAM_CHUNK_SIZE', 10)
+
+        async def read_first_line():
+            stream = hybrid_analysis_simple.stream_results(records())
+            first = await stream.__anext__()
+            await asyncio.sleep(0.05)
+            await stream.aclose()
+            return first
+
+        first = asyncio.run(read_first_line())
+
+        assert json.loads(first)["index"] == 0
+        assert len(started) == 20, "The first chunk plus one chunk of lookahead"
@@ -0,0 +1,97 @@
+"""
+Tests for the compiled pattern engine
+Ensures single-pass scanning returns the same matches as running each pattern on its own
+"""
+import re
+import pytest
+
+from pattern_engine import AhoCorasick, KeywordMatcher, PatternEngine, required_literal
+from improved_ats_analysis import AnalysisContext, ImprovedATSAnalyzer
+
+class TestPatternEngine:
+    """Test suite for the compiled pattern engine"""
+
+    def test_aho_corasick_overlapping_matches(self):
+        """Test that every literal occurrence is reported, including overlaps"""
+        automaton = AhoCorasick(['experience', 'experienced', 'rien'])
+        positions = automaton.find_positions('inexperienced experience')
+
+        assert positions['experienced'] == [2]
+        assert positions['experience'] == [2, 14]
+        assert positions['rien'] == [6, 18]
+
+    def test_keyword_matcher_word_boundaries(self):
+        """Test whole-word matching, multi-word terms and symbol-heavy terms"""
+        matcher = KeywordMatcher()
+        matcher.add_terms('skills', ['go', 'java', 'c++', 'node.js', 'sql server', 'github actions'])
+        text = "Google and JavaScript shop using Go, C++ and Node.js on SQL\n   Server with GitHub  Actions"
+
+        hits = matcher.find(text)
+        found = [hit.value for hit in hits]
+
+        assert found == ['go', 'c++', 'node.js', 'sql server', 'github actions']
+        assert 'java' not in found, "'java' should not match inside 'javascript'"
+        sql_hit = hits[3]
+        assert text[sql_hit.span[0]:sql_hit.span[1]] == "SQL\n   Server", "Spans should point into the original text"
+
+    def test_required_literal_extraction(self):
+        """Test extraction of the literal every match must contain"""
+        assert required_literal(r'\bpython\b') == ('python', True)
+        assert required_literal(r'years?\s+of\s+experience') == ('experience', False)
+        assert required_literal(r'certifications?') == ('certification', True)
+        assert required_literal(r'linkedin\.com') == ('linkedin.com', True)
+        assert required_literal(r'\d{10}') == (None, False)
+        assert required_literal(r'python|java') == (None, False)
+
+    def test_required_literal_of_escapes(self):
+        """Test that control and code escapes become their character and other escapes end the literal"""
+        assert required_literal(r'node\njs') == ('node\njs', True)
+        assert required_literal(r'\x41pple') == ('apple', True)
+        assert required_literal(r'(ab)\1cdef') == ('cdef', False)
+        assert required_literal(r'\N{BULLET} python') == (' python', False)
+
+        engine = PatternEngine()
+        engine.add_patterns('escaped', [r'node\tjs', r'\x41pple'])
+        assert [hit.value for hit in engine.scan("Node\tjs and apple").hits] == ['Node\tjs', 'apple']
+
+    def test_scan_matches_individual_patterns(self, sample_resume_data):
+        """Test that tagged hits equal per-pattern re.finditer results"""
+        analyzer = ImprovedATSAnalyzer()
+        patterns = analyzer.achievement_patterns + analyzer.contact_patterns
+
+        engine = PatternEngine()
+        engine.add_patterns('all', patterns)
+        engine.compile()
+
+        for resume_text in sample_resume_data.values():
+            scan = engine.scan(resume_text)
+            for pattern_id, pattern in enumerate(patterns):
+                expected = [m.span() for m in re.finditer(pattern, resume_text, re.IGNORECASE)]
+                actual = [hit.span for hit in scan.category_hits('all') if hit.pattern_id == pattern_id]
+                assert actual == expected, f"Pattern {pattern} returned different matches"
+
+    def test_detectors_share_one_context(self, sample_resume_data):
+        """Test that detectors give identical results from a shared context"""
+        analyzer = ImprovedATSAnalyzer()
+        resume_text = sample_resume_data["senior_developer"]
+        context = AnalysisContext(resume_text)
+
+        assert analyzer.extract_keywords(context) == analyzer.extract_keywords(resume_text)
+        assert analyzer.detect_action_verbs(context) == analyzer.detect_action_verbs(resume_text)
+        assert analyzer.detect_quantifiable_achievements(context) == \
+            analyzer.detect_quantifiable_achievements(resume_text)
+
+    def test_context_runs_each_detector_once(self, sample_resume_data, monkeypatch):
+        """Test that standalone scoring and later detector calls reuse one scan"""
+        analyzer = ImprovedATSAnalyzer()
+        context = AnalysisContext(sample_resume_data["senior_developer"])
+        scans = []
+        original_scan = analyzer.pattern_engine.scan
+        monkeypatch.setattr(analyzer.pattern_engine, 'scan', lambda text: scans.append(text) or original_scan(text))
+
+        standalone = analyzer.calculate_standalone_score(context)
+
+        assert analyzer.detect_sections(context) is standalone['section_analysis']
+        assert analyzer.detect_action_verbs(context) is standalone['detected_verbs']
+        assert analyzer.analyze_format_optimization(context) is standalone['format_analysis']
+        assert len(scans) == 1
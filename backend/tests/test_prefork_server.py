@@ -0,0 +1,244 @@
+"""
+Tests for the pre-fork multi-worker server
+Ensures forked workers get their own connections and threads, share the parent's models and are recycled gracefully
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import numpy as np
+import httpx
+import pytest
+
+from encode_scheduler import EncodeScheduler
+from job_feature_store import JobFeatures, JobFeatureStore
+from llm_client import PromptCache
+from stage_pool import StagePool
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="Pre-forking needs os.fork")
+
+SERVICE = '''
+import os
+from fastapi import FastAPI
+
+app = FastAPI()
+loaded_in = None
+forked = False
+
+def before_fork():
+    global loaded_in
+    loaded_in = os.getpid()
+
+def after_fork():
+    global forked
+    forked = True
+
+@app.get('/whoami')
+def whoami():
+    return {'pid': os.getpid(), 'loaded_in': loaded_in, 'forked': forked}
+'''
+
+# The hybrid service with a stand-in sentence model; every response names the worker that served it
+JOBS_SERVICE = '''
+import os
+import numpy as np
+from hybrid_analysis_simple import app, after_fork
+from model_registry import models
+
+class TopicEncoder:
+    TOPICS = ['python', 'java', 'design']
+
+    def encode(self, texts, **kwargs):
+        return np.array([[0.01 + text.lower().count(topic) for topic in self.TOPICS] for text in texts],
+                        dtype=np.float32)
+
+models.set('sentence_transformer', TopicEncoder())
+
+@app.middleware('http')
+async def name_worker(request, call_next):
+    response = await call_next(request)
+    response.headers['X-Worker'] = str(os.getpid())
+    return response
+
+@app.get('/whoami')
+def whoami():
+    return {'pid': os.getpid()}
+'''
+
+class LengthEncoder:
+    def encode(self, texts, **kwargs):
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+def next_pid(url, pid, timeout=20):
+    """Pid of the first worker other than `pid` to answer; every request on the way must succeed"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        answer = httpx.get(url).json()['pid']
+        if answer != pid:
+            return answer
+        time.sleep(0.02)
+    raise AssertionError(f"Worker {pid} was not replaced within {timeout}s")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class TestForkSafeState:
+    """Test the after_fork hooks of stores, pools and the encode scheduler"""
+
+    def test_forked_child_writes_through_its_own_connection(self, tmp_path):
+        """Test that a child reopens SQLite and its rows are visible to the parent"""
+        store = JobFeatureStore(str(tmp_path / 'jobs.sqlite3'))
+        cache = PromptCache(str(tmp_path / 'llm.sqlite3'))
+        store.put(JobFeatures(job_id='parent', content_hash=store.hash_for('parent posting'), normalized_text='parent posting'))
+
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                store.after_fork()
+                cache.after_fork()
+                store.put(JobFeatures(job_id='child', content_hash=store.hash_for('child posting'),
+                                      normalized_text='child posting'))
+                cache.put('prompt', 'from the child')
+                code = 0 if store.get('parent') is not None else 1
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert store.get_by_text('child posting').job_id == 'child'
+        assert cache.get('prompt') == 'from the child'
+        store.put(JobFeatures(job_id='after', content_hash=store.hash_for('after'), normalized_text='after'))
+        assert store.get('after') is not None, "The parent's connection still works"
+
+    def test_scheduler_and_pool_restart_their_threads(self):
+        """Test that after_fork drops started threads and the next call starts fresh ones"""
+        scheduler = EncodeScheduler(LengthEncoder())
+        pool = StagePool(max_workers=1)
+        scheduler.encode(['warm'])
+
+        scheduler.after_fork()
+        pool.after_fork()
+
+        assert scheduler.stats()['queued'] == 0
+        assert scheduler.encode(['abc'])[0][0] == 3
+        assert pool._executor.submit(sum, [1, 2]).result() == 3
+        scheduler.close()
+        pool.shutdown()
+
+class TestPreforkServer:
+    """Test the supervisor with a small service in a separate process"""
+
+    @pytest.fixture
+    def serve(self, tmp_path):
+        (tmp_path / 'tiny_service.py').write_text(SERVICE)
+        (tmp_path / 'jobs_service.py').write_text(JOBS_SERVICE)
+        port = free_port()
+        processes = []
+        env = {**os.environ, 'JOB_FEATURE_STORE_DIR': str(tmp_path), 'PRELOAD_MODELS': '0',
+               'EMBEDDING_STORE_PATH': str(tmp_path / 'embeddings')}
+
+        def start(service='tiny_service', **options):
+            script = textwrap.dedent(f'''
+                import sys
+                sys.path[:0] = [{str(tmp_path)!r}, {BACKEND!r}]
+                import {service} as service
+                from prefork_server import PreforkServer
+                PreforkServer(service, host='127.0.0.1', port={port}, log_level='warning', **{options!r}).run()
+            ''')
+            process = subprocess.Popen([sys.executable, '-c', script], env=env)
+            processes.append(process)
+            deadline = time.monotonic() + 20
+            while time.monotonic() < deadline:
+                try:
+                    httpx.get(f'http://127.0.0.1:{port}/whoami', timeout=1)
+                    return process, f'http://127.0.0.1:{port}/whoami'
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            raise RuntimeError("Pre-fork server did not start")
+
+        yield start
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    def test_workers_are_forked_after_loading(self, serve):
+        """Test that workers run after_fork and see state loaded once in the parent"""
+        process, url = serve(workers=2)
+
+        answers = [httpx.get(url).json() for _ in range(6)]
+
+        assert all(answer['loaded_in'] == process.pid for answer in answers)
+        assert all(answer['forked'] and answer['pid'] != process.pid for answer in answers)
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=20) == 0
+
+    def test_workers_are_recycled_after_max_requests(self, serve):
+        """Test that exhausted workers are replaced without a single request being dropped"""
+        process, url = serve(workers=1, max_requests=2)
+
+        pids = [httpx.get(url).json()['pid']]
+        for _ in range(3):
+            pids.append(next_pid(url, pids[-1]))
+
+        assert len(set(pids)) == 4
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=20) == 0
+
+    def test_sighup_replaces_every_worker(self, serve):
+        """Test that SIGHUP brings up new workers while the old ones keep answering until retired"""
+        process, url = serve(workers=1)
+
+        before = httpx.get(url).json()['pid']
+        process.send_signal(signal.SIGHUP)
+
+        assert next_pid(url, before) != before
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=20) == 0
+
+    def test_workers_share_indexed_jobs(self, serve):
+        """Test that jobs posted to or removed through one worker are seen when another recommends"""
+        process, url = serve('jobs_service', workers=2)
+        base = url.rsplit('/', 1)[0]
+        resume = {'resume': 'Python developer writing python tools, some Java', 'k': 5}
+
+        def recommend_elsewhere(pid, timeout=20):
+            """First recommendation answered by a worker other than `pid`"""
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                response = httpx.post(f'{base}/recommend', json=resume)
+                assert response.status_code == 200
+                if response.headers['X-Worker'] != pid:
+                    return response.json()
+            raise AssertionError(f"No worker other than {pid} answered within {timeout}s")
+
+        response = httpx.post(f'{base}/jobs', json={'jobs': [
+            {'id': '1', 'title': 'Python Engineer', 'description': 'Python python backend'},
+            {'id': '2', 'title': 'Java Engineer', 'description': 'Java services'}
+        ]})
+        assert response.status_code == 200
+
+        data = recommend_elsewhere(response.headers['X-Worker'])
+        assert [(job['id'], job['title']) for job in data['jobs']] == [('1', 'Python Engineer'), ('2', 'Java Engineer')]
+        assert data['indexed_jobs'] == 2
+
+        response = httpx.delete(f'{base}/jobs/1')
+        assert response.status_code == 200
+
+        data = recommend_elsewhere(response.headers['X-Worker'])
+        assert [job['id'] for job in data['jobs']] == ['2']
+        assert data['indexed_jobs'] == 1
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=20) == 0
@@ -0,0 +1,91 @@
+"""
+Tests for the content-hash result cache
+Covers LRU eviction under the memory bound, TTL expiry and hit/miss counters
+"""
+import pytest
+
+from result_cache import ResultCache, content_hash, estimate_size
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestResultCache:
+    """Test suite for ResultCache"""
+
+    def test_content_hash_separates_parts(self):
+        """Test that part boundaries are part of the key"""
+        assert content_hash("ab", "c") != content_hash("a", "bc")
+        assert content_hash("resume", "job", "senior") == content_hash("resume", "job", "senior")
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted and values returned"""
+        cache = ResultCache('test')
+
+        assert cache.get('missing') is None
+        cache.put('key', {'score': 0.5})
+        assert cache.get('key') == {'score': 0.5}
+
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['entries'] == 1
+        assert stats['bytes'] == estimate_size({'score': 0.5})
+
+    def test_lru_eviction_respects_memory_bound(self):
+        """Test that the least recently used entries are evicted first"""
+        value_size = estimate_size('x' * 1000)
+        cache = ResultCache('test', max_bytes=value_size * 3)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, 'x' * 1000)
+
+        cache.get('a')  # 'b' is now least recently used
+        cache.put('d', 'x' * 1000)
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('d') is not None
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['bytes'] <= cache.max_bytes
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after their TTL"""
+        clock = FakeClock()
+        cache = ResultCache('test', ttl_seconds=10, clock=clock)
+        cache.put('key', 'value')
+
+        clock.now = 9.9
+        assert cache.get('key') == 'value'
+        clock.now = 10.0
+        assert cache.get('key') is None
+        assert cache.stats()['expirations'] == 1
+        assert len(cache) == 0
+
+    def test_get_or_compute_runs_once(self):
+        """Test that a cached value is not recomputed"""
+        cache = ResultCache('test')
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'keywords': ['python']}
+
+        first = cache.get_or_compute('job', compute)
+        second = cache.get_or_compute('job', compute)
+
+        assert first is second
+        assert len(calls) == 1
+
+    def test_oversized_entry_not_cached(self):
+        """Test that an entry larger than the bound is skipped without evicting others"""
+        cache = ResultCache('test', max_bytes=estimate_size('small') * 2)
+        cache.put('small', 'small')
+        cache.put('big', 'x' * 10000)
+
+        assert cache.get('big') is None
+        assert cache.get('small') == 'small'
@@ -0,0 +1,71 @@
+"""
+Tests for the batched spaCy skill extraction stage
+Uses a stand-in pipeline so the parse calls themselves can be counted
+"""
+import pytest
+
+import embedding_service
+from job_feature_store import JobFeatures
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+class Doc:
+    def __init__(self, text):
+        # Capitalized words stand in for noun chunks
+        self.noun_chunks = [Chunk(word) for word in text.split() if word[:1].isupper()]
+
+class StandInPipeline:
+    """Records each nlp.pipe call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        pytest.fail("Texts should be parsed through nlp.pipe")
+
+    def pipe(self, texts, batch_size=None, n_process=1):
+        texts = list(texts)
+        self.calls.append((texts, n_process))
+        return (Doc(text) for text in texts)
+
+@pytest.fixture
+def nlp(monkeypatch):
+    pipeline = StandInPipeline()
+    get = embedding_service.models.get
+    monkeypatch.setattr(embedding_service.models, 'get', lambda name: pipeline if name == 'spacy' else get(name))
+    return pipeline
+
+class TestSpacyStage:
+    """Test suite for spaCy skill extraction in embedding_service"""
+
+    def test_resume_and_job_share_one_pipe_call(self, nlp):
+        """Test that both texts are parsed in a single batch and level fit does not parse"""
+        resume = "Built Python services over 5 years as Senior engineer"
+        job = "Senior role needing Python and Kubernetes experience"
+
+        resume_skills, job_skills, level = embedding_service.spacy_stage(resume, job, 'senior')
+
+        assert nlp.calls == [([resume, job], 1)]
+        assert set(resume_skills['skills']) == {'built', 'python', 'senior'}
+        assert set(job_skills['skills']) == {'senior', 'python', 'kubernetes'}
+        assert resume_skills['experience_score'] == 1
+        assert level['best_fit_level'] == 'senior'
+
+    def test_stored_job_skills_skip_the_job_parse(self, nlp):
+        """Test that a job with stored features only parses the resume"""
+        features = JobFeatures(job_id='1', content_hash='h', normalized_text='',
+                               skills={'skills': ['go'], 'experience_score': 0})
+
+        _, job_skills, _ = embedding_service.spacy_stage("Go developer", "Go role", 'mid', features)
+
+        assert nlp.calls == [(["Go developer"], 1)]
+        assert job_skills == {'skills': ['go'], 'experience_score': 0}
+
+    def test_level_fit_does_not_parse(self, nlp):
+        """Test that job level fit works from keywords alone"""
+        fit = embedding_service.analyzer.analyze_job_level_fit("Junior developer, intern last summer", 'entry')
+
+        assert nlp.calls == []
+        assert fit['best_fit_level'] == 'entry'
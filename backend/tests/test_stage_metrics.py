@@ -0,0 +1,118 @@
+"""
+Tests for per-stage latency instrumentation
+Ensures stage timings reach the histograms, the /metrics text and the optional timings block
+"""
+import asyncio
+import time
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from embedding_store import EmbeddingStore
+from encode_scheduler import EncodeScheduler
+from stage_metrics import Histogram, StageMetrics
+from stage_pool import StagePool
+
+class HashEncoder:
+    def encode(self, texts, **kwargs):
+        return np.stack([np.random.default_rng(len(text)).random(8, dtype=np.float32) for text in texts])
+
+class TestStageMetrics:
+    """Test suite for Histogram and StageMetrics"""
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test that observations land in cumulative buckets with a sum and count"""
+        histogram = Histogram('stage_seconds', "Stage time", 'stage', buckets=(0.01, 0.1))
+        for value in (0.005, 0.05, 0.05, 3.0):
+            histogram.observe('llm', value)
+
+        lines = histogram.render()
+
+        assert '# TYPE stage_seconds histogram' in lines
+        assert 'stage_seconds_bucket{stage="llm",le="0.01"} 1' in lines
+        assert 'stage_seconds_bucket{stage="llm",le="0.1"} 3' in lines
+        assert 'stage_seconds_bucket{stage="llm",le="+Inf"} 4' in lines
+        assert 'stage_seconds_count{stage="llm"} 4' in lines
+        assert histogram.snapshot()['llm']['sum'] == pytest.approx(3.105)
+
+    def test_timings_follow_the_request_across_threads_and_tasks(self):
+        """Test that stages on pool threads and concurrent tasks all report into the request's timings"""
+        metrics = StageMetrics()
+        pool = StagePool(max_workers=2)
+
+        def cpu_stage():
+            with metrics.stage('cpu'):
+                time.sleep(0.01)
+
+        async def handle():
+            with metrics.request('/analyze') as timings:
+                await asyncio.gather(pool.run(cpu_stage), metrics.timed('io', asyncio.sleep(0.01)))
+            return timings
+
+        timings = asyncio.run(handle())
+        pool.shutdown()
+
+        assert set(timings) == {'cpu', 'io', 'total'}
+        assert timings['total'] >= timings['cpu'] >= 10
+        assert metrics.request_seconds.snapshot()['/analyze']['count'] == 1
+
+        with metrics.stage('outside'):
+            pass
+        assert metrics.stage_seconds.snapshot()['outside']['count'] == 1, "Untracked stages still feed the histogram"
+
+    def test_failing_gauge_does_not_break_the_scrape(self):
+        """Test that gauges are read at render time and a failing one is skipped"""
+        metrics = StageMetrics()
+        metrics.gauge('queue_depth', "Queued", lambda: {'bulk': 3}, label='lane')
+        metrics.gauge('broken', "Broken", lambda: 1 / 0)
+
+        text = metrics.render()
+
+        assert 'queue_depth{lane="bulk"} 3' in text
+        assert '# TYPE broken gauge' in text
+
+class TestMetricsEndpoint:
+    """Test /metrics and the timings block of the hybrid service"""
+
+    @pytest.fixture
+    def service(self, monkeypatch, tmp_path):
+        scheduler = EncodeScheduler(HashEncoder())
+        monkeypatch.setattr(hybrid_analysis_simple, 'encode_scheduler', scheduler)
+        monkeypatch.setattr(hybrid_analysis_simple, 'embedding_store', EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in'))
+        monkeypatch.setattr(hybrid_analysis_simple, 'require_sentence_model', AsyncMock())
+        monkeypatch.setattr(hybrid_analysis_simple.analyzer, 'call_ollama_llm_async', AsyncMock(return_value=""))
+        for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache):
+            cache.clear()
+        yield
+        for cache in (hybrid_analysis_simple.response_cache, hybrid_analysis_simple.resume_cache):
+            cache.clear()
+        scheduler.close()
+
+    def test_timings_only_when_requested(self, hybrid_client, service, sample_resume_data, sample_job_data):
+        """Test that ?timings=true adds per-stage milliseconds and a cached response does not keep them"""
+        payload = {"resume": sample_resume_data["mid_developer"], "job": sample_job_data["mid_developer"],
+                   "jobLevel": "mid"}
+
+        timed = hybrid_client.post("/analyze?timings=true", json=payload).json()
+        plain = hybrid_client.post("/analyze", json=payload).json()
+
+        assert {'sections', 'standalone_score', 'keyword_similarity', 'embeddings', 'llm', 'skill_gap', 'total'} \
+            <= set(timed["timings"])
+        assert plain["timings"] is None
+        assert plain["overall_score"] == timed["overall_score"]
+
+    def test_metrics_endpoint(self, hybrid_client, service, sample_resume_data, sample_job_data):
+        """Test that /metrics serves stage histograms and cache gauges as Prometheus text"""
+        stages = hybrid_analysis_simple.metrics.stage_seconds
+        before = stages.snapshot().get('embeddings', {}).get('count', 0)
+        hybrid_client.post("/analyze", json={"resume": sample_resume_data["junior_developer"],
+                                             "job": sample_job_data["junior_developer"], "jobLevel": "entry"})
+
+        response = hybrid_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert f'analysis_stage_seconds_count{{stage="embeddings"}} {before + 1}' in response.text
+        assert 'analysis_request_seconds_count{endpoint="/analyze"}' in response.text
+        assert 'analysis_cache_hit_rate{cache="response"}' in response.text
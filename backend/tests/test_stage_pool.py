@@ -0,0 +1,49 @@
+"""
+Tests for the CPU stage pool
+Ensures blocking stages run off the event loop and concurrently up to the pool size
+"""
+import asyncio
+import time
+import pytest
+
+from stage_pool import StagePool
+
+class TestStagePool:
+    """Test suite for StagePool"""
+
+    def test_stages_run_concurrently_off_the_loop(self):
+        """Test that two blocking stages overlap while the loop keeps ticking"""
+        pool = StagePool(max_workers=2)
+        ticks = []
+
+        def blocking_stage(value):
+            time.sleep(0.2)
+            return value * 2
+
+        async def ticker():
+            for _ in range(10):
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        async def main():
+            start = time.perf_counter()
+            first, second, _ = await asyncio.gather(pool.run(blocking_stage, 1), pool.run(blocking_stage, value=2), ticker())
+            return first, second, time.perf_counter() - start
+
+        first, second, elapsed = asyncio.run(main())
+        pool.shutdown()
+
+        assert (first, second) == (2, 4)
+        assert elapsed < 0.35, "Stages should overlap rather than run back to back"
+        assert len(ticks) == 10
+
+    def test_stage_errors_propagate(self):
+        """Test that an exception in a stage is raised to the awaiting request"""
+        pool = StagePool(max_workers=1)
+
+        def failing_stage():
+            raise ValueError("bad input")
+
+        with pytest.raises(ValueError):
+            asyncio.run(pool.run(failing_stage))
+        pool.shutdown()
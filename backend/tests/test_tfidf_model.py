@@ -0,0 +1,80 @@
+"""
+Tests for the pre-fitted TF-IDF model
+Ensures the hashed IDF table scores like a fitted TfidfVectorizer and round-trips through disk
+"""
+import json
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from tfidf_model import TfidfModel, clean_text, pair_similarity, read_corpus
+
+CORPUS = [
+    "Senior Python developer with AWS and Docker experience",
+    "Java engineer building Spring microservices",
+    "Data scientist using Python, pandas and machine learning",
+    "Frontend developer with React and TypeScript",
+    "DevOps engineer managing Kubernetes and Terraform on AWS",
+]
+
+class TestTfidfModel:
+    """Test suite for TfidfModel"""
+
+    def test_matches_a_fitted_tfidf_vectorizer(self):
+        """Test that hashed features with the stored IDF give the same cosine as sklearn's vocabulary"""
+        cleaned = [clean_text(text) for text in CORPUS]
+        model = TfidfModel.fit(cleaned)
+        reference = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).fit(cleaned)
+
+        # Terms seen in the corpus (sklearn drops unseen ones, hashing keeps them)
+        resume = clean_text("Python developer, AWS Docker")
+        for job in cleaned:
+            expected = cosine_similarity(reference.transform([resume]), reference.transform([job]))[0][0]
+            actual = model.similarity(model.transform([resume]), model.transform([job]))
+            assert actual == pytest.approx(expected, abs=1e-5)
+
+    def test_rare_terms_outweigh_common_ones(self):
+        """Test that the corpus IDF makes shared rare terms count for more than shared common ones"""
+        model = TfidfModel.fit([clean_text(text) for text in CORPUS])
+        resume = model.transform([clean_text("Python and Terraform")])
+
+        rare = model.similarity(resume, model.transform(["terraform"]))
+        common = model.similarity(resume, model.transform(["python"]))
+
+        assert rare > common > 0
+
+    def test_save_and_load(self, tmp_path):
+        """Test that the IDF table round-trips and an unfitted model falls back to unweighted counts"""
+        path = str(tmp_path / 'idf.npz')
+        model = TfidfModel.fit(CORPUS, n_features=2 ** 12)
+        model.save(path)
+
+        loaded = TfidfModel.load_or_default(path)
+        assert loaded.documents == len(CORPUS)
+        assert (loaded.transform(CORPUS[:1]) != model.transform(CORPUS[:1])).nnz == 0
+
+        unweighted = TfidfModel.load_or_default(str(tmp_path / 'missing.npz'))
+        assert unweighted.idf is None
+        assert unweighted.similarity(unweighted.transform(["python aws"]), unweighted.transform(["python aws"])) == \
+            pytest.approx(1.0)
+        with pytest.raises(ValueError):
+            unweighted.save(path)
+
+    def test_pair_similarity_without_a_fitted_model(self):
+        """Test the fallback scoring: IDF fitted on the resume/job pair alone, as a per-request TfidfVectorizer does"""
+        resume, job = clean_text(CORPUS[0]), clean_text(CORPUS[4])
+        matrix = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).fit_transform([resume, job])
+
+        assert pair_similarity(resume, job) == cosine_similarity(matrix[0:1], matrix[1:2])[0][0]
+        assert 0 < pair_similarity(resume, job) < pair_similarity(resume, resume) == pytest.approx(1.0)
+        assert not TfidfModel().fitted and TfidfModel.fit(CORPUS, n_features=2 ** 12).fitted
+
+    def test_read_corpus(self, tmp_path):
+        """Test that NDJSON records and plain text files are both read as cleaned documents"""
+        records = tmp_path / 'jobs.jsonl'
+        records.write_text(json.dumps({"id": 1, "description": "Python, AWS!"}) + "\n\n" +
+                           json.dumps({"resume": "Java.", "job": "Go"}) + "\n")
+        text = tmp_path / 'resume.txt'
+        text.write_text("React & Node")
+
+        assert list(read_corpus([str(records), str(text)])) == ["python aws", "java", "go", "react  node"]
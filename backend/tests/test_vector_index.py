@@ -0,0 +1,135 @@
+"""
+Tests for the job vector index and the /recommend endpoint
+Ensures top-K search matches brute force and stays correct across adds, updates and removals
+"""
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+import hybrid_analysis_simple
+from embedding_store import EmbeddingStore
+from encode_scheduler import EncodeScheduler
+from job_feature_store import JobFeatureStore
+from vector_index import VectorIndex
+
+def random_vectors(count, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+def brute_force(vectors, query, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+class TestVectorIndex:
+    """Test suite for VectorIndex"""
+
+    def test_flat_search_matches_brute_force(self):
+        """Test that flat search returns the exact top-k with cosine scores"""
+        vectors = random_vectors(200)
+        index = VectorIndex()
+        index.add_many([f"job{i}" for i in range(200)], vectors)
+        query = random_vectors(1, seed=1)[0]
+
+        results = index.search(query, k=5)
+
+        assert [job_id for job_id, _ in results] == [f"job{i}" for i in brute_force(vectors, query, 5)]
+        expected = float(vectors[int(results[0][0][3:])] @ query /
+                         (np.linalg.norm(vectors[int(results[0][0][3:])]) * np.linalg.norm(query)))
+        assert results[0][1] == pytest.approx(expected, abs=1e-5)
+
+    def test_update_and_remove_are_incremental(self):
+        """Test that re-adding an id replaces it and removing one keeps the rest searchable"""
+        vectors = random_vectors(10)
+        index = VectorIndex()
+        index.add_many([f"job{i}" for i in range(10)], vectors)
+
+        index.add("job3", vectors[7])
+        assert len(index) == 10
+        assert {job_id for job_id, _ in index.search(vectors[7], k=2)} == {"job3", "job7"}
+
+        assert index.remove("job0")
+        assert not index.remove("job0")
+        assert "job0" not in index and len(index) == 9
+        assert index.search(vectors[9], k=1)[0][0] == "job9", "The moved last row is still found"
+
+    def test_ivf_recall_and_probing(self):
+        """Test that the approximate mode finds most exact neighbours while scoring a fraction of rows"""
+        centers = random_vectors(20, dim=32, seed=2) * 5
+        vectors = (np.repeat(centers, 100, axis=0) + random_vectors(2000, dim=32, seed=3)).astype(np.float32)
+        index = VectorIndex(mode='ivf', nlist=20, nprobe=3, train_threshold=500)
+        index.add_many([str(i) for i in range(2000)], vectors)
+        queries = random_vectors(20, dim=32, seed=4) + centers
+
+        hits = 0
+        for query in queries:
+            exact = {str(i) for i in brute_force(vectors, query, 10)}
+            hits += len(exact & {job_id for job_id, _ in index.search(query, k=10)})
+
+        assert index.stats()['trained']
+        assert hits / 200 >= 0.9
+        assert len(index._probe(queries[0] / np.linalg.norm(queries[0]))) < 2000 / 2
+
+        for i in range(0, 2000, 2):
+            index.remove(str(i))
+        assert len(index) == 1000
+        assert all(int(job_id) % 2 == 1 for job_id, _ in index.search(queries[0], k=10))
+
+    def test_dimension_mismatch_is_rejected(self):
+        """Test that vectors from a different model cannot be mixed in"""
+        index = VectorIndex()
+        index.add("a", np.ones(8))
+
+        with pytest.raises(ValueError):
+            index.add("b", np.ones(4))
+
+class StandInEncoder:
+    """Maps each text to a fixed one-hot-ish vector by keyword"""
+
+    TOPICS = ['python', 'java', 'design', 'sales']
+
+    def encode(self, texts, **kwargs):
+        vectors = np.full((len(texts), len(self.TOPICS)), 0.01, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for column, topic in enumerate(self.TOPICS):
+                vectors[row, column] += text.lower().count(topic)
+        return vectors
+
+class TestRecommendEndpoint:
+    """Test suite for /jobs and /recommend"""
+
+    @pytest.fixture
+    def service(self, monkeypatch, tmp_path):
+        encoder = StandInEncoder()
+        scheduler = EncodeScheduler(encoder)
+        monkeypatch.setattr(hybrid_analysis_simple, 'encode_scheduler', scheduler)
+        monkeypatch.setattr(hybrid_analysis_simple, 'embedding_store',
+                            EmbeddingStore(str(tmp_path / 'embeddings'), 'stand-in'))
+        monkeypatch.setattr(hybrid_analysis_simple, 'job_index', VectorIndex())
+        monkeypatch.setattr(hybrid_analysis_simple, 'job_features', JobFeatureStore())
+        monkeypatch.setattr(hybrid_analysis_simple, 'require_sentence_model', AsyncMock())
+        yield
+        scheduler.close()
+
+    def test_recommend_ranks_indexed_jobs(self, hybrid_client, service):
+        """Test that jobs can be indexed, updated, removed and recommended"""
+        response = hybrid_client.post("/jobs", json={"jobs": [
+            {"id": "1", "title": "Python Engineer", "description": "Python python backend"},
+            {"id": "2", "title": "Java Engineer", "description": "Java services"},
+            {"id": "3", "title": "Designer", "description": "Product design"}
+        ]})
+        assert response.status_code == 200
+        assert response.json()["indexed_jobs"] == 3
+
+        response = hybrid_client.post("/recommend", json={"resume": "Python developer writing python tools, some Java", "k": 2})
+        data = response.json()
+        assert [job["id"] for job in data["jobs"]] == ["1", "2"]
+        assert data["jobs"][0]["title"] == "Python Engineer"
+        assert 0 < data["jobs"][1]["score"] < data["jobs"][0]["score"] <= 1
+
+        hybrid_client.post("/jobs", json={"jobs": [{"id": "3", "title": "Python Designer", "description": "Python design"}]})
+        assert hybrid_client.delete("/jobs/1").status_code == 200
+        assert hybrid_client.delete("/jobs/1").status_code == 404
+
+        data = hybrid_client.post("/recommend", json={"resume": "Python developer", "k": 5}).json()
+        assert data["indexed_jobs"] == 2
+        assert [job["id"] for job in data["jobs"]][0] == "3"
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+TF-IDF Model
+Hashed unigram/bigram term counts weighted by an IDF table fitted offline on the resume and job corpus
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import logging
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_N_FEATURES = 2 ** 18
+
+def clean_text(text: str) -> str:
+    """Lowercased text without punctuation, as fed to TF-IDF"""
+    return re.sub(r'[^\w\s]', '', text.lower())
+
+def default_model_path() -> str:
+    """TFIDF_MODEL_PATH, or tfidf_idf.npz next to this module"""
+    return os.environ.get('TFIDF_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tfidf_idf.npz'))
+
+class TfidfModel:
+    """Stateless hashing vectorizer plus a stored IDF table, so requests only transform.
+
+    Hashing keeps the vocabulary out of the model file and lets unseen terms hash into the
+    same space; the IDF uses sklearn's smoothed formula, so a fitted model scores like a
+    TfidfVectorizer fitted on the same corpus. Without an IDF table every term weighs 1;
+    callers use `pair_similarity` until one has been fitted.
+    """
+
+    def __init__(self, idf: Optional[np.ndarray] = None, n_features: int = DEFAULT_N_FEATURES, documents: int = 0):
+        if idf is not None and idf.shape != (n_features,):
+            raise ValueError(f"IDF table has {idf.shape[0]} entries, expected {n_features}")
+        self.idf = idf.astype(np.float32) if idf is not None else None
+        self.n_features = n_features
+        self.documents = documents
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, stop_words='english', ngram_range=(1, 2), alternate_sign=False, norm=None
+        )
+
+    @property
+    def fitted(self) -> bool:
+        return self.idf is not None
+
+    @classmethod
+    def fit(cls, texts: Iterable[str], n_features: int = DEFAULT_N_FEATURES, batch_size: int = 1000) -> 'TfidfModel':
+        """Document frequencies over a corpus, streamed in batches"""
+        model = cls(n_features=n_features)
+        document_frequency = np.zeros(n_features, dtype=np.int64)
+        documents = 0
+        for batch in _batches(texts, batch_size):
+            counts = model.vectorizer.transform(batch).tocsc()
+            document_frequency += np.diff(counts.indptr)
+            documents += len(batch)
+        model.idf = (np.log((1 + documents) / (1 + document_frequency)) + 1).astype(np.float32)
+        model.documents = documents
+        return model
+
+    @classmethod
+    def load(cls, path: str) -> 'TfidfModel':
+        with np.load(path) as data:
+            return cls(data['idf'], n_features=int(data['n_features']), documents=int(data['documents']))
+
+    @classmethod
+    def load_or_default(cls, path: Optional[str] = None) -> 'TfidfModel':
+        """The fitted model at `path`, or an unweighted one if none has been fitted"""
+        path = path or default_model_path()
+        if os.path.exists(path):
+            return cls.load(path)
+        logger.warning(f"No fitted TF-IDF model at {path}; keyword similarity weighs terms per resume/job pair "
+                       f"until one is fitted with `python tfidf_model.py <corpus files> --output {path}`")
+        return cls()
+
+    def save(self, path: str) -> None:
+        if self.idf is None:
+            raise ValueError("Cannot save a TF-IDF model that has not been fitted")
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(tmp_path, idf=self.idf, n_features=self.n_features, documents=self.documents)
+        os.replace(tmp_path, path)
+
+    def transform(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        """L2-normalized TF-IDF rows"""
+        counts = self.vectorizer.transform(texts)
+        if self.idf is not None:
+            counts = counts @ sparse.diags(self.idf)
+        return normalize(counts.tocsr().astype(np.float32))
+
+    @staticmethod
+    def similarity(a: sparse.csr_matrix, b: sparse.csr_matrix) -> float:
+        """Cosine of two normalized rows: a sparse dot product"""
+        return float(a.multiply(b).sum())
+
+def pair_similarity(a: str, b: str) -> float:
+    """Cosine of two cleaned texts with IDF fitted on just the pair, as scored before corpus models existed"""
+    matrix = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).fit_transform([a, b])
+    return float(cosine_similarity(matrix[0:1], matrix[1:2])[0][0])
+
+def _batches(texts: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_corpus(paths: Sequence[str]) -> Iterator[str]:
+    """Cleaned documents from .jsonl/.ndjson records (resume, job, description or text fields) or whole text files"""
+    fields = ('resume', 'job', 'description', 'text')
+    for path in paths:
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            if path.endswith(('.jsonl', '.ndjson')):
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    for field in fields:
+                        if isinstance(record.get(field), str) and record[field].strip():
+                            yield clean_text(record[field])
+            else:
+                text = f.read()
+                if text.strip():
+                    yield clean_text(text)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit the keyword-similarity IDF table on a resume/job corpus")
+    parser.add_argument('corpus', nargs='+', help="Text files (one document each) or .jsonl/.ndjson files")
+    parser.add_argument('--output', default=default_model_path())
+    parser.add_argument('--n-features', type=int, default=DEFAULT_N_FEATURES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fitted = TfidfModel.fit(read_corpus(args.corpus), n_features=args.n_features)
+    if not fitted.documents:
+        sys.exit("No documents found in the corpus")
+    fitted.save(args.output)
+    logger.info(f"Fitted IDF over {fitted.documents} documents -> {args.output}")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Vector Index
+In-process cosine top-K over embeddings keyed by id, exact (flat) or approximate (IVF)
+"""
+
+import os
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_MODES = ('flat', 'ivf')
+
+class VectorIndex:
+    """Unit-normalized float32 rows in one growable matrix, searched by inner product.
+
+    `flat` scores every row with a single matrix-vector product. `ivf` clusters the rows
+    with spherical k-means once `train_threshold` vectors are indexed and only scores the
+    rows of the `nprobe` closest clusters, so search cost grows with nprobe/nlist of the
+    index rather than all of it. Adds, updates and removals are incremental in both modes;
+    the clustering is retrained when the index has doubled since it was last trained.
+    """
+
+    def __init__(self, dim: Optional[int] = None, mode: str = 'flat', nlist: Optional[int] = None,
+                 nprobe: int = 8, train_threshold: int = 1024, seed: int = 0):
+        if mode not in SUPPORTED_MODES:
+            raise ValueError(f"Unsupported index mode {mode!r}; expected one of {SUPPORTED_MODES}")
+        self.dim = dim
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.seed = seed
+        self._matrix = np.zeros((0, dim or 0), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists: List[Set[int]] = []
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> 'VectorIndex':
+        """Index configured by JOB_INDEX_MODE, JOB_INDEX_NLIST, JOB_INDEX_NPROBE and JOB_INDEX_TRAIN_THRESHOLD"""
+        nlist = os.environ.get('JOB_INDEX_NLIST')
+        return cls(
+            mode=os.environ.get('JOB_INDEX_MODE', 'flat'),
+            nlist=int(nlist) if nlist else None,
+            nprobe=int(os.environ.get('JOB_INDEX_NPROBE', '8')),
+            train_threshold=int(os.environ.get('JOB_INDEX_TRAIN_THRESHOLD', '1024'))
+        )
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._ids)
+
+    def add(self, item_id: str, vector: np.ndarray) -> None:
+        """Insert or replace one vector"""
+        self.add_many([item_id], [vector])
+
+    def add_many(self, item_ids: Sequence[str], vectors: Sequence[np.ndarray]) -> None:
+        """Insert or replace vectors; existing ids are updated in place"""
+        if not len(item_ids):
+            return
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(item_ids), -1))
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+            for item_id, vector in zip(item_ids, vectors):
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._reserve(row + 1)
+                    self._ids.append(item_id)
+                    self._rows[item_id] = row
+                elif self._centroids is not None:
+                    self._lists[self._assignments[row]].discard(row)
+                self._matrix[row] = vector
+                if self._centroids is not None:
+                    self._assign(row)
+            self._maybe_train()
+
+    def remove(self, item_id: str) -> bool:
+        """Drop a vector; the last row moves into its slot. Returns whether it was present"""
+        with self._lock:
+            row = self._rows.pop(item_id, None)
+            if row is None:
+                return False
+            last = len(self._ids) - 1
+            if self._centroids is not None:
+                self._lists[self._assignments[row]].discard(row)
+            if row != last:
+                moved_id = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+                if self._centroids is not None:
+                    self._lists[self._assignments[last]].discard(last)
+                    self._assignments[row] = self._assignments[last]
+                    self._lists[self._assignments[row]].add(row)
+            self._ids.pop()
+            return True
+
+    def search(self, query: np.ndarray, k: int = 10) -> List[Tuple[str, float]]:
+        """Up to k (id, cosine) pairs, best first"""
+        query = self._normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            size = len(self._ids)
+            if size == 0 or k <= 0:
+                return []
+            if self._centroids is None:
+                rows = None
+                scores = self._matrix[:size] @ query
+            else:
+                rows = self._probe(query)
+                scores = self._matrix[rows] @ query
+            if k < len(scores):
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return [(self._ids[rows[i] if rows is not None else i], float(scores[i])) for i in top]
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and clustering state"""
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'vectors': len(self._ids),
+                'dim': self.dim,
+                'trained': self._centroids is not None,
+                'lists': len(self._lists),
+                'nprobe': self.nprobe
+            }
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the matrix geometrically so appends are amortized O(1)"""
+        capacity = self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 64)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        self._matrix = matrix
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:len(self._ids)] = self._assignments[:len(self._ids)]
+        self._assignments = assignments
+
+    def _assign(self, row: int) -> None:
+        cluster = int(np.argmax(self._centroids @ self._matrix[row]))
+        self._assignments[row] = cluster
+        self._lists[cluster].add(row)
+
+    def _probe(self, query: np.ndarray) -> np.ndarray:
+        """Rows of the nprobe clusters whose centroids are closest to the query"""
+        nprobe = min(self.nprobe, len(self._lists))
+        closest = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        rows = [row for cluster in closest for row in self._lists[cluster]]
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def _maybe_train(self) -> None:
+        size = len(self._ids)
+        if self.mode != 'ivf' or size < self.train_threshold:
+            return
+        if self._centroids is not None and size < 2 * self._trained_size:
+            return
+        self._train()
+
+    def _train(self, iterations: int = 10) -> None:
+        """Spherical k-means over the current rows"""
+        size = len(self._ids)
+        nlist = min(self.nlist or max(1, int(np.sqrt(size))), size)
+        data = self._matrix[:size]
+        rng = np.random.default_rng(self.seed)
+        centroids = data[rng.choice(size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, data)
+            empty = np.bincount(assignments, minlength=nlist) == 0
+            sums[empty] = centroids[empty]  # Keep the old centroid for an empty cluster
+            centroids = self._normalize(sums)
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        self._centroids = centroids
+        self._assignments[:size] = assignments
+        self._lists = [set() for _ in range(nlist)]
+        for row, cluster in enumerate(assignments):
+            self._lists[cluster].add(row)
+        self._trained_size = size
+        logger.info(f"Trained IVF index over {size} vectors into {nlist} lists")